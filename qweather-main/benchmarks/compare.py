@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试结果比较
+按 (环节, 放大倍数) 对比两份结果的中位数耗时，超过阈值的变慢标记为回归
+
+用法：
+    python -m benchmarks.compare benchmarks/results/旧.json benchmarks/results/新.json --threshold 0.1 --fail
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.10  # 中位数变慢超过10%视为回归
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report.get("meta", {}), {(r["stage"], r["scale"]): r for r in report.get("results", [])}
+
+def compare(old, new, threshold=DEFAULT_THRESHOLD):
+    """
+    :return: [(环节, 倍数, 旧中位数, 新中位数, 比值, 是否回归)]，只包含两份结果都有的项
+    """
+    rows = []
+    for key in sorted(set(old) & set(new)):
+        before = old[key]["seconds"]["median"]
+        after = new[key]["seconds"]["median"]
+        ratio = after / before if before else float("inf")
+        rows.append((key[0], key[1], before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两份基准测试结果")
+    parser.add_argument("old", help="基准结果（旧提交）")
+    parser.add_argument("new", help="对比结果（新提交）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判定回归的变慢比例")
+    parser.add_argument("--fail", action="store_true", help="存在回归时以非零状态退出")
+    args = parser.parse_args()
+
+    old_meta, old = load_results(args.old)
+    new_meta, new = load_results(args.new)
+    print(f"旧：{old_meta.get('commit')}（{old_meta.get('startedAt')}）  新：{new_meta.get('commit')}（{new_meta.get('startedAt')}）")
+
+    rows = compare(old, new, args.threshold)
+    for stage, scale, before, after, ratio, regressed in rows:
+        mark = "🔺 回归" if regressed else ("🟢 加快" if ratio < 1 - args.threshold else "")
+        print(f"{stage:<28} {scale:>4}×  {before * 1000:9.2f} ms → {after * 1000:9.2f} ms  {ratio:6.2f}×  {mark}")
+
+    missing = sorted(set(old) ^ set(new))
+    if missing:
+        names = [f"{stage}@{scale}×" for stage, scale in missing]
+        print(f"⚠️ {len(names)} 项仅在一份结果中出现：{', '.join(names[:10])}{' …' if len(names) > 10 else ''}")
+
+    regressions = sum(1 for row in rows if row[5])
+    print(f"共比较 {len(rows)} 项，回归 {regressions} 项")
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
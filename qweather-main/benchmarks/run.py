@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试入口
+对每个放大倍数生成合成数据，逐个环节计时，结果保存为JSON（可用 benchmarks.compare 比较两次提交）
+
+用法（在项目根目录运行）：
+    python -m benchmarks.run                          # 全部环节，1× / 10× / 100×
+    python -m benchmarks.run --scales 1,10 --stages warnings,summary --repeat 10
+    python -m benchmarks.run --memory --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from benchmarks.stages import select_stages
+from benchmarks.synthetic import synthetic_payloads, payload_counts
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git_commit():
+    """当前提交（有未提交的修改时带 -dirty 后缀），不在git仓库中时返回None"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no", "--", "."],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+def _optional_modules():
+    available = {}
+    for name in ("numpy", "ijson", "aiohttp"):
+        try:
+            __import__(name)
+            available[name] = True
+        except ImportError:
+            available[name] = False
+    return available
+
+def _summarize_runs(runs):
+    return {
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "mean": round(statistics.fmean(runs), 6),
+        "stdev": round(statistics.stdev(runs), 6) if len(runs) > 1 else 0.0
+    }
+
+def run_stage(stage, payloads, repeat=5, warmup=1, memory=False):
+    """
+    运行单个环节：warmup 次不计时，之后 repeat 次计时；memory=True 时另跑一次记录tracemalloc峰值
+    :return: 结果字典
+    """
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        state, items = stage.setup(payloads)
+        runs = []
+        for i in range(warmup + repeat):
+            stage.prepare(state)
+            started = time.perf_counter()
+            stage.run(state)
+            elapsed = time.perf_counter() - started
+            if i >= warmup:
+                runs.append(elapsed)
+
+        peak = None
+        if memory:
+            stage.prepare(state)
+            tracemalloc.start()
+            try:
+                stage.run(state)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    result = {"stage": stage.name, "items": items, "seconds": _summarize_runs(runs), "runs": [round(r, 6) for r in runs]}
+    if peak is not None:
+        result["peakBytes"] = peak
+    return result
+
+def run_benchmarks(scales=(1, 10, 100), stage_names=None, repeat=5, warmup=1, seed=0, memory=False):
+    """
+    运行全部基准测试（在临时目录中进行，不影响项目的 docs/ 和 .cache/）
+    :return: 报告字典
+    """
+    stages = select_stages(stage_names)
+    if not stages:
+        raise ValueError(f"没有匹配的环节: {stage_names}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "startedAt": datetime.now(ZoneInfo("Asia/Taipei")).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "optional": _optional_modules(),
+            "repeat": repeat,
+            "warmup": warmup,
+            "seed": seed
+        },
+        "results": []
+    }
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="qweather-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            for scale in scales:
+                payloads = synthetic_payloads(scale, seed)
+                counts = payload_counts(payloads)
+                print(f"📏 {scale}×：测站 {counts['stations']}，乡镇区域 {counts['districts']}，"
+                      f"预警 {counts['warnings']}，地震 {counts['earthquakes']}")
+                for stage in stages:
+                    result = run_stage(stage, payloads, repeat, warmup, memory)
+                    result["scale"] = scale
+                    result["counts"] = counts
+                    report["results"].append(result)
+                    seconds = result["seconds"]
+                    print(f"  {stage.name:<28} {result['items']:>7} 项  "
+                          f"中位数 {seconds['median'] * 1000:9.2f} ms  最小 {seconds['min'] * 1000:9.2f} ms")
+                del payloads
+        finally:
+            os.chdir(cwd)
+    return report
+
+def default_output(report):
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['commit'] or 'nogit'}.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="天气流水线各环节基准测试")
+    parser.add_argument("--scales", default="1,10,100", help="放大倍数，逗号分隔")
+    parser.add_argument("--stages", default="", help="环节名或前缀，逗号分隔（默认全部）")
+    parser.add_argument("--repeat", type=int, default=5, help="计时次数")
+    parser.add_argument("--warmup", type=int, default=1, help="不计时的预热次数")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据的随机种子")
+    parser.add_argument("--memory", action="store_true", help="额外记录每个环节的内存峰值（tracemalloc）")
+    parser.add_argument("--output", default="", help="结果JSON路径（默认 benchmarks/results/时间-提交.json）")
+    args = parser.parse_args()
+
+    scales = [int(value) for value in args.scales.split(",") if value.strip()]
+    stage_names = [name.strip() for name in args.stages.split(",") if name.strip()]
+    try:
+        report = run_benchmarks(scales, stage_names, max(1, args.repeat), max(0, args.warmup), args.seed, args.memory)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    output = os.path.abspath(args.output or default_output(report))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    print(f"💾 结果已保存：{output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试环节
+每个环节由 setup（准备数据，不计时）、prepare（每次运行前的重置，不计时）和 run（计时部分）组成；
+数据集通过 prime_dataset 写入数据集缓存，不发出网络请求，AI调用替换为本地确定性实现
+"""
+
+import hashlib
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import services.summary_builder as summary_builder
+from services.city_config import CITIES
+from services.cwa_weather_fetcher import fetch_weather_serially
+from services.dataset_cache import prime_dataset, reset_dataset_cache
+from services.instrumentation import reset_metrics
+from services.observation_fetcher import fetch_observation_data_for_city
+from services.summary_builder import build_summary
+from services.town_forecast import build_town_forecast_store
+from services.typhoon_fetcher import _extract_typhoon_info
+from services.weather_fetcher import fetch_cwa_weather
+from services.warning_fetcher import (
+    MAIN_CITY_TOWN_DATASETS, fetch_cwa_warnings, _extract_felt_earthquakes, _extract_local_earthquakes,
+    _extract_area_warnings, _extract_special_reports, _extract_station_warnings, _extract_rain_gauge_warnings,
+    _extract_climate_warnings, _town_alert_candidates
+)
+from utils.render_model import RSS_MAX_ITEMS, build_feed_item, build_render_model
+from utils.rss_writer import RSS_PATH, render_rss, write_if_changed, write_rss
+from benchmarks.synthetic import payload_counts
+
+# name: 环节名；setup(payloads) → (state, 处理的条目数)；prepare(state) 每次运行前调用；run(state) 为计时部分
+Stage = namedtuple("Stage", ["name", "setup", "prepare", "run"])
+
+
+def prime_payloads(payloads):
+    """清空数据集缓存并写入合成数据（不带内容摘要，get_parsed 每次都重新解析）"""
+    reset_dataset_cache()
+    reset_metrics()
+    for dataset_id, data in payloads.items():
+        prime_dataset(dataset_id, data=data)
+
+def _stub_ai(prompt, model=None, temperature=None):
+    """本地确定性摘要，代替豆包调用"""
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    return f"（基准测试摘要）{prompt[:60]} [{digest}]"
+
+@contextmanager
+def stub_ai():
+    original = summary_builder.call_doubao_ai
+    summary_builder.call_doubao_ai = _stub_ai
+    try:
+        yield
+    finally:
+        summary_builder.call_doubao_ai = original
+
+def _noop(state):
+    pass
+
+
+def _weather_setup(payloads):
+    return payloads, payload_counts({k: v for k, v in payloads.items() if k.startswith("F-D0047-")})["districts"]
+
+def _weather_run(payloads):
+    for city_name, city_config in CITIES.items():
+        fetch_cwa_weather(city_name, city_config)
+
+def _observation_setup(payloads):
+    return payloads, len(payloads["O-A0002-001"]["records"]["Station"])
+
+def _observation_run(payloads):
+    for city_name, city_config in CITIES.items():
+        fetch_observation_data_for_city(city_name, city_config)
+
+def _section(dataset_id, extract, count):
+    """单个预警数据集的解析环节（直接调用解析函数）"""
+    def setup(payloads):
+        return payloads[dataset_id], count(payloads[dataset_id].get("records", {}))
+
+    def run(data):
+        extract(data)
+
+    return setup, _noop, run
+
+def _town_alerts_setup(payloads):
+    data = [payloads[dataset_id] for dataset_id in MAIN_CITY_TOWN_DATASETS.values()]
+    return data, payload_counts(dict(zip(MAIN_CITY_TOWN_DATASETS.values(), data)))["districts"]
+
+def _town_alerts_run(data):
+    for town_data in data:
+        _town_alert_candidates(build_town_forecast_store(town_data))
+
+def _warnings_setup(payloads):
+    counts = payload_counts(payloads)
+    return payloads, counts["warnings"] + counts["earthquakes"] + counts["stations"]
+
+def _warnings_run(payloads):
+    fetch_cwa_warnings()
+
+def _summary_setup(payloads):
+    prime_payloads(payloads)
+    data = fetch_weather_serially(CITIES)
+    return data, len(data["warnings"])
+
+def _summary_run(data):
+    with stub_ai():
+        build_summary(data)
+
+def _rss_setup(payloads):
+    """按预警数量生成摘要正文，并预先写入 RSS_MAX_ITEMS 条历史（测量历史条目的读取与重写）"""
+    counts = payload_counts(payloads)
+    lines = [f"⚠️ 预警 {i}：某地区发布大雨特报，请注意防范。" for i in range(counts["warnings"])]
+    description = "\n".join(lines)
+    now = datetime.now(timezone.utc)
+    history = []
+    for i in range(RSS_MAX_ITEMS, 0, -1):
+        item = build_feed_item(f"天气预报 {i}", description, now=now - timedelta(hours=i))
+        history = build_render_model(item, history).items
+    write_if_changed(RSS_PATH, render_rss(build_render_model(history[0], history[1:])))
+    return description, len(lines)
+
+def _rss_run(description):
+    write_rss("天气预报", description)
+
+
+STAGES = [
+    Stage("weather.parse", _weather_setup, prime_payloads, _weather_run),
+    Stage("observation", _observation_setup, prime_payloads, _observation_run),
+    Stage("warnings.typhoon", *_section("W-C0034-005", _extract_typhoon_info, lambda r: 1)),
+    Stage("warnings.felt_earthquakes", *_section("E-A0015-001", _extract_felt_earthquakes, lambda r: len(r.get("Earthquake", [])))),
+    Stage("warnings.local_earthquakes", *_section("E-A0016-001", _extract_local_earthquakes, lambda r: len(r.get("Earthquake", [])))),
+    Stage("warnings.area", *_section("W-C0033-001", _extract_area_warnings, lambda r: sum(
+        len(location.get("hazardConditions", {}).get("hazards", [])) for location in r.get("location", [])))),
+    Stage("warnings.special_reports", *_section("W-C0033-002", _extract_special_reports, lambda r: len(r.get("record", [])))),
+    Stage("warnings.stations", *_section("O-A0002-001", _extract_station_warnings, lambda r: len(r.get("Station", [])))),
+    Stage("warnings.rain_gauges", *_section("O-A0003-001", _extract_rain_gauge_warnings, lambda r: len(r.get("Station", [])))),
+    Stage("warnings.climate", *_section("C-B0025-001", _extract_climate_warnings, lambda r: len(r.get("location", [])))),
+    Stage("warnings.town_alerts", _town_alerts_setup, _noop, _town_alerts_run),
+    Stage("warnings.all", _warnings_setup, prime_payloads, _warnings_run),
+    Stage("summary", _summary_setup, _noop, _summary_run),
+    Stage("rss.write", _rss_setup, _noop, _rss_run),
+]
+
+def select_stages(names=None):
+    """按名称或前缀（如 "warnings"）选择环节，names为空时返回全部"""
+    if not names:
+        return list(STAGES)
+    return [
+        stage for stage in STAGES
+        if any(stage.name == name or stage.name.startswith(name + ".") for name in names)
+    ]
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成数据生成模块
+以 tools/fixtures 中录制的数据集为模板，按倍数放大测站、乡镇区域和预警数量，
+用于测量各环节随数据量（直到覆盖全台湾）增长的耗时变化；
+同一倍数和种子生成的数据完全相同，不同提交之间的结果可以直接比较
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from tools.standin_server import FIXTURES_DIR, MANIFEST_FILE, FixtureStore, shift_timestamps
+
+# 各数据集在合成数据中的放大方式
+STATION_DATASETS = ("O-A0001-001", "O-A0002-001", "O-A0003-001")
+EARTHQUAKE_DATASETS = ("E-A0015-001", "E-A0016-001")
+COORDINATE_JITTER = 0.25  # 复制测站相对原测站的最大经纬度偏移（度）
+
+
+def load_fixture(dataset_id, directory=FIXTURES_DIR):
+    """读取录制数据，时间戳与替身服务一样平移到当前整点（预报时段和地震时间保持有效）"""
+    with open(os.path.join(directory, f"{dataset_id}.json"), encoding="utf-8") as f:
+        text = f.read()
+    return json.loads(shift_timestamps(text, FixtureStore(directory).time_offset()))
+
+def fixture_ids(directory=FIXTURES_DIR):
+    return sorted(
+        name[:-5] for name in os.listdir(directory)
+        if name.endswith(".json") and name != MANIFEST_FILE
+    )
+
+def _records(data):
+    return data.setdefault("records", {})
+
+def _shift(text, delta, fmt):
+    try:
+        return (datetime.strptime(text, fmt) + delta).strftime(fmt)
+    except (TypeError, ValueError):
+        return text
+
+
+def _scale_stations(data, scale, rng):
+    """测站列表放大为scale倍：复制的测站有独立的ID、坐标和观测值（部分超过预警阈值）"""
+    stations = _records(data).get("Station", [])
+    scaled = list(stations)
+    for k in range(1, scale):
+        for station in stations:
+            geo_info = dict(station.get("GeoInfo", {}))
+            geo_info["Coordinates"] = [
+                dict(coordinate,
+                     StationLatitude=round(float(coordinate["StationLatitude"]) + rng.uniform(-COORDINATE_JITTER, COORDINATE_JITTER), 4),
+                     StationLongitude=round(float(coordinate["StationLongitude"]) + rng.uniform(-COORDINATE_JITTER, COORDINATE_JITTER), 4))
+                for coordinate in geo_info.get("Coordinates", [])
+            ]
+            values = {
+                "TEMP": f"{rng.uniform(24, 39):.1f}",
+                "HUMD": f"{rng.uniform(0.5, 0.95):.2f}",
+                "WDSD": f"{rng.uniform(0, 17):.1f}",
+                "H_24R": f"{rng.choice((0, 0, 0, 5, 20, 85, 135)) + rng.random():.1f}",
+                "RAIN": "-998" if rng.random() < 0.05 else f"{rng.choice((0, 0, 1, 10, 42)) + rng.random():.1f}",
+            }
+            clone = dict(station)
+            clone["StationId"] = f"{station.get('StationId', '')}-{k}"
+            clone["StationName"] = f"{station.get('StationName', '')}{k}"
+            clone["GeoInfo"] = geo_info
+            clone["WeatherElement"] = [
+                {"ElementName": element.get("ElementName", ""),
+                 "ElementValue": values.get(element.get("ElementName"), element.get("ElementValue", ""))}
+                for element in station.get("WeatherElement", [])
+            ]
+            clone["RainfallElement"] = {"Now": {"Precipitation": round(rng.choice((0, 0, 2, 12, 55)) + rng.random(), 1)}}
+            scaled.append(clone)
+    _records(data)["Station"] = scaled
+
+def _scale_districts(data, scale):
+    """乡镇区域放大为scale倍：复制的区域名称不同，预报内容与原区域共用（只读）"""
+    for group in _records(data).get("Locations", []):
+        locations = group.get("Location", [])
+        group["Location"] = locations + [
+            dict(location, LocationName=f"{location.get('LocationName', '')}{k}")
+            for k in range(1, scale) for location in locations
+        ]
+
+def _scale_area_warnings(data, scale):
+    """各县市的预警放大为scale倍：复制的预警时段依次后移12小时，不会被当作重复预警"""
+    fmt = "%Y-%m-%d %H:%M:%S"
+    for location in _records(data).get("location", []):
+        conditions = location.get("hazardConditions", {})
+        hazards = conditions.get("hazards", [])
+        conditions["hazards"] = hazards + [
+            dict(hazard, validTime={
+                "startTime": _shift(hazard.get("validTime", {}).get("startTime", ""), timedelta(hours=12 * k), fmt),
+                "endTime": _shift(hazard.get("validTime", {}).get("endTime", ""), timedelta(hours=12 * k), fmt),
+            })
+            for k in range(1, scale) for hazard in hazards
+        ]
+
+def _scale_special_reports(data, scale):
+    records = _records(data).get("record", [])
+    _records(data)["record"] = records + [
+        dict(record, datasetInfo=dict(record.get("datasetInfo", {}),
+                                      datasetDescription=f"{record.get('datasetInfo', {}).get('datasetDescription', '')}{k}"))
+        for k in range(1, scale) for record in records
+    ]
+
+def _scale_earthquakes(data, scale, rng):
+    """地震列表放大为scale倍：发生时间分布在最近3天内，规模3.0~6.0"""
+    fmt = "%Y-%m-%d %H:%M:%S"
+    earthquakes = _records(data).get("Earthquake", [])
+    scaled = list(earthquakes)
+    for k in range(1, scale):
+        for earthquake in earthquakes:
+            info = dict(earthquake.get("EarthquakeInfo", {}))
+            info["OriginTime"] = _shift(info.get("OriginTime", ""), -timedelta(minutes=rng.randrange(0, 3 * 24 * 60)), fmt)
+            info["Magnitude"] = dict(info.get("Magnitude", {}), MagnitudeValue=round(rng.uniform(3.0, 6.0), 1))
+            scaled.append(dict(earthquake, EarthquakeNo=f"{earthquake.get('EarthquakeNo', '')}{k:03d}", EarthquakeInfo=info))
+    _records(data)["Earthquake"] = scaled
+
+def _scale_climate(data, scale, rng):
+    locations = _records(data).get("location", [])
+    scaled = list(locations)
+    for k in range(1, scale):
+        for location in locations:
+            station = dict(location.get("station", {}))
+            station["StationName"] = f"{station.get('StationName', '')}{k}"
+            value = "0" if rng.random() < 0.1 else str(rng.randrange(20, 600))
+            stats = {"AirTemperature": [{"Month": "7", "Precipitation": [{"Precipitation": "Monthly", "PrecipitationValue": value}]}]}
+            scaled.append(dict(location, station=station, stationObsStatistics=stats))
+    _records(data)["location"] = scaled
+
+
+def synthetic_payload(dataset_id, scale=1, seed=0, directory=FIXTURES_DIR):
+    """
+    生成单个数据集的合成数据
+    :param scale: 放大倍数（测站、乡镇区域、预警、地震、气候测站）；县市预报和台风路径保持原样
+    """
+    data = load_fixture(dataset_id, directory)
+    rng = random.Random(f"{seed}:{dataset_id}:{scale}")
+    if scale > 1:
+        if dataset_id in STATION_DATASETS:
+            _scale_stations(data, scale, rng)
+        elif dataset_id.startswith("F-D0047-"):
+            _scale_districts(data, scale)
+        elif dataset_id == "W-C0033-001":
+            _scale_area_warnings(data, scale)
+        elif dataset_id == "W-C0033-002":
+            _scale_special_reports(data, scale)
+        elif dataset_id in EARTHQUAKE_DATASETS:
+            _scale_earthquakes(data, scale, rng)
+        elif dataset_id == "C-B0025-001":
+            _scale_climate(data, scale, rng)
+    return data
+
+def synthetic_payloads(scale=1, seed=0, directory=FIXTURES_DIR):
+    """全部数据集的合成数据：{数据集ID: JSON字典}"""
+    return {dataset_id: synthetic_payload(dataset_id, scale, seed, directory) for dataset_id in fixture_ids(directory)}
+
+def payload_counts(payloads):
+    """合成数据的规模：测站数、乡镇区域数、预警数、地震数"""
+    counts = {"stations": 0, "districts": 0, "warnings": 0, "earthquakes": 0}
+    for dataset_id, data in payloads.items():
+        records = data.get("records", {})
+        if dataset_id in STATION_DATASETS:
+            counts["stations"] += len(records.get("Station", []))
+        elif dataset_id.startswith("F-D0047-"):
+            counts["districts"] += sum(len(group.get("Location", [])) for group in records.get("Locations", []))
+        elif dataset_id == "W-C0033-001":
+            counts["warnings"] += sum(len(loc.get("hazardConditions", {}).get("hazards", [])) for loc in records.get("location", []))
+        elif dataset_id == "W-C0033-002":
+            counts["warnings"] += len(records.get("record", []))
+        elif dataset_id in EARTHQUAKE_DATASETS:
+            counts["earthquakes"] += len(records.get("Earthquake", []))
+    return counts
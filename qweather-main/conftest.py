@@ -0,0 +1 @@
+"""pytest 配置：使 tests/ 下的测试可以直接导入 services / utils / tools"""
@@ -1,6 +1,14 @@
+import argparse
+import asyncio
 from services.cwa_weather_fetcher import fetch_weather_all
 from services.summary_builder import build_summary
-from utils.rss_writer import write_rss
+from services.http_client import close_session, get_pool_stats
+from services.async_http_client import close_async_session
+from services.ai_cache import get_ai_cache_stats, close_ai_cache
+from services.dataset_cache import get_cache_stats
+from services.instrumentation import span, reset_metrics, write_run_report
+from services.change_detector import compute_fingerprint, has_changed, save_fingerprint
+from utils.output_writers import publish_outputs
 from utils.notifier import send_bark
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -8,18 +16,85 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-if __name__ == "__main__":
+def _write_report(published):
+    """写出本次运行的计时报告（附带连接池、数据集缓存和AI缓存统计）"""
+    write_run_report(extra={
+        "published": published,
+        "pool": get_pool_stats(),
+        "datasetCache": get_cache_stats(),
+        "aiCache": get_ai_cache_stats()
+    })
+
+def run_once(reset_cache=True):
+    """获取数据、生成摘要、写入RSS并推送；数据与上次发布相同时跳过，返回是否发布"""
+    reset_metrics()
+    published = False
     try:
-        data = fetch_weather_all()
-        title, summary = build_summary(data)
+        with span("stage", "fetch"):
+            data = fetch_weather_all(reset_cache=reset_cache)
+        fingerprint = compute_fingerprint(data)
+        if not has_changed(fingerprint):
+            print("⏭️ 数据与上次发布相同，跳过AI摘要、RSS写入和推送")
+            return False
+
+        with span("stage", "summary"):
+            title, summary, fallback = build_summary(data)
 
         now = datetime.now(ZoneInfo("Asia/Taipei"))
         rss_title = f"{title}（{now.strftime('%Y-%m-%d %H:%M')}）"
 
-        write_rss(rss_title, summary)
-        send_bark(rss_title, summary)
-        print("✅ RSS 已生成")
+        with span("stage", "write"):
+            publish_outputs(rss_title, summary)
+        if fallback:
+            print("⚠️ 摘要使用了备用内容，不记录数据指纹，下次运行重新生成")
+        else:
+            save_fingerprint(fingerprint)
+        with span("stage", "notify"):
+            send_bark(rss_title, summary)
+        published = True
+        return True
+    finally:
+        _write_report(published)
+
+async def run_once_async():
+    """异步流水线版本的 run_once"""
+    from services.async_pipeline import PipelineContext, run_pipeline_async
+    reset_metrics()
+    context = PipelineContext()
+    published = False
+    try:
+        published = await run_pipeline_async(context=context) is not None
+        return published
+    finally:
+        await close_async_session()
+        with context.activate():
+            _write_report(published)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="台湾天气 RSS 推送工具")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="使用asyncio流水线（需要安装aiohttp）")
+    parser.add_argument("--daemon", action="store_true", help="常驻运行，各数据源按各自周期刷新，数据变化时重新发布")
+    args = parser.parse_args()
+
+    try:
+        if args.daemon:
+            from services.scheduler import run_daemon
+            run_daemon(lambda: run_once(reset_cache=False))
+            published = False
+        elif args.use_async:
+            published = asyncio.run(run_once_async())
+        else:
+            published = run_once()
+        if published:
+            print("✅ RSS 已生成")
     except Exception as e:
         err_msg = f"❌ 生成失败：{e}"
         send_bark("❌ RSS 生成失败", str(e))
-        print(err_msg)
\ No newline at end of file
+        print(err_msg)
+    finally:
+        stats = get_pool_stats()
+        print(f"🔗 连接池：{stats['requests']} 次请求，复用 {stats['hits']} 次，新建连接 {stats['misses']} 个")
+        ai_stats = get_ai_cache_stats()
+        print(f"🧠 AI缓存：命中 {ai_stats['hits']} 次，未命中 {ai_stats['misses']} 次")
+        close_session()
+        close_ai_cache()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI响应缓存模块
+按 (模型, 温度, 系统提示词, 用户提示词) 的哈希缓存豆包AI的返回结果，
+存储于本地SQLite，支持过期时间和按最近使用时间淘汰
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from .city_config import get_cache_dir
+
+AI_CACHE_ENABLED = os.getenv("AI_CACHE", "1") != "0"  # 设为0关闭缓存
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", str(6 * 3600)))  # 缓存有效期（秒）
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "500"))  # 最多保留的条目数
+AI_CACHE_FILE = "ai_responses.sqlite3"
+
+_lock = threading.Lock()
+_conn = None
+_stats = {"hits": 0, "misses": 0}
+
+
+def _connect():
+    """打开（必要时创建）缓存数据库"""
+    global _conn
+    if _conn is None:
+        path = os.path.join(get_cache_dir(), AI_CACHE_FILE)
+        _conn = sqlite3.connect(path, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        _conn.commit()
+    return _conn
+
+def make_cache_key(model, temperature, system_prompt, prompt):
+    """生成缓存键：请求内容的SHA-256"""
+    payload = json.dumps([model, temperature, system_prompt, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_cached_response(key):
+    """读取未过期的缓存响应，未命中时返回None"""
+    if not AI_CACHE_ENABLED:
+        return None
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connect()
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - AI_CACHE_TTL)
+            ).fetchone()
+            if row is None:
+                _stats["misses"] += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            _stats["hits"] += 1
+            return row[0]
+    except sqlite3.Error as e:
+        print(f"⚠️ 读取AI缓存失败: {e}")
+        return None
+
+def store_response(key, response):
+    """写入缓存，并淘汰过期条目和超出容量的最久未使用条目"""
+    if not AI_CACHE_ENABLED:
+        return
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - AI_CACHE_TTL,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (AI_CACHE_MAX_ENTRIES,)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ 写入AI缓存失败: {e}")
+
+def get_ai_cache_stats():
+    """获取本进程的缓存命中/未命中次数"""
+    with _lock:
+        return dict(_stats)
+
+def close_ai_cache():
+    """关闭缓存数据库连接"""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步网络请求客户端模块
+基于aiohttp（可选依赖），提供与safe_request一致的重试与SSL降级策略，
+返回的AsyncResponse与requests.Response有相同的常用接口（status_code/headers/content/json()）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from .http_client import RETRY_STATUS_CODES, ConditionalResult, _source_label, conditional_headers, record_validators
+from .instrumentation import span
+
+try:
+    import aiohttp
+except ImportError:  # 仅异步模式需要
+    aiohttp = None
+
+# 连接限制（可通过环境变量调整）
+PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "8"))  # 每个主机的最大并发连接数
+TOTAL_LIMIT = int(os.getenv("HTTP_TOTAL_LIMIT", "32"))  # 全部主机的最大并发连接数
+STATUS_RETRIES = 3  # 对RETRY_STATUS_CODES的重试次数，对应同步客户端的urllib3 Retry
+RETRY_METHODS = ("HEAD", "GET", "OPTIONS")  # 允许重试的HTTP方法
+
+_session = None
+
+
+class AsyncResponse:
+    """已读取完毕的异步响应，接口与requests.Response保持一致"""
+
+    __slots__ = ("url", "status_code", "headers", "content")
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPStatusError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HTTPStatusError(Exception):
+    """HTTP状态码错误（对应requests.exceptions.HTTPError）"""
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def _require_aiohttp():
+    if aiohttp is None:
+        raise RuntimeError("异步模式需要安装 aiohttp：pip install aiohttp")
+
+def get_async_session():
+    """获取共享的aiohttp session（首次调用时在当前事件循环中创建）"""
+    global _session
+    _require_aiohttp()
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=TOTAL_LIMIT, limit_per_host=PER_HOST_LIMIT)
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+async def close_async_session():
+    """关闭共享的aiohttp session"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+async def async_request(method, url, params=None, timeout=15, ssl=True, **kwargs):
+    """
+    发送一次异步请求（幂等方法对RETRY_STATUS_CODES按指数退避重试）
+    :return: AsyncResponse（未检查状态码）
+    """
+    session = get_async_session()
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    if params:
+        # 与requests一致：忽略值为None的查询参数
+        params = {name: value for name, value in params.items() if value is not None}
+    retries = STATUS_RETRIES if method in RETRY_METHODS else 0
+
+    for attempt in range(retries + 1):
+        async with session.request(method, url, params=params, timeout=client_timeout,
+                                   ssl=ssl, **kwargs) as resp:
+            content = await resp.read()
+            # 头部名称不区分大小写，与requests一致
+            response = AsyncResponse(str(resp.url), resp.status, resp.headers.copy(), content)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+            return response
+        await asyncio.sleep(2 ** attempt)  # 与urllib3 Retry(backoff_factor=1)相同的退避
+    return response
+
+async def async_safe_request(url, params=None, timeout=15, max_retries=2, headers=None):
+    """safe_request的异步版本：带有SSL错误处理和重试机制"""
+    _require_aiohttp()
+    with span("http", _source_label(url), retries=0) as metric:
+        response = await _request_with_retries(url, params, timeout, max_retries, headers, metric)
+        metric["status"] = response.status_code
+        metric["bytes"] = len(response.content)
+        return response
+
+async def async_conditional_request(url, params=None, timeout=15, validator_key=None, known_digest=None):
+    """
+    conditional_request的异步版本，与同步路径共用持久化的验证信息（总是完整读取响应体）
+    :return: ConditionalResult(response, digest, unchanged)
+    """
+    headers = conditional_headers(validator_key, known_digest)
+    response = await async_safe_request(url, params=params, timeout=timeout, headers=headers or None)
+    if response.status_code == 304:
+        return ConditionalResult(None, known_digest, True)
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    record_validators(validator_key, response, digest)
+    return ConditionalResult(response, digest, digest == known_digest)
+
+async def _request_with_retries(url, params, timeout, max_retries, headers, metric):
+    for attempt in range(max_retries + 1):
+        metric["retries"] = attempt
+        try:
+            response = await async_request("GET", url, params=params, timeout=timeout, headers=headers)
+            response.raise_for_status()
+            return response
+        except aiohttp.ClientSSLError as e:
+            print(f"⚠️ SSL错误 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
+            if attempt == max_retries:
+                # 最后一次尝试：仅对本次请求禁用SSL验证
+                print("🔓 最后尝试：禁用SSL验证...")
+                try:
+                    response = await async_request("GET", url, params=params, timeout=timeout,
+                                                   headers=headers, ssl=False)
+                    response.raise_for_status()
+                    return response
+                except Exception as final_e:
+                    raise Exception(f"所有重试均失败，最后错误: {final_e}")
+        except asyncio.TimeoutError as e:
+            print(f"⏰ 请求超时 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
+            if attempt == max_retries:
+                raise
+        except aiohttp.ClientConnectionError as e:
+            print(f"🔌 连接错误 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
+            if attempt == max_retries:
+                raise
+        except Exception as e:
+            print(f"❌ 未知错误 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
+            if attempt == max_retries:
+                raise
+
+        # 重试前等待
+        if attempt < max_retries:
+            await asyncio.sleep(2 ** attempt)  # 指数退避
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步天气流水线
+fetch_weather_all → build_summary → publish_outputs/send_bark 的asyncio版本，
+便于嵌入已有的asyncio服务，网络请求不占用工作线程
+
+每次运行的数据集缓存和计时事件保存在 PipelineContext 中，同一服务可并发处理多个区域
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from .city_config import CITIES
+from .change_detector import compute_fingerprint, has_changed, save_fingerprint
+from .cwa_weather_fetcher import fetch_weather_serially, print_fetch_summary
+from .dataset_cache import DatasetCache, prefetch_dataset_async, abandon_dataset, use_dataset_cache
+from .observation_history import record_observations
+from .fetch_orchestrator import plan_datasets, SOURCE_TIMEOUTS, DEFAULT_SOURCE_TIMEOUT, GLOBAL_DEADLINE
+from .instrumentation import span, use_events
+from .summary_builder import build_summary_async
+from utils.output_writers import publish_outputs
+from utils.notifier import send_bark_async
+
+
+class PipelineContext:
+    """一次异步运行的独立状态：数据集缓存和计时事件"""
+
+    def __init__(self, cache=None, events=None):
+        self.cache = DatasetCache() if cache is None else cache
+        self.events = [] if events is None else events
+
+    @contextmanager
+    def activate(self):
+        """with块内的数据集获取和计时事件都作用于本次运行"""
+        with use_dataset_cache(self.cache), use_events(self.events):
+            yield self
+
+
+async def _prefetch_dataset(dataset_id, params, timeout, cache):
+    """异步获取单个数据集并写入数据集缓存（超过单源时限按失败处理）"""
+    limit = SOURCE_TIMEOUTS.get(dataset_id, DEFAULT_SOURCE_TIMEOUT)
+    try:
+        await asyncio.wait_for(prefetch_dataset_async(dataset_id, params, timeout=timeout, cache=cache), limit)
+    except asyncio.TimeoutError:
+        print(f"⏰ {dataset_id} 超过 {limit:.0f} 秒，放弃该数据源")
+        abandon_dataset(dataset_id, params, reason=f"超过单源时限 {limit:.0f} 秒", cache=cache)
+    except Exception as e:
+        print(f"⚠️ 预取 {dataset_id} 失败: {e}")
+
+async def fetch_weather_all_async(cities=None, deadline=None, context=None):
+    """
+    fetch_weather_all 的异步版本，返回相同结构的result字典
+    :param cities: 城市配置（默认 CITIES），可用于同一服务中处理不同区域
+    :param deadline: 全局时限（秒），超时未完成的数据集按失败处理
+    :param context: 本次运行的 PipelineContext，为None时使用新的上下文（不影响进程默认的数据集缓存）
+    """
+    cities = cities or CITIES
+    context = context or PipelineContext()
+
+    with context.activate():
+        plan = plan_datasets(cities)
+        tasks = {
+            asyncio.ensure_future(_prefetch_dataset(dataset_id, params, timeout, context.cache)): (dataset_id, params)
+            for dataset_id, params, timeout in plan
+        }
+        done, pending = await asyncio.wait(tasks, timeout=deadline or GLOBAL_DEADLINE)
+        if pending:
+            for task in pending:
+                task.cancel()
+                abandon_dataset(*tasks[task], reason="超过全局时限", cache=context.cache)
+            print(f"⏰ 达到全局时限，放弃未完成的数据源：{', '.join(sorted(tasks[t][0] for t in pending))}")
+
+        # 数据集均已在缓存中，组装过程只剩解析；个别按需请求（如实时观测补充）在线程中完成
+        # （asyncio.to_thread 复制当前上下文，线程内同样使用本次运行的缓存）
+        result = await asyncio.to_thread(fetch_weather_serially, cities)
+        await asyncio.to_thread(record_observations)
+        print_fetch_summary(result)
+    return result
+
+async def run_pipeline_async(cities=None, context=None):
+    """
+    运行完整的异步流水线：获取数据、生成摘要、写入RSS并推送
+    :param context: 本次运行的 PipelineContext（运行结束后可读取其中的事件和缓存统计）
+    :return: (rss_title, summary)；数据与上次发布相同时跳过后续步骤并返回None
+    """
+    context = context or PipelineContext()
+    with context.activate():
+        with span("stage", "fetch"):
+            data = await fetch_weather_all_async(cities, context=context)
+        fingerprint = compute_fingerprint(data)
+        if not has_changed(fingerprint):
+            print("⏭️ 数据与上次发布相同，跳过AI摘要、RSS写入和推送")
+            return None
+
+        with span("stage", "summary"):
+            title, summary, fallback = await build_summary_async(data)
+
+        now = datetime.now(ZoneInfo("Asia/Taipei"))
+        rss_title = f"{title}（{now.strftime('%Y-%m-%d %H:%M')}）"
+
+        with span("stage", "write"):
+            await asyncio.to_thread(publish_outputs, rss_title, summary)
+        if fallback:
+            print("⚠️ 摘要使用了备用内容，不记录数据指纹，下次运行重新生成")
+        else:
+            save_fingerprint(fingerprint)
+        with span("stage", "notify"):
+            await send_bark_async(rss_title, summary)
+    return rss_title, summary
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+变化检测模块
+对 fetch_weather_all 的结果计算规范化指纹（忽略观测/发布时间等易变字段），
+与上次成功发布时的指纹比较，数据未变化时可跳过AI摘要、RSS写入和推送
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from .city_config import get_cache_dir
+
+# 设为1时无论数据是否变化都发布
+FORCE_PUBLISH = os.getenv("FORCE_PUBLISH", "0") == "1"
+FINGERPRINT_FILE = "last_fingerprint.json"
+
+# 只反映获取/发布时刻、不影响摘要内容的字段
+VOLATILE_FIELDS = {"obsTime", "updateTime", "issueTime", "fetchedAt"}
+
+
+def _normalize(value):
+    """递归去掉易变字段，字典按键排序，便于稳定序列化"""
+    if isinstance(value, Mapping):
+        return {
+            str(key): _normalize(item)
+            for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))
+            if key not in VOLATILE_FIELDS
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def compute_fingerprint(data):
+    """
+    计算天气数据的指纹
+    摘要中的"今日天气"依赖当天日期，因此台北日期也计入指纹，跨日后必然重新发布
+    """
+    payload = {
+        "date": datetime.now(ZoneInfo("Asia/Taipei")).date().isoformat(),
+        "data": _normalize(data)
+    }
+    serialized = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+def _fingerprint_path():
+    return os.path.join(get_cache_dir(), FINGERPRINT_FILE)
+
+def load_fingerprint():
+    """读取上次成功发布时的指纹，不存在时返回None"""
+    try:
+        with open(_fingerprint_path(), "r", encoding="utf-8") as f:
+            return json.load(f).get("fingerprint")
+    except (OSError, ValueError):
+        return None
+
+def has_changed(fingerprint):
+    """数据相对上次发布是否变化（FORCE_PUBLISH=1 时总是返回True）"""
+    if FORCE_PUBLISH:
+        return True
+    return fingerprint != load_fingerprint()
+
+def save_fingerprint(fingerprint):
+    """记录本次发布的指纹（应在RSS写入成功后调用）"""
+    path = _fingerprint_path()
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "fingerprint": fingerprint,
+                "publishedAt": datetime.now(ZoneInfo("Asia/Taipei")).isoformat()
+            }, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ 保存数据指纹失败: {e}")
@@ -14,6 +14,12 @@ load_dotenv()
 # 中央气象署 API Key
 CWA_API_KEY = os.getenv("CWA_API_KEY")
 
+# 中央气象署开放数据 API 地址（可指向本地替身服务 tools/standin_server.py）
+CWA_API_BASE = os.getenv("CWA_API_BASE", "https://opendata.cwa.gov.tw/api/v1/rest/datastore").rstrip("/")
+
+# 本地缓存目录（AI响应缓存等跨运行持久化的数据）
+CACHE_DIR = os.getenv("QWEATHER_CACHE_DIR", ".cache")
+
 # 目标城市配置
 CITIES = {
     "台北市": {
@@ -40,4 +46,9 @@ def get_all_cities():
 
 def get_cwa_api_key():
     """获取CWA API密钥"""
-    return CWA_API_KEY 
\ No newline at end of file
+    return CWA_API_KEY
+
+def get_cache_dir():
+    """获取本地缓存目录（不存在时自动创建）"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return CACHE_DIR
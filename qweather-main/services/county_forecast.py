@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+县市36小时预报模块
+一次请求获取全部县市的 F-C0032-001 预报并建立 县市→天气元素 索引
+"""
+
+from .dataset_cache import get_parsed
+
+# 全台湾县市（F-C0032-001 的 locationName）
+ALL_COUNTIES = ["臺北市", "新北市", "桃園市", "臺中市", "臺南市", "高雄市", "基隆市", "新竹市", "新竹縣", "苗栗縣", "彰化縣", "南投縣", "雲林縣", "嘉義市", "嘉義縣", "屏東縣", "宜蘭縣", "花蓮縣", "臺東縣", "澎湖縣", "金門縣", "連江縣"]
+
+def _build_county_index(data):
+    """从 F-C0032-001 全量数据构建 {县市名: weatherElement列表} 索引"""
+    index = {}
+    if data.get("success") == "true":
+        records = data.get("records", {})
+        for location in records.get("location", []):
+            location_name = location.get("locationName", "")
+            if location_name:
+                index[location_name] = location.get("weatherElement", [])
+    return index
+
+def fetch_county_forecasts(timeout=10):
+    """
+    获取全部县市36小时预报索引（不带locationName参数，一次请求返回所有县市）
+    :return: {县市名: weatherElement列表}，同一次运行内只下载和解析一次
+    """
+    return get_parsed("F-C0032-001", _build_county_index, timeout=timeout)
+
+def get_county_weather_elements(county_name, timeout=10):
+    """获取单个县市的36小时预报天气元素列表"""
+    return fetch_county_forecasts(timeout=timeout).get(county_name, [])
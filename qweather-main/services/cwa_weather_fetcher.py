@@ -5,16 +5,23 @@
 完全替代和风天气API，使用台湾官方气象数据
 """
 
+import os
 from .weather_fetcher import fetch_cwa_weather
 from .warning_fetcher import fetch_cwa_warnings
+from .fetch_orchestrator import fetch_all_concurrently
 from .city_config import CITIES
+from .dataset_cache import reset_dataset_cache, get_cache_stats
+from .observation_history import record_observations
 
-def fetch_weather_all():
-    """获取所有天气数据（完全使用中央气象署API）"""
+# 是否并发获取（设置 FETCH_CONCURRENT=0 可退回串行模式，便于排查问题）
+FETCH_CONCURRENT = os.getenv("FETCH_CONCURRENT", "1") != "0"
+
+def fetch_weather_serially(cities=None):
+    """串行获取所有城市天气与预警（不重置数据集缓存，可用于已预取数据集的组装）"""
     result = {}
 
     # 获取中央气象署天气数据
-    for city_name, city_config in CITIES.items():
+    for city_name, city_config in (cities or CITIES).items():
         try:
             weather_data = fetch_cwa_weather(city_name, city_config)
             result[city_name] = weather_data
@@ -27,13 +34,40 @@ def fetch_weather_all():
             }
 
     # 获取中央气象署预警
-    cwa_warnings = fetch_cwa_warnings()
-    result["warnings"] = cwa_warnings
+    result["warnings"] = fetch_cwa_warnings()
+    return result
+
+def fetch_weather_all(reset_cache=True, record_history=True):
+    """
+    获取所有天气数据（完全使用中央气象署API）
+    :param reset_cache: 是否清空数据集缓存；常驻模式传False，由调度器按刷新周期使各数据集失效
+    :param record_history: 是否把测站读数写入观测历史；回放归档数据时传False
+    """
+    # 每次运行使用新的数据集缓存，同一数据集只下载一次
+    if reset_cache:
+        reset_dataset_cache()
+
+    if FETCH_CONCURRENT:
+        result = fetch_all_concurrently(CITIES)
+    else:
+        result = fetch_weather_serially()
+
+    # 测站读数写入观测历史（数据集已在缓存中，不再发出请求）
+    if record_history:
+        record_observations()
+    print_fetch_summary(result)
+    return result
+
+def print_fetch_summary(result):
+    """输出预警数量和数据集缓存统计"""
+    cwa_warnings = result["warnings"]
     
     # 简化的预警信息输出
     if cwa_warnings:
         print(f"⚠️ 发现 {len(cwa_warnings)} 条天气提醒")
     else:
         print("✅ 当前无特殊天气提醒")
-    
-    return result
\ No newline at end of file
+
+    stats = get_cache_stats()
+    print(f"📦 数据集缓存：{stats['requests']} 次获取，实际下载 {stats['misses']} 次，命中率 {stats['hit_rate']:.0%}")
+    print(f"♻️ 未变化的数据集 {stats['unchanged']} 个，复用解析结果 {stats['parsed_reused']} 次")
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据集缓存模块
+同一次运行内每个CWA数据集（按数据集ID和查询参数区分）只下载一次，
+并发请求同一数据集时只发出一次网络请求；
+跨运行时按内容摘要持久化解析结果，数据未变化时直接复用
+
+缓存条目和统计保存在 DatasetCache 中，模块函数默认作用于当前上下文的缓存：
+同步流水线使用进程默认缓存，嵌入asyncio服务时每次运行可用 use_dataset_cache 指定独立的缓存，
+同时处理多个区域的运行互不覆盖
+"""
+
+import contextvars
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import types
+from contextlib import contextmanager
+from .http_client import conditional_request, get_known_digest, record_validators
+from .json_stream import get_stream_plan, parse_response
+from .async_http_client import async_conditional_request
+from .payload_archive import archive_payload, archive_unchanged, start_payload
+from .city_config import get_cwa_api_key, get_cache_dir, CWA_API_BASE
+from .instrumentation import span
+
+DATASET_PERSIST = os.getenv("DATASET_PERSIST", "1") != "0"  # 设为0关闭跨运行复用
+PERSIST_SUBDIR = "datasets"
+PARSER_VERSION = 1  # 派生结果的格式整体变化时递增，使全部持久化的parser结果失效
+
+STAT_NAMES = ("requests", "hits", "misses", "inflight_waits", "unchanged", "parsed_reused")
+
+_source = None  # 替代网络请求的数据来源（回放归档时使用）
+
+
+class _Entry:
+    """单个数据集的缓存条目，完成前其他线程在event上等待"""
+
+    __slots__ = ("event", "data", "error", "digest")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+        self.error = None
+        self.digest = None
+
+
+class DatasetCache:
+    """一次运行的数据集缓存：条目、派生结果和统计"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.parsed = {}
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+
+_default_cache = DatasetCache()
+_current_cache = contextvars.ContextVar("dataset_cache", default=None)
+
+
+def current_dataset_cache():
+    """当前上下文使用的数据集缓存（未指定时为进程默认缓存）"""
+    return _current_cache.get() or _default_cache
+
+@contextmanager
+def use_dataset_cache(cache):
+    """
+    在with块内（包括其中创建的asyncio任务和 asyncio.to_thread 调用）使用指定的数据集缓存
+    线程池中的任务不继承上下文，需要在任务内再次指定
+    """
+    token = _current_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _current_cache.reset(token)
+
+def _resolve(cache):
+    return current_dataset_cache() if cache is None else cache
+
+def _finish(cache, entry, data=None, error=None, digest=None):
+    """完成缓存条目并唤醒等待者；已被放弃(abandon)的条目保持失败状态"""
+    with cache.lock:
+        if entry.event.is_set():
+            return
+        entry.data = data
+        entry.error = error
+        entry.digest = digest
+        entry.event.set()
+
+def _make_key(dataset_id, params):
+    """生成缓存键：(数据集ID, 排序后的查询参数)"""
+    items = []
+    for name, value in sorted((params or {}).items()):
+        if isinstance(value, (list, tuple)):
+            value = tuple(value)
+        items.append((name, value))
+    return dataset_id, tuple(items)
+
+def _storage_name(key):
+    """持久化文件名/验证信息键：由缓存键哈希得到，不包含API Key"""
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+
+def _persist_path(name, suffix):
+    directory = os.path.join(get_cache_dir(), PERSIST_SUBDIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{name}.{suffix}.pickle")
+
+def _load_persisted(name, suffix, digest):
+    """读取持久化结果，仅当其摘要与当前数据一致时返回 (True, 值)"""
+    try:
+        with open(_persist_path(name, suffix), "rb") as f:
+            stored = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return False, None
+    if stored.get("digest") != digest:
+        return False, None
+    return True, stored["value"]
+
+def _save_persisted(name, suffix, digest, value):
+    """原子写入持久化结果（每个数据集/parser只保留最新一份）"""
+    path = _persist_path(name, suffix)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"digest": digest, "value": value}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except (OSError, pickle.PicklingError, TypeError) as e:
+        print(f"⚠️ 保存数据集缓存失败: {e}")
+
+def _hash_code(code, digest):
+    """字节码、常量（含嵌套函数）和引用的名称"""
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode("utf-8"))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(const, digest)
+        else:
+            digest.update(repr(const).encode("utf-8"))
+
+def _hash_value(value, digest):
+    """闭包变量：函数按代码计入，简单值按repr计入，其他对象只计入类型（repr可能含内存地址）"""
+    code = getattr(value, "__code__", None)
+    if code is not None:
+        _hash_code(code, digest)
+    elif isinstance(value, (str, bytes, int, float, bool, tuple, frozenset, type(None))):
+        digest.update(repr(value).encode("utf-8"))
+    else:
+        digest.update(type(value).__qualname__.encode("utf-8"))
+
+@functools.lru_cache(maxsize=None)
+def _module_digest(module_name):
+    """定义parser的模块源文件摘要（模块级的规则表、阈值等修改后同样失效）"""
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (OSError, TypeError):
+        return ""
+
+@functools.lru_cache(maxsize=None)
+def _parser_id(parser):
+    """
+    parser的持久化标识：模块名+限定名+摘要，修改parser代码（含常量和闭包）、所在模块源文件、
+    PARSER_VERSION 或 parser 的 PARSER_VERSION 属性后旧结果自动失效
+    """
+    digest = hashlib.sha1(f"{PARSER_VERSION}:{getattr(parser, 'PARSER_VERSION', '')}".encode("utf-8"))
+    code = getattr(parser, "__code__", None)
+    if code is not None:
+        _hash_code(code, digest)
+    for cell in getattr(parser, "__closure__", None) or ():
+        _hash_value(cell.cell_contents, digest)
+    digest.update(_module_digest(parser.__module__).encode("utf-8"))
+    return f"{parser.__module__}.{parser.__qualname__}.{digest.hexdigest()[:8]}"
+
+def _read_response(dataset_id, params, validator_key, result):
+    """
+    读取响应体：大型数据集在安装ijson时边下载边解析并精简列表项；原始内容同时写入归档
+    :return: (JSON字典, 内容摘要)
+    """
+    plan = get_stream_plan(dataset_id)
+    with span("decode", dataset_id, stream=plan is not None and result.digest is None):
+        if plan is None or result.digest is not None:
+            archive_payload(dataset_id, params, result.response.content)
+            return result.response.json(), result.digest
+        pending = start_payload(dataset_id, params)
+        data, digest = parse_response(result.response, *plan, sink=pending)
+    if pending is not None:
+        pending.commit()
+    record_validators(validator_key, result.response, digest)
+    return data, digest
+
+def _plan_request(dataset_id, params, key):
+    """
+    条件请求的参数
+    :return: (URL, 查询参数, 验证信息键, 本地已保存内容的摘要)；本地没有可复用的JSON时摘要为None
+    """
+    url, query = build_dataset_request(dataset_id, params)
+    name = _storage_name(key)
+    known_digest = get_known_digest(name) if DATASET_PERSIST else None
+    if known_digest and not os.path.exists(_persist_path(name, "payload")):
+        known_digest = None
+    return url, query, name, known_digest
+
+def _reuse_unchanged(cache, dataset_id, params, name, digest, metric):
+    """数据未变化（304）时读取上次解析的JSON，返回 (是否可用, JSON字典)"""
+    found, data = _load_persisted(name, "payload", digest)
+    if found:
+        cache.count("unchanged")
+        metric["cache"] = "unchanged"
+        archive_unchanged(dataset_id, params, digest)
+    return found, data
+
+def _store_payload(cache, name, data, digest, known_digest, stored_ok, metric):
+    """保存新下载的JSON；流式解析后才知道内容未变化时本地数据已是最新，只计入统计"""
+    if not DATASET_PERSIST:
+        return
+    if digest == known_digest and stored_ok:
+        cache.count("unchanged")
+        metric["cache"] = "unchanged"
+    else:
+        _save_persisted(name, "payload", digest, data)
+
+def _download(cache, dataset_id, params, key, timeout, metric):
+    """
+    发起条件请求；数据未变化且本地有上次解析的JSON时直接复用
+    :param metric: 统计字段，复用本地数据时 cache 记为 unchanged
+    :return: (JSON字典, 内容摘要)
+    """
+    if _source is not None:
+        metric["cache"] = "source"
+        return _source(dataset_id, params)
+
+    url, query, name, known_digest = _plan_request(dataset_id, params, key)
+    stream = get_stream_plan(dataset_id) is not None
+    result = conditional_request(
+        url, params=query, timeout=timeout, validator_key=name, known_digest=known_digest, stream=stream
+    )
+    stored_ok = True
+    if result.unchanged:
+        stored_ok, data = _reuse_unchanged(cache, dataset_id, params, name, result.digest, metric)
+        if stored_ok:
+            return data, result.digest
+        if result.response is None:
+            # 304但本地数据已损坏：去掉验证信息重新完整请求
+            result = conditional_request(url, params=query, timeout=timeout, validator_key=name, stream=stream)
+
+    data, digest = _read_response(dataset_id, params, name, result)
+    _store_payload(cache, name, data, digest, known_digest, stored_ok, metric)
+    return data, digest
+
+async def _download_async(cache, dataset_id, params, key, timeout, metric):
+    """_download 的异步版本（完整读取响应体后解析），与同步路径共用验证信息和持久化的JSON"""
+    if _source is not None:
+        metric["cache"] = "source"
+        return _source(dataset_id, params)
+
+    url, query, name, known_digest = _plan_request(dataset_id, params, key)
+    result = await async_conditional_request(
+        url, params=query, timeout=timeout, validator_key=name, known_digest=known_digest
+    )
+    stored_ok = True
+    if result.unchanged:
+        stored_ok, data = _reuse_unchanged(cache, dataset_id, params, name, result.digest, metric)
+        if stored_ok:
+            return data, result.digest
+        if result.response is None:
+            result = await async_conditional_request(url, params=query, timeout=timeout, validator_key=name)
+
+    data, digest = _read_response(dataset_id, params, name, result)
+    _store_payload(cache, name, data, digest, known_digest, stored_ok, metric)
+    return data, digest
+
+def build_dataset_request(dataset_id, params=None):
+    """构建数据集请求的URL和查询参数"""
+    query = {
+        "Authorization": get_cwa_api_key(),
+        "format": "JSON"
+    }
+    query.update(params or {})
+    return f"{CWA_API_BASE}/{dataset_id}", query
+
+def _claim(cache, key):
+    """
+    取得缓存条目
+    :return: (条目, 是否由调用方负责获取)
+    """
+    with cache.lock:
+        cache.stats["requests"] += 1
+        entry = cache.entries.get(key)
+        if entry is None:
+            entry = cache.entries[key] = _Entry()
+            cache.stats["misses"] += 1
+            return entry, True
+        if entry.event.is_set():
+            cache.stats["hits"] += 1
+        else:
+            cache.stats["inflight_waits"] += 1
+        return entry, False
+
+def fetch_dataset(dataset_id, params=None, timeout=15):
+    """
+    获取CWA数据集的JSON内容（本次运行内缓存）
+    :param dataset_id: 数据集ID，如 F-C0032-001
+    :param params: 额外查询参数（无需包含Authorization和format）
+    :param timeout: 请求超时秒数
+    :return: 解析后的JSON字典；请求失败时抛出异常（失败结果同样缓存，避免重复超时）
+    数据与上次运行相同时（304或内容摘要一致）直接复用上次解析的JSON
+    """
+    cache = current_dataset_cache()
+    key = _make_key(dataset_id, params)
+    entry, owner = _claim(cache, key)
+
+    if owner:
+        with span("dataset", dataset_id, cache="downloaded") as metric:
+            try:
+                data, digest = _download(cache, dataset_id, params, key, timeout, metric)
+                _finish(cache, entry, data=data, digest=digest)
+            except Exception as e:
+                metric["error"] = type(e).__name__
+                _finish(cache, entry, error=e)
+    else:
+        with span("dataset", dataset_id, cache="hit" if entry.event.is_set() else "wait"):
+            entry.event.wait()
+
+    if entry.error is not None:
+        raise entry.error
+    return entry.data
+
+async def prefetch_dataset_async(dataset_id, params=None, timeout=15, cache=None):
+    """
+    异步获取数据集并写入缓存（条件请求、持久化复用与 fetch_dataset 相同），之后的fetch_dataset直接命中
+    已有条目（已完成、进行中或已放弃）时不再请求；失败时条目记录异常并继续抛出
+    """
+    cache = _resolve(cache)
+    key = _make_key(dataset_id, params)
+    entry, owner = _claim(cache, key)
+    if not owner:
+        return
+    with span("dataset", dataset_id, cache="downloaded") as metric:
+        try:
+            data, digest = await _download_async(cache, dataset_id, params, key, timeout, metric)
+        except BaseException as e:
+            # 取消（全局时限）时同样结束条目，避免等待者一直阻塞
+            metric["error"] = type(e).__name__
+            _finish(cache, entry, error=e if isinstance(e, Exception) else TimeoutError(f"{dataset_id} 已取消"))
+            raise
+        _finish(cache, entry, data=data, digest=digest)
+
+def get_parsed(dataset_id, parser, params=None, timeout=15, persist=True):
+    """
+    获取数据集经parser处理后的结果（本次运行内按数据集和parser缓存）
+    适用于多个模块共用的索引/派生结构，避免重复解析同一份数据
+    :param parser: 接收JSON字典并返回派生结果的函数
+    :param persist: 是否跨运行按内容摘要复用结果；结果依赖当前时间等外部状态的parser应设为False
+                    （回放归档数据时只读取已保存的结果，不写入）
+    """
+    cache = current_dataset_cache()
+    dataset_key = _make_key(dataset_id, params)
+    key = (dataset_key, parser)
+    with cache.lock:
+        if key in cache.parsed:
+            return cache.parsed[key]
+
+    data = fetch_dataset(dataset_id, params, timeout=timeout)
+    with cache.lock:
+        entry = cache.entries.get(dataset_key)
+        digest = entry.digest if entry is not None else None
+
+    with span("parse", f"{dataset_id}/{parser.__name__}", cache="computed") as metric:
+        if persist and DATASET_PERSIST and digest:
+            name, suffix = _storage_name(dataset_key), _parser_id(parser)
+            found, result = _load_persisted(name, suffix, digest)
+            if found:
+                cache.count("parsed_reused")
+                metric["cache"] = "persisted"
+            else:
+                result = parser(data)
+                if _source is None:
+                    _save_persisted(name, suffix, digest, result)
+        else:
+            result = parser(data)
+
+    with cache.lock:
+        return cache.parsed.setdefault(key, result)
+
+def prime_dataset(dataset_id, params=None, data=None, error=None, digest=None, cache=None):
+    """
+    写入由外部获取的数据集结果，之后的fetch_dataset直接命中
+    已完成的条目不会被覆盖；提供digest（原始内容的SHA-256）时get_parsed可跨运行复用结果
+    """
+    cache = _resolve(cache)
+    key = _make_key(dataset_id, params)
+    with cache.lock:
+        entry = cache.entries.get(key)
+        if entry is None:
+            entry = cache.entries[key] = _Entry()
+            cache.stats["misses"] += 1
+    _finish(cache, entry, data=data, error=error, digest=digest)
+
+def is_dataset_ready(dataset_id, params=None, cache=None):
+    """数据集是否已完成获取（成功或失败）"""
+    cache = _resolve(cache)
+    with cache.lock:
+        entry = cache.entries.get(_make_key(dataset_id, params))
+    return entry is not None and entry.event.is_set()
+
+def abandon_dataset(dataset_id, params=None, reason="超过时限", cache=None):
+    """
+    放弃仍在进行中的数据集请求：等待者立即收到TimeoutError，
+    后台请求完成后的结果也不再采用（本次运行内）
+    :return: 是否确实放弃了一个进行中的请求
+    """
+    cache = _resolve(cache)
+    key = _make_key(dataset_id, params)
+    with cache.lock:
+        entry = cache.entries.get(key)
+        if entry is None:
+            entry = cache.entries[key] = _Entry()
+        elif entry.event.is_set():
+            return False
+        entry.error = TimeoutError(f"{dataset_id} {reason}")
+        entry.event.set()
+    return True
+
+def abandon_pending(reason="超过全局时限", cache=None):
+    """放弃所有仍在进行中的数据集请求，返回被放弃的数据集ID列表"""
+    cache = _resolve(cache)
+    abandoned = []
+    with cache.lock:
+        for (dataset_id, _), entry in cache.entries.items():
+            if not entry.event.is_set():
+                entry.error = TimeoutError(f"{dataset_id} {reason}")
+                entry.event.set()
+                abandoned.append(dataset_id)
+    return abandoned
+
+def invalidate_dataset(dataset_id, cache=None):
+    """
+    使某个数据集（所有查询参数）的本进程缓存和派生结果失效，下次获取时重新请求
+    常驻模式下按各数据源的刷新周期调用；进行中的请求不受影响
+    :return: 被移除的条目数
+    """
+    cache = _resolve(cache)
+    with cache.lock:
+        keys = [key for key, entry in cache.entries.items() if key[0] == dataset_id and entry.event.is_set()]
+        for key in keys:
+            del cache.entries[key]
+        for parsed_key in [k for k in cache.parsed if k[0] in keys]:
+            del cache.parsed[parsed_key]
+    return len(keys)
+
+def set_dataset_source(source):
+    """
+    设置替代网络请求的数据来源（如回放归档），传None恢复网络请求
+    :param source: 接收 (数据集ID, 查询参数) 并返回 (JSON字典, 内容摘要) 的函数，没有数据时抛出异常
+    """
+    global _source
+    _source = source
+
+def invalidate_failed(cache=None):
+    """移除失败或被放弃的条目，使其在下一轮重新请求，返回对应的数据集ID列表"""
+    cache = _resolve(cache)
+    with cache.lock:
+        keys = [key for key, entry in cache.entries.items() if entry.event.is_set() and entry.error is not None]
+        for key in keys:
+            del cache.entries[key]
+    return [key[0] for key in keys]
+
+def cached_dataset_ids(cache=None):
+    """当前缓存中的数据集ID（去重）"""
+    cache = _resolve(cache)
+    with cache.lock:
+        return sorted({key[0] for key in cache.entries})
+
+def reset_dataset_cache(cache=None):
+    """清空缓存和统计（新一轮运行开始时调用）"""
+    cache = _resolve(cache)
+    with cache.lock:
+        cache.entries.clear()
+        cache.parsed.clear()
+        for name in cache.stats:
+            cache.stats[name] = 0
+
+def get_cache_stats(cache=None):
+    """获取缓存统计：总请求数、命中数、网络请求数、等待进行中请求的次数、
+    未变化的数据集数、复用的解析结果数及命中率"""
+    cache = _resolve(cache)
+    with cache.lock:
+        stats = dict(cache.stats)
+    served = stats["hits"] + stats["inflight_waits"]
+    stats["hit_rate"] = served / stats["requests"] if stats["requests"] else 0.0
+    return stats
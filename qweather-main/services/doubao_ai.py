@@ -1,17 +1,15 @@
-import requests
 import os
+from services.http_client import get_session
+from services.async_http_client import async_request
+from services.ai_cache import make_cache_key, get_cached_response, store_response
+from services.instrumentation import span
 
 DOUBAO_API_KEY = os.getenv("DOUBAO_API_KEY")
-DOUBAO_API_URL = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
+DOUBAO_API_URL = os.getenv("DOUBAO_API_URL", "https://ark.cn-beijing.volces.com/api/v3/chat/completions")
+SYSTEM_PROMPT = "你是一个专业的气象摘要助手，请将多条天气预警合并为简明、无重复的摘要，相同类型预警只保留一条。"
 
-def call_doubao_ai(prompt, model="doubao-seed-1-6-flash-250615", temperature=0.2):
-    """
-    调用火山引擎豆包大模型进行摘要/合成
-    :param prompt: 输入的文本内容
-    :param model: 使用的模型名称
-    :param temperature: 采样温度
-    :return: AI返回的摘要文本
-    """
+def _build_request(prompt, model, temperature):
+    """构建请求头和请求体（同步与异步调用共用）"""
     headers = {
         "Authorization": f"Bearer {DOUBAO_API_KEY}",
         "Content-Type": "application/json"
@@ -19,17 +17,60 @@ def call_doubao_ai(prompt, model="doubao-seed-1-6-flash-250615", temperature=0.2
     data = {
         "model": model,
         "messages": [
-            {"role": "system", "content": "你是一个专业的气象摘要助手，请将多条天气预警合并为简明、无重复的摘要，相同类型预警只保留一条。"},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
         "temperature": temperature
     }
-    try:
-        resp = requests.post(DOUBAO_API_URL, headers=headers, json=data, timeout=20)
+    return headers, data
+
+def call_doubao_ai(prompt, model="doubao-seed-1-6-flash-250615", temperature=0.2):
+    """
+    调用火山引擎豆包大模型进行摘要/合成
+    :param prompt: 输入的文本内容
+    :param model: 使用的模型名称
+    :param temperature: 采样温度
+    :return: AI返回的摘要文本（相同请求优先使用本地缓存）
+    """
+    with span("ai", model, cache="hit") as metric:
+        cache_key = make_cache_key(model, temperature, SYSTEM_PROMPT, prompt)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        metric["cache"] = "miss"
+        headers, data = _build_request(prompt, model, temperature)
+        try:
+            resp = get_session().post(DOUBAO_API_URL, headers=headers, json=data, timeout=20)
+            metric["status"] = resp.status_code
+            metric["bytes"] = len(resp.content)
+            resp.raise_for_status()
+            result = resp.json()
+            content = result["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise
+        store_response(cache_key, content)
+        return content
+
+async def call_doubao_ai_async(prompt, model="doubao-seed-1-6-flash-250615", temperature=0.2):
+    """
+    call_doubao_ai的异步版本，参数与返回值相同（共用同一份缓存）
+    """
+    with span("ai", model, cache="hit") as metric:
+        cache_key = make_cache_key(model, temperature, SYSTEM_PROMPT, prompt)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        metric["cache"] = "miss"
+        headers, data = _build_request(prompt, model, temperature)
+        resp = await async_request("POST", DOUBAO_API_URL, headers=headers, json=data, timeout=20)
+        metric["status"] = resp.status_code
+        metric["bytes"] = len(resp.content)
         resp.raise_for_status()
         result = resp.json()
-        return result["choices"][0]["message"]["content"]
-    except Exception as e:
-        raise
+        content = result["choices"][0]["message"]["content"]
+        store_response(cache_key, content)
+        return content
 
 # 模块功能：调用豆包AI进行天气预警摘要
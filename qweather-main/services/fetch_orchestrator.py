@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发获取协调模块
+用有界线程池并发预取本次运行需要的全部数据集，同时并发组装各城市天气和预警，
+总耗时取决于最慢的数据源而不是所有数据源耗时之和
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .dataset_cache import fetch_dataset, is_dataset_ready, abandon_dataset, abandon_pending
+from .weather_fetcher import fetch_cwa_weather
+from .warning_fetcher import fetch_cwa_warnings, WARNING_DATASETS
+
+MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))  # 线程池大小
+GLOBAL_DEADLINE = float(os.getenv("FETCH_DEADLINE", "120"))  # 整体时限（秒）
+DEFAULT_SOURCE_TIMEOUT = float(os.getenv("FETCH_SOURCE_TIMEOUT", "45"))  # 单个数据源时限（秒）
+GRACE_PERIOD = 5  # 放弃慢数据源后，等待各组装任务收尾的时间（秒）
+
+# 个别数据源的时限（秒），未列出的使用 DEFAULT_SOURCE_TIMEOUT
+SOURCE_TIMEOUTS = {
+    "O-A0002-001": 60,  # 全台测站数据量较大
+    "O-A0003-001": 60,
+}
+
+
+def plan_datasets(cities):
+    """
+    列出本次运行需要预取的数据集
+    :return: [(数据集ID, 查询参数, 请求超时)]，按ID去重
+    """
+    plan = [("F-C0032-001", None, 10)]
+    plan += [(config["dataset_id"], None, 10) for config in cities.values()]
+    plan += [(dataset_id, None, timeout) for dataset_id, timeout in WARNING_DATASETS]
+
+    seen = set()
+    unique = []
+    for dataset_id, params, timeout in plan:
+        if dataset_id not in seen:
+            seen.add(dataset_id)
+            unique.append((dataset_id, params, timeout))
+    return unique
+
+def _prefetch(dataset_id, params, timeout, started):
+    """预取单个数据集，记录开始时间供单源时限判断"""
+    started[dataset_id] = time.monotonic()
+    try:
+        fetch_dataset(dataset_id, params, timeout=timeout)
+    except Exception as e:
+        print(f"⚠️ 预取 {dataset_id} 失败: {e}")
+
+def _empty_city_data():
+    return {
+        "hourly": [],
+        "weekly": [],
+        "now": {}
+    }
+
+def fetch_all_concurrently(cities, max_workers=None, deadline=None):
+    """
+    并发获取所有城市天气与预警，返回与串行版本相同结构的result字典
+
+    部分结果策略：超过单源时限或全局时限的数据集被放弃，依赖它的环节按获取失败处理
+    （城市数据为空结构，对应预警段落跳过），其余数据照常返回。
+    """
+    max_workers = max_workers or MAX_WORKERS
+    deadline_at = time.monotonic() + (deadline or GLOBAL_DEADLINE)
+    plan = plan_datasets(cities)
+    started = {}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cwa-fetch")
+    try:
+        # 预取任务先提交，保证组装任务等待的请求一定已在队列中
+        prefetch = {
+            executor.submit(_prefetch, dataset_id, params, timeout, started): (dataset_id, params)
+            for dataset_id, params, timeout in plan
+        }
+        city_futures = {
+            executor.submit(fetch_cwa_weather, city_name, city_config): city_name
+            for city_name, city_config in cities.items()
+        }
+        warnings_future = executor.submit(fetch_cwa_warnings)
+
+        assembly = set(city_futures) | {warnings_future}
+        pending = set(prefetch) | assembly
+        while pending & assembly:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=min(remaining, 0.5), return_when=FIRST_COMPLETED)
+
+            # 单数据源时限：放弃超时的进行中请求
+            now = time.monotonic()
+            for future in pending & set(prefetch):
+                dataset_id, params = prefetch[future]
+                started_at = started.get(dataset_id)
+                limit = SOURCE_TIMEOUTS.get(dataset_id, DEFAULT_SOURCE_TIMEOUT)
+                if started_at is not None and now - started_at > limit:
+                    if abandon_dataset(dataset_id, params, reason=f"超过单源时限 {limit:.0f} 秒"):
+                        print(f"⏰ {dataset_id} 超过 {limit:.0f} 秒，放弃该数据源")
+
+        if pending & assembly:
+            # 全局时限到达：放弃所有未完成的数据集，让组装任务以部分数据收尾
+            for dataset_id, params in prefetch.values():
+                if not is_dataset_ready(dataset_id, params):
+                    abandon_dataset(dataset_id, params, reason="超过全局时限")
+            abandoned = abandon_pending()
+            print(f"⏰ 达到全局时限，放弃未完成的数据源：{', '.join(sorted(set(abandoned))) or '无'}")
+            wait(assembly, timeout=GRACE_PERIOD)
+
+        result = {}
+        for future, city_name in city_futures.items():
+            try:
+                result[city_name] = future.result(timeout=0)
+            except Exception as e:
+                print(f"获取{city_name}天气数据失败: {e}")
+                result[city_name] = _empty_city_data()
+
+        try:
+            result["warnings"] = warnings_future.result(timeout=0)
+        except Exception as e:
+            print(f"获取预警信息失败: {e}")
+            result["warnings"] = []
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return result
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预报时间序列模块
+以规范化的预报时间为键索引各时段预报，合并Wx/MaxT/MinT/PoP及乡镇预报元素时按时间O(1)定位，
+各时段为 HourlyForecast 记录，最终直接作为 summary_builder 使用的 hourly 列表
+"""
+
+from datetime import datetime, timedelta, timezone
+from .records import HourlyForecast
+
+TAIPEI_TZ = timezone(timedelta(hours=8))
+
+
+def normalize_time(value):
+    """
+    将CWA的两种时间格式统一为 "YYYY-MM-DD HH:MM:SS"（台北时间）
+    - 36小时预报：2025-07-30 12:00:00
+    - 乡镇预报：2025-07-30T12:00:00+08:00
+    无法识别时原样返回
+    """
+    if not value or len(value) < 19 or value[10] not in "T ":
+        return value
+    offset = value[19:]
+    if offset and offset not in ("+08:00", "+0800"):
+        try:
+            dt = datetime.fromisoformat(value).astimezone(TAIPEI_TZ)
+            return dt.strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return value
+    return f"{value[:10]} {value[11:19]}"
+
+
+class ForecastSeries:
+    """按预报时间索引的预报序列，保持时段的插入顺序"""
+
+    __slots__ = ("_points",)
+
+    def __init__(self):
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, fx_time):
+        return normalize_time(fx_time) in self._points
+
+    def get(self, fx_time):
+        """按时间获取时段，不存在时返回None"""
+        return self._points.get(normalize_time(fx_time))
+
+    def get_or_create(self, fx_time):
+        """按时间获取时段，不存在时新建"""
+        key = normalize_time(fx_time)
+        point = self._points.get(key)
+        if point is None:
+            point = HourlyForecast(fxTime=key)
+            self._points[key] = point
+        return point
+
+    def update(self, fx_time, **fields):
+        """更新已存在时段的字段，时段不存在时忽略，返回是否更新"""
+        point = self._points.get(normalize_time(fx_time))
+        if point is None:
+            return False
+        for name, value in fields.items():
+            point.set(name, value)
+        return True
+
+    def points(self):
+        return list(self._points.values())
+
+    def to_hourly(self):
+        """导出为hourly列表（HourlyForecast记录，可按 {"fxTime", "text", "icon", "temp", ...} 字典读取）"""
+        return list(self._points.values())
@@ -2,57 +2,182 @@
 # -*- coding: utf-8 -*-
 """
 网络请求客户端模块
-提供robust session和safe request功能
+提供进程级共享的连接池session和safe request功能
 """
 
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
 import requests
-import ssl
 import urllib3
 from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from urllib3.util.retry import Retry
+from .instrumentation import span
 
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# 连接池配置（可通过环境变量调整）
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "8"))  # 缓存的主机连接池数量
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "8"))  # 每个主机保留的最大连接数
+POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "0") == "1"  # 连接数达到上限时是否阻塞等待
+
+# 需要重试的HTTP状态码（同步与异步客户端共用）
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# 条件请求验证信息（ETag/Last-Modified/内容摘要）的持久化文件
+VALIDATORS_FILE = "http_validators.json"
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_pool_stats = {"requests": 0, "new_connections": 0}
+_validators = None
+_validators_lock = threading.Lock()
+
+# 条件请求结果：response为None表示304未修改；unchanged表示内容摘要与上次相同
+ConditionalResult = namedtuple("ConditionalResult", ["response", "digest", "unchanged"])
+
+
+def _count(key):
+    with _stats_lock:
+        _pool_stats[key] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    """统计连接复用情况的HTTP连接池"""
+
+    def _get_conn(self, timeout=None):
+        _count("requests")
+        return super()._get_conn(timeout=timeout)
+
+    def _new_conn(self):
+        _count("new_connections")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """统计连接复用情况的HTTPS连接池"""
+
+    def _get_conn(self, timeout=None):
+        _count("requests")
+        return super()._get_conn(timeout=timeout)
+
+    def _new_conn(self):
+        _count("new_connections")
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """使用计数连接池的适配器"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
 def create_robust_session():
-    """创建一个具有重试机制和SSL配置的requests session"""
+    """创建一个具有重试机制、连接池和SSL配置的requests session"""
     session = requests.Session()
-    
+
     # 配置重试策略
     retry_strategy = Retry(
         total=3,  # 总重试次数
         backoff_factor=1,  # 重试间隔
-        status_forcelist=[429, 500, 502, 503, 504],  # 需要重试的HTTP状态码
+        status_forcelist=RETRY_STATUS_CODES,  # 需要重试的HTTP状态码
         allowed_methods=["HEAD", "GET", "OPTIONS"]  # 允许重试的HTTP方法
     )
-    
-    # 创建适配器
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+
+    # 创建适配器（按主机复用keep-alive连接）
+    adapter = _PooledAdapter(
+        max_retries=retry_strategy,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=POOL_BLOCK
+    )
     session.mount("http://", adapter)
     session.mount("https://", adapter)
-    
+
     # 设置SSL配置
     session.verify = True  # 验证SSL证书
-    
+
     return session
 
-def safe_request(url, params=None, timeout=15, max_retries=2):
-    """安全的HTTP请求，带有SSL错误处理和重试机制"""
-    session = create_robust_session()
-    
+def get_session():
+    """获取进程级共享session（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_robust_session()
+    return _session
+
+def close_session():
+    """关闭共享session并释放所有连接，下次调用get_session时重新创建"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def get_pool_stats():
+    """获取连接池统计：请求数、新建连接数(miss)和复用连接数(hit)"""
+    with _stats_lock:
+        requests_count = _pool_stats["requests"]
+        misses = _pool_stats["new_connections"]
+    return {
+        "requests": requests_count,
+        "hits": max(requests_count - misses, 0),
+        "misses": misses
+    }
+
+def _source_label(url):
+    """统计用的数据源名称：URL最后一段路径（CWA为数据集ID），不含查询参数"""
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1] or urlsplit(url).netloc
+
+def _response_metrics(metric, response, stream):
+    """补充状态码、字节数，以及urllib3 Retry内部已做的重试次数"""
+    metric["status"] = response.status_code
+    if stream:
+        length = response.headers.get("Content-Length")
+        metric["bytes"] = int(length) if length and length.isdigit() else None
+    else:
+        metric["bytes"] = len(response.content)
+    retries = getattr(response.raw, "retries", None)
+    if retries is not None:
+        metric["retries"] += len(retries.history)
+
+def safe_request(url, params=None, timeout=15, max_retries=2, headers=None, stream=False):
+    """安全的HTTP请求，带有SSL错误处理和重试机制（stream=True时响应体由调用方边读边处理）"""
+    with span("http", _source_label(url), retries=0) as metric:
+        response = _request_with_retries(url, params, timeout, max_retries, headers, stream, metric)
+        _response_metrics(metric, response, stream)
+        return response
+
+def _request_with_retries(url, params, timeout, max_retries, headers, stream, metric):
+    session = get_session()
+
     for attempt in range(max_retries + 1):
+        metric["retries"] = attempt
         try:
-            response = session.get(url, params=params, timeout=timeout)
+            response = session.get(url, params=params, timeout=timeout, headers=headers, stream=stream)
             response.raise_for_status()
             return response
         except requests.exceptions.SSLError as e:
             print(f"⚠️ SSL错误 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
             if attempt == max_retries:
-                # 最后一次尝试：禁用SSL验证
+                # 最后一次尝试：仅对本次请求禁用SSL验证，不影响共享session
                 print("🔓 最后尝试：禁用SSL验证...")
-                session.verify = False
                 try:
-                    response = session.get(url, params=params, timeout=timeout)
+                    response = session.get(url, params=params, timeout=timeout, headers=headers, stream=stream, verify=False)
                     response.raise_for_status()
                     return response
                 except Exception as final_e:
@@ -69,10 +194,81 @@ def safe_request(url, params=None, timeout=15, max_retries=2):
             print(f"❌ 未知错误 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
             if attempt == max_retries:
                 raise
-        
+
         # 重试前等待
         if attempt < max_retries:
-            import time
             time.sleep(2 ** attempt)  # 指数退避
-    
-    session.close() 
\ No newline at end of file
+
+def _validators_path():
+    from .city_config import get_cache_dir
+    return os.path.join(get_cache_dir(), VALIDATORS_FILE)
+
+def _load_validators():
+    """读取持久化的验证信息（调用方需持有_validators_lock）"""
+    global _validators
+    if _validators is None:
+        try:
+            with open(_validators_path(), "r", encoding="utf-8") as f:
+                _validators = json.load(f)
+        except (OSError, ValueError):
+            _validators = {}
+    return _validators
+
+def _save_validators():
+    """原子写入验证信息（调用方需持有_validators_lock）"""
+    path = _validators_path()
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_validators, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ 保存条件请求验证信息失败: {e}")
+
+def get_known_digest(validator_key):
+    """获取上次请求记录的内容摘要，没有记录时返回None"""
+    with _validators_lock:
+        return _load_validators().get(validator_key, {}).get("digest")
+
+def record_validators(validator_key, response, digest):
+    """记录响应的ETag/Last-Modified和内容摘要，供下次条件请求使用"""
+    with _validators_lock:
+        _load_validators()[validator_key] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "digest": digest
+        }
+        _save_validators()
+
+def conditional_headers(validator_key, known_digest):
+    """条件请求头：只有调用方本地内容的摘要与记录一致时才发送If-None-Match/If-Modified-Since"""
+    with _validators_lock:
+        record = dict(_load_validators().get(validator_key, {}))
+
+    headers = {}
+    if known_digest and record.get("digest") == known_digest:
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+    return headers
+
+def conditional_request(url, params=None, timeout=15, validator_key=None, known_digest=None, stream=False):
+    """
+    带持久化验证信息的条件请求
+    :param validator_key: 验证信息的存储键（不应包含API Key等敏感信息）
+    :param known_digest: 调用方本地已保存内容的摘要；只有与记录一致时才发送If-None-Match/If-Modified-Since
+    :param stream: 为True时不读取响应体，digest为None，调用方读完后需自行调用record_validators
+    :return: ConditionalResult(response, digest, unchanged)
+    """
+    headers = conditional_headers(validator_key, known_digest)
+    response = safe_request(url, params=params, timeout=timeout, headers=headers or None, stream=stream)
+    if response.status_code == 304:
+        response.close()
+        return ConditionalResult(None, known_digest, True)
+    if stream:
+        return ConditionalResult(response, None, False)
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    record_validators(validator_key, response, digest)
+    return ConditionalResult(response, digest, digest == known_digest)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行计时与请求统计模块
+在HTTP请求、数据集获取、解析、AI调用以及摘要/写入/推送各环节记录耗时、字节数、状态、重试次数和缓存命中，
+运行结束时输出JSON运行报告，并可选输出Prometheus textfile指标，便于按数据源跟踪p50/p95
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+RUN_REPORT = os.getenv("RUN_REPORT", "1") != "0"  # 设为0不输出运行报告
+RUN_REPORT_PATH = os.getenv("RUN_REPORT_PATH", "")  # 默认写入 .cache/run_report.json
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")  # Prometheus node_exporter textfile路径，为空时不输出
+RUN_REPORT_FILE = "run_report.json"
+METRIC_PREFIX = "qweather"
+
+_lock = threading.Lock()
+_events = []
+_run_started = time.time()
+_current_events = contextvars.ContextVar("run_events", default=None)
+
+
+def _target():
+    events = _current_events.get()
+    return _events if events is None else events
+
+def record(stage, name, duration, **fields):
+    """记录一次事件：stage为环节（http/dataset/parse/ai/stage等），name为数据源或步骤名"""
+    event = {"stage": stage, "name": name, "duration": round(duration, 6)}
+    event.update({key: value for key, value in fields.items() if value is not None})
+    events = _target()
+    with _lock:
+        events.append(event)
+
+@contextmanager
+def use_events(events):
+    """
+    with块内（包括其中创建的asyncio任务和 asyncio.to_thread 调用）的事件记录到events列表，
+    不写入进程级的事件列表，便于同一进程中并发的多次运行分别统计
+    """
+    token = _current_events.set(events)
+    try:
+        yield events
+    finally:
+        _current_events.reset(token)
+
+@contextmanager
+def span(stage, name, **fields):
+    """
+    计时上下文，with块内可向返回的字典补充 status/bytes/retries/cache 等字段
+    块内抛出异常时记录 error 字段并继续抛出
+    """
+    fields = dict(fields)
+    started = time.perf_counter()
+    try:
+        yield fields
+    except BaseException as e:
+        fields["error"] = type(e).__name__
+        raise
+    finally:
+        record(stage, name, time.perf_counter() - started, **fields)
+
+def reset_metrics():
+    """清空已记录的事件（每次运行开始时调用）"""
+    global _run_started
+    with _lock:
+        _events.clear()
+        _run_started = time.time()
+
+def get_events():
+    events = _target()
+    with _lock:
+        return list(events)
+
+
+def _percentile(values, q):
+    """已排序数值的分位数（线性插值）"""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def _aggregate(events):
+    durations = sorted(event["duration"] for event in events)
+    cache = {}
+    for event in events:
+        if "cache" in event:
+            cache[event["cache"]] = cache.get(event["cache"], 0) + 1
+    return {
+        "count": len(events),
+        "errors": sum(1 for event in events if "error" in event),
+        "total": round(sum(durations), 6),
+        "p50": round(_percentile(durations, 0.5), 6),
+        "p95": round(_percentile(durations, 0.95), 6),
+        "max": round(durations[-1], 6) if durations else 0.0,
+        "bytes": sum(event.get("bytes") or 0 for event in events),
+        "retries": sum(event.get("retries") or 0 for event in events),
+        "cache": cache
+    }
+
+def summarize(events=None):
+    """
+    按环节和 环节/名称 汇总
+    :return: {"stages": {环节: 统计}, "sources": {"环节/名称": 统计}}
+    """
+    events = get_events() if events is None else events
+    by_stage = {}
+    by_source = {}
+    for event in events:
+        by_stage.setdefault(event["stage"], []).append(event)
+        by_source.setdefault(f"{event['stage']}/{event['name']}", []).append(event)
+    return {
+        "stages": {stage: _aggregate(items) for stage, items in sorted(by_stage.items())},
+        "sources": {source: _aggregate(items) for source, items in sorted(by_source.items())}
+    }
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _report_path():
+    if RUN_REPORT_PATH:
+        return RUN_REPORT_PATH
+    from .city_config import get_cache_dir
+    return os.path.join(get_cache_dir(), RUN_REPORT_FILE)
+
+def build_run_report(extra=None):
+    events = get_events()
+    report = {
+        "startedAt": datetime.fromtimestamp(_run_started, ZoneInfo("Asia/Taipei")).isoformat(),
+        "duration": round(time.time() - _run_started, 3),
+        "summary": summarize(events),
+        "events": events
+    }
+    if extra:
+        report.update(extra)
+    return report
+
+def write_run_report(extra=None):
+    """
+    写出本次运行的JSON报告，设置 METRICS_TEXTFILE 时同时输出Prometheus指标
+    :param extra: 附加到报告顶层的字段（如连接池、缓存统计）
+    """
+    report = build_run_report(extra)
+    if RUN_REPORT:
+        try:
+            path = _report_path()
+            _write_atomic(path, json.dumps(report, ensure_ascii=False, indent=1, default=str))
+            print(f"⏱️ 运行报告：{path}（耗时 {report['duration']}s，{len(report['events'])} 个事件）")
+        except OSError as e:
+            print(f"⚠️ 写入运行报告失败: {e}")
+    if METRICS_TEXTFILE:
+        try:
+            _write_atomic(METRICS_TEXTFILE, render_prometheus(report["summary"]))
+        except OSError as e:
+            print(f"⚠️ 写入Prometheus指标失败: {e}")
+    return report
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+def render_prometheus(summary):
+    """将汇总结果渲染为Prometheus textfile格式"""
+    duration = f"{METRIC_PREFIX}_duration_seconds"
+    lines = [
+        f"# HELP {duration} Duration of instrumented steps by stage and source.",
+        f"# TYPE {duration} summary",
+    ]
+    counters = {
+        "bytes": (f"{METRIC_PREFIX}_bytes_total", "Response bytes by stage and source."),
+        "retries": (f"{METRIC_PREFIX}_retries_total", "Retries by stage and source."),
+        "errors": (f"{METRIC_PREFIX}_errors_total", "Failed steps by stage and source."),
+    }
+    counter_lines = {field: [] for field in counters}
+    cache_lines = []
+
+    for source, stats in summary["sources"].items():
+        stage, _, name = source.partition("/")
+        for field, quantile in (("p50", "0.5"), ("p95", "0.95")):
+            lines.append(f"{duration}{_labels(stage=stage, source=name, quantile=quantile)} {stats[field]}")
+        lines.append(f"{duration}_sum{_labels(stage=stage, source=name)} {stats['total']}")
+        lines.append(f"{duration}_count{_labels(stage=stage, source=name)} {stats['count']}")
+        for field in counters:
+            counter_lines[field].append(f"{counters[field][0]}{_labels(stage=stage, source=name)} {stats[field]}")
+        for result, count in stats["cache"].items():
+            cache_lines.append(f"{METRIC_PREFIX}_cache_total{_labels(stage=stage, source=name, result=result)} {count}")
+
+    for field, (metric, help_text) in counters.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(counter_lines[field])
+    lines.append(f"# HELP {METRIC_PREFIX}_cache_total Cache results by stage and source.")
+    lines.append(f"# TYPE {METRIC_PREFIX}_cache_total counter")
+    lines.extend(cache_lines)
+    lines.append(f"# HELP {METRIC_PREFIX}_last_run_timestamp_seconds Unix time of the last finished run.")
+    lines.append(f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge")
+    lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds {int(time.time())}")
+    return "\n".join(lines) + "\n"
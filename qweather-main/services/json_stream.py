@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式JSON解析模块
+基于ijson（可选依赖）边下载边解析测站观测数据集：测站列表项由ijson逐个构建（C后端时与json.loads速度相当），
+每个测站构建完成即只保留取数代码读取的字段和要素，不需要先在内存中保留完整的响应文本和原始JSON树
+
+乡镇预报（F-D0047）由 town_forecast 读取全部区域和要素，精简不到内容，仍整体解析
+"""
+
+import hashlib
+import os
+import re
+
+try:
+    import ijson
+except ImportError:  # 可选依赖，缺失时整体解析
+    ijson = None
+
+JSON_STREAMING = os.getenv("JSON_STREAMING", "1") != "0"  # 设为0关闭流式解析
+READ_CHUNK_SIZE = 64 * 1024
+HEAD_SIZE = 4096  # 从响应开头读取 success 等外层字段的字节数
+
+# 测站列表项保留的字段（station_registry / observation_rules / observation_history 读取的全部字段）
+STATION_FIELDS = ("StationName", "StationId", "ObsTime", "GeoInfo", "WeatherElement", "RainfallElement")
+GEO_FIELDS = ("CountyName", "TownName", "Coordinates")
+# 保留的观测要素（旧格式 ElementName 与新格式键名），其余如气压、风向、极值时间等丢弃
+WEATHER_ELEMENTS = frozenset((
+    "TEMP", "HUMD", "WDSD", "H_24R", "RAIN",
+    "AirTemperature", "RelativeHumidity", "WindSpeed",
+))
+# 保留的累积雨量时段：当日累积与以小时计的过去N小时累积（丢弃 Past10Min、Past2days 等）
+RAINFALL_PERIOD = re.compile(r"Now|Past\d+hr")
+SUCCESS_PATTERN = re.compile(rb'"success"\s*:\s*"([^"]*)"')
+
+
+def _trim_weather(elements):
+    if isinstance(elements, list):
+        return [
+            element for element in elements
+            if isinstance(element, dict) and element.get("ElementName") in WEATHER_ELEMENTS
+        ]
+    if isinstance(elements, dict):
+        return {name: value for name, value in elements.items() if name in WEATHER_ELEMENTS}
+    return elements
+
+def trim_station(item):
+    """测站列表项只保留取数代码读取的字段、坐标与要素"""
+    if not isinstance(item, dict):
+        return item
+    station = {key: item[key] for key in STATION_FIELDS if key in item}
+    geo_info = station.get("GeoInfo")
+    if isinstance(geo_info, dict):
+        station["GeoInfo"] = {key: geo_info[key] for key in GEO_FIELDS if key in geo_info}
+    if "WeatherElement" in station:
+        station["WeatherElement"] = _trim_weather(station["WeatherElement"])
+    rainfall = station.get("RainfallElement")
+    if isinstance(rainfall, dict):
+        station["RainfallElement"] = {
+            period: value for period, value in rainfall.items() if RAINFALL_PERIOD.fullmatch(period)
+        }
+    return station
+
+# 按数据集ID配置：(列表项路径, 列表项精简函数)
+STREAMING_DATASETS = {
+    "O-A0002-001": ("records.Station.item", trim_station),
+    "O-A0003-001": ("records.Station.item", trim_station),
+}
+
+
+def is_streaming_available():
+    return ijson is not None and JSON_STREAMING
+
+def get_stream_plan(dataset_id):
+    """
+    获取数据集的流式解析配置
+    :return: (列表项路径, 精简函数)，不适用流式解析时返回None
+    """
+    if not is_streaming_available():
+        return None
+    return STREAMING_DATASETS.get(dataset_id)
+
+
+class HashingReader:
+    """包装文件对象，读取的同时计算SHA-256（与非流式路径对response.content的摘要一致），
+    并保留开头的HEAD_SIZE字节；提供sink时读到的原始数据同时写入sink（如原始数据归档）"""
+
+    def __init__(self, fileobj, sink=None):
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+        self._sink = sink
+        self.head = b""
+
+    def read(self, size=READ_CHUNK_SIZE):
+        chunk = self._fileobj.read(size)
+        if chunk:
+            self._hash.update(chunk)
+            if len(self.head) < HEAD_SIZE:
+                self.head += chunk[:HEAD_SIZE - len(self.head)]
+            if self._sink is not None:
+                self._sink.write(chunk)
+        return chunk
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def parse_stream(reader, item_path, trim):
+    """
+    流式解析JSON文档中的一个列表
+    :param reader: HashingReader（外层的 success 字段从其保留的开头内容读取，CWA数据集中位于最前）
+    :param item_path: 列表项路径（ijson前缀写法，如 records.Station.item）
+    :param trim: 列表项精简函数，每项构建完成后立即调用
+    :return: 只包含 success 和该列表（项已精简）的字典，如 {"success": "true", "records": {"Station": [...]}}
+    """
+    items = [trim(item) for item in ijson.items(reader, item_path, use_float=True)]
+    match = SUCCESS_PATTERN.search(reader.head)
+    *keys, _ = item_path.split(".")
+    data = items
+    for key in reversed(keys):
+        data = {key: data}
+    if match:
+        data["success"] = match.group(1).decode("utf-8")
+    return data
+
+def parse_response(response, item_path, trim, sink=None):
+    """
+    流式解析requests响应（需以stream=True发出请求）
+    :param sink: 可选，逐块接收原始内容的对象（提供 write 方法）
+    :return: (精简后的JSON字典, 原始内容的SHA-256)
+    """
+    response.raw.decode_content = True
+    reader = HashingReader(response.raw, sink)
+    try:
+        data = parse_stream(reader, item_path, trim)
+        # 读完剩余内容（如结尾空白），保证摘要覆盖完整响应
+        while reader.read():
+            pass
+    finally:
+        response.close()
+    return data, reader.hexdigest()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+观测历史模块
+每次运行把 O-A0002-001 / O-A0003-001 各测站的读数追加写入本地SQLite（按 (测站, 观测时间) 建立主键索引），
+写入时同步累加到小时和日汇总表，原始读数与小时汇总按保留期限清理；
+用于计算累积雨量、气温变化等需要历史数据的指标
+
+降雨量按 RainfallElement.Now（当日0时起的累积雨量）换算为相邻两次读数之间的增量，
+跨日时以新一日的累积值为增量
+
+用法：
+    python -m services.observation_history rain 新北 --hours 3
+    python -m services.observation_history series C0AC70 --hours 48 --resolution hourly
+    python -m services.observation_history backfill      # 从原始数据归档按时间顺序补录
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from .city_config import get_cache_dir
+from .instrumentation import span
+from .observation_rules import DEFAULT_MISSING, station_elements
+from .station_registry import build_station_registry, get_station_registry, normalize_county
+
+OBS_HISTORY_ENABLED = os.getenv("OBS_HISTORY", "1") != "0"  # 设为0不记录观测历史
+OBS_HISTORY_RAW_DAYS = float(os.getenv("OBS_HISTORY_RAW_DAYS", "35"))  # 原始读数保留天数
+OBS_HISTORY_HOURLY_DAYS = float(os.getenv("OBS_HISTORY_HOURLY_DAYS", "400"))  # 小时汇总保留天数（日汇总长期保留）
+OBS_HISTORY_FILE = "observations.sqlite3"
+HISTORY_DATASETS = ("O-A0002-001", "O-A0003-001")
+PRUNE_INTERVAL = 86400  # 清理过期数据的最短间隔（秒）
+TAIPEI = ZoneInfo("Asia/Taipei")
+TAIPEI_OFFSET = 8 * 3600
+
+# 读数字段 → 各数据集中可能的要素名（新旧两种写法）
+ELEMENT_NAMES = {
+    "temp": ("TEMP", "AirTemperature"),
+    "humidity": ("HUMD", "RelativeHumidity"),
+    "wind": ("WDSD", "WindSpeed"),
+}
+# 旧格式 WeatherElement 中的累积雨量要素（小时数 → 要素名）
+LEGACY_RAIN_ELEMENTS = {1: "RAIN", 24: "H_24R"}
+# 汇总表 → 分桶函数（日汇总按台北时间的自然日分桶）
+ROLLUPS = {
+    "hourly": lambda ts: ts - ts % 3600,
+    "daily": lambda ts: ts - (ts + TAIPEI_OFFSET) % 86400,
+}
+
+_lock = threading.Lock()
+_conn = None
+_stats = {"ingested": 0, "skipped": 0}
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS stations ("
+    "station_id TEXT PRIMARY KEY, name TEXT, county TEXT, town TEXT, lat REAL, lon REAL, dataset TEXT, "
+    "last_obs INTEGER, last_rain REAL)",
+    "CREATE INDEX IF NOT EXISTS idx_stations_county ON stations (county)",
+    "CREATE TABLE IF NOT EXISTS readings ("
+    "station_id TEXT NOT NULL, obs_time INTEGER NOT NULL, temp REAL, humidity REAL, wind REAL, "
+    "rain_now REAL, rain REAL, PRIMARY KEY (station_id, obs_time)) WITHOUT ROWID",
+    *(
+        f"CREATE TABLE IF NOT EXISTS {table} ("
+        "station_id TEXT NOT NULL, bucket INTEGER NOT NULL, samples INTEGER NOT NULL, "
+        "temp_min REAL, temp_max REAL, temp_sum REAL NOT NULL, temp_count INTEGER NOT NULL, "
+        "rain REAL NOT NULL, wind_max REAL, PRIMARY KEY (station_id, bucket)) WITHOUT ROWID"
+        for table in ROLLUPS
+    ),
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+# 汇总表的累加写入（最小/最大值忽略缺测）
+_ROLLUP_UPSERT = (
+    "INSERT INTO {table} (station_id, bucket, samples, temp_min, temp_max, temp_sum, temp_count, rain, wind_max) "
+    "VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (station_id, bucket) DO UPDATE SET "
+    "samples = samples + 1, "
+    "temp_min = min(coalesce(temp_min, excluded.temp_min), coalesce(excluded.temp_min, temp_min)), "
+    "temp_max = max(coalesce(temp_max, excluded.temp_max), coalesce(excluded.temp_max, temp_max)), "
+    "temp_sum = temp_sum + excluded.temp_sum, temp_count = temp_count + excluded.temp_count, "
+    "rain = rain + excluded.rain, "
+    "wind_max = max(coalesce(wind_max, excluded.wind_max), coalesce(excluded.wind_max, wind_max))"
+)
+
+
+def _connect():
+    """打开（必要时创建）观测历史数据库"""
+    global _conn
+    if _conn is None:
+        path = os.path.join(get_cache_dir(), OBS_HISTORY_FILE)
+        _conn = sqlite3.connect(path, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            _conn.execute(statement)
+        _conn.commit()
+    return _conn
+
+def _to_value(raw):
+    """观测值转为浮点数，缺测或无法解析时返回None"""
+    if raw is None or raw == "":
+        return None
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return None if value in DEFAULT_MISSING else value
+
+def _obs_time(record):
+    text = (record.get("ObsTime") or {}).get("DateTime", "")
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=TAIPEI)
+    return int(dt.timestamp())
+
+def extract_reading(record):
+    """
+    从测站记录取出本模块记录的读数
+    :return: (观测时间, 气温, 湿度, 风速, 当日累积雨量)；没有观测时间时返回None
+    """
+    obs_time = _obs_time(record)
+    if obs_time is None:
+        return None
+    elements = dict(station_elements(record))
+    weather = record.get("WeatherElement")
+    if isinstance(weather, dict):
+        elements.update(weather)
+    values = []
+    for names in ELEMENT_NAMES.values():
+        values.append(next((_to_value(elements[name]) for name in names if name in elements), None))
+    rainfall = record.get("RainfallElement") or {}
+    rain_now = _to_value((rainfall.get("Now") or {}).get("Precipitation"))
+    return (obs_time, *values, rain_now)
+
+def past_rainfall(record, hours):
+    """
+    测站记录自带的过去N小时累积雨量（RainfallElement.Past{N}hr，旧格式的 RAIN/H_24R），没有时返回None
+    用于滑动窗口尚未覆盖完整时间窗时（如冷启动）
+    """
+    rainfall = record.get("RainfallElement") or {}
+    value = _to_value((rainfall.get(f"Past{hours}hr") or {}).get("Precipitation"))
+    if value is None and hours in LEGACY_RAIN_ELEMENTS:
+        value = _to_value(dict(station_elements(record)).get(LEGACY_RAIN_ELEMENTS[hours]))
+    return value
+
+def rain_increment(obs_time, rain_now, last_obs, last_rain):
+    """
+    由当日累积雨量换算与上一次读数之间的降雨量
+    同一天内为两次累积值之差（累积值回落时记为0），跨日时为新一日的累积值，没有上一次读数时无法换算
+    """
+    if rain_now is None or last_obs is None:
+        return None
+    if ROLLUPS["daily"](obs_time) != ROLLUPS["daily"](last_obs) or last_rain is None:
+        return rain_now
+    return max(rain_now - last_rain, 0.0)
+
+
+def ingest_stations(stations, dataset_id):
+    """
+    写入一批测站读数（Station对象列表），只写入比该测站已记录读数更新的观测，重复写入同一份数据不会重复累加
+    :return: 新写入的读数条数
+    """
+    with _lock:
+        conn = _connect()
+        known = {row[0]: row[1:] for row in conn.execute("SELECT station_id, last_obs, last_rain FROM stations")}
+        readings, rollups, updates = [], [], []
+        for station in stations:
+            if not station.station_id:
+                continue
+            reading = extract_reading(station.record)
+            if reading is None:
+                continue
+            obs_time, temp, humidity, wind, rain_now = reading
+            last_obs, last_rain = known.get(station.station_id, (None, None))
+            if last_obs is not None and obs_time <= last_obs:
+                _stats["skipped"] += 1
+                continue
+            rain = rain_increment(obs_time, rain_now, last_obs, last_rain)
+            readings.append((station.station_id, obs_time, temp, humidity, wind, rain_now, rain))
+            rollups.append((station.station_id, obs_time, temp, temp,
+                            temp or 0.0, 0 if temp is None else 1, rain or 0.0, wind))
+            updates.append((station.station_id, station.name, station.county, station.town,
+                            station.lat, station.lon, dataset_id, obs_time, rain_now))
+            known[station.station_id] = (obs_time, rain_now)
+
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO readings (station_id, obs_time, temp, humidity, wind, rain_now, rain) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", readings
+            )
+            for table, bucket in ROLLUPS.items():
+                conn.executemany(
+                    _ROLLUP_UPSERT.format(table=table),
+                    [(row[0], bucket(row[1]), *row[2:]) for row in rollups]
+                )
+            conn.executemany(
+                "INSERT INTO stations (station_id, name, county, town, lat, lon, dataset, last_obs, last_rain) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (station_id) DO UPDATE SET "
+                "name = excluded.name, county = excluded.county, town = excluded.town, lat = excluded.lat, "
+                "lon = excluded.lon, dataset = excluded.dataset, last_obs = excluded.last_obs, "
+                "last_rain = excluded.last_rain", updates
+            )
+        _stats["ingested"] += len(readings)
+        return len(readings)
+
+def prune(now=None, force=False):
+    """清理超过保留期限的原始读数和小时汇总（默认每天最多一次）"""
+    now = time.time() if now is None else now
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'pruned_at'").fetchone()
+        if not force and row is not None and now - float(row[0]) < PRUNE_INTERVAL:
+            return
+        with conn:
+            conn.execute("DELETE FROM readings WHERE obs_time < ?", (int(now - OBS_HISTORY_RAW_DAYS * 86400),))
+            conn.execute("DELETE FROM hourly WHERE bucket < ?", (int(now - OBS_HISTORY_HOURLY_DAYS * 86400),))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pruned_at', ?)", (str(now),))
+
+def record_observations(timeout=15):
+    """把本次运行的测站数据写入观测历史（数据集从数据集缓存读取），失败时只输出警告"""
+    if not OBS_HISTORY_ENABLED:
+        return 0
+    total = 0
+    for dataset_id in HISTORY_DATASETS:
+        try:
+            registry = get_station_registry(dataset_id, timeout=timeout)
+            with span("history", dataset_id) as metric:
+                metric["rows"] = ingest_stations(registry.stations, dataset_id)
+            total += metric["rows"]
+        except Exception as e:
+            print(f"⚠️ 记录{dataset_id}观测历史失败: {e}")
+    try:
+        prune()
+    except sqlite3.Error as e:
+        print(f"⚠️ 清理观测历史失败: {e}")
+    return total
+
+
+def resolve_county(name):
+    """县市名补全：“新北” → “新北市”（按已记录的县市匹配），没有匹配时原样返回"""
+    name = normalize_county(name)
+    with _lock:
+        counties = [row[0] for row in _connect().execute("SELECT DISTINCT county FROM stations")]
+    if name in counties:
+        return name
+    return next((county for county in counties if county.startswith(name)), name)
+
+def _window(hours, end):
+    end = int(time.time() if end is None else end)
+    return end - int(hours * 3600), end
+
+def rainfall_totals(county=None, hours=3, end=None):
+    """
+    时间窗 (end - hours, end] 内各测站的累计降雨量
+    窗口在原始读数保留期内时按读数计算，否则按小时汇总计算
+    :return: [(测站ID, 测站名, 降雨量mm)]，按降雨量从大到小排列
+    """
+    start, end = _window(hours, end)
+    if start >= time.time() - OBS_HISTORY_RAW_DAYS * 86400:
+        source, column = "readings", "obs_time"
+        total = "sum(coalesce(r.rain, 0))"
+    else:
+        source, column = "hourly", "bucket"
+        total = "sum(r.rain)"
+    query = (
+        f"SELECT s.station_id, s.name, {total} FROM stations s "
+        f"JOIN {source} r ON r.station_id = s.station_id AND r.{column} > ? AND r.{column} <= ? "
+    )
+    args = [start, end]
+    if county:
+        query += "WHERE s.county = ? "
+        args.append(resolve_county(county))
+    query += "GROUP BY s.station_id ORDER BY 3 DESC"
+    with _lock:
+        return _connect().execute(query, args).fetchall()
+
+def series(station_id, hours=24, end=None, resolution="raw"):
+    """
+    单个测站的时间序列
+    :param resolution: raw 返回 (观测时间, 气温, 湿度, 风速, 当日累积雨量, 降雨增量)；
+        hourly / daily 返回 (时段起点, 读数次数, 最低气温, 最高气温, 平均气温, 降雨量, 最大风速)
+    """
+    start, end = _window(hours, end)
+    if resolution == "raw":
+        query = ("SELECT obs_time, temp, humidity, wind, rain_now, rain FROM readings "
+                 "WHERE station_id = ? AND obs_time > ? AND obs_time <= ? ORDER BY obs_time")
+    elif resolution in ROLLUPS:
+        query = (f"SELECT bucket, samples, temp_min, temp_max, "
+                 f"CASE WHEN temp_count THEN temp_sum / temp_count END, rain, wind_max FROM {resolution} "
+                 f"WHERE station_id = ? AND bucket > ? AND bucket <= ? ORDER BY bucket")
+        start = ROLLUPS[resolution](start)
+    else:
+        raise ValueError(f"未知的时间分辨率: {resolution}")
+    with _lock:
+        return _connect().execute(query, (station_id, start, end)).fetchall()
+
+def recent_readings(hours, end=None):
+    """
+    时间窗内全部测站的原始读数（用于启动时填充滑动窗口）
+    :return: [(测站ID, 测站名, 观测时间, 气温, 当日累积雨量, 降雨增量)]，按测站、观测时间排列
+    """
+    start, end = _window(hours, end)
+    with _lock:
+        return _connect().execute(
+            "SELECT s.station_id, s.name, r.obs_time, r.temp, r.rain_now, r.rain FROM stations s "
+            "JOIN readings r ON r.station_id = s.station_id AND r.obs_time > ? AND r.obs_time <= ? "
+            "ORDER BY s.station_id, r.obs_time", (start, end)
+        ).fetchall()
+
+def get_history_stats():
+    """本进程写入/跳过的读数条数"""
+    with _lock:
+        return dict(_stats)
+
+def close_history():
+    """关闭观测历史数据库连接"""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def backfill(start=None, end=None):
+    """按获取时间顺序把原始数据归档中的测站数据写入观测历史，返回新写入的读数条数"""
+    from .payload_archive import get_archive
+    archive = get_archive()
+    entries = sorted(
+        (entry for dataset_id in HISTORY_DATASETS for entry in archive.history(dataset_id, start, end)),
+        key=lambda entry: entry.fetched_at
+    )
+    total = 0
+    for entry in entries:
+        registry = build_station_registry(json.loads(archive.read(entry)))
+        total += ingest_stations(registry.stations, entry.dataset_id)
+    return total
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp, TAIPEI).strftime("%Y-%m-%d %H:%M")
+
+def main():
+    parser = argparse.ArgumentParser(description="测站观测历史")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rain = sub.add_parser("rain", help="各测站的累计降雨量")
+    rain.add_argument("county", nargs="?", default=None, help="县市（如 新北），默认全部")
+    rain.add_argument("--hours", type=float, default=3)
+    rain.add_argument("--top", type=int, default=20)
+    show = sub.add_parser("series", help="单个测站的时间序列")
+    show.add_argument("station_id")
+    show.add_argument("--hours", type=float, default=24)
+    show.add_argument("--resolution", choices=["raw", *ROLLUPS], default="raw")
+    sub.add_parser("backfill", help="从原始数据归档补录")
+    args = parser.parse_args()
+
+    if args.command == "rain":
+        started = time.perf_counter()
+        rows = rainfall_totals(args.county, args.hours)
+        elapsed = (time.perf_counter() - started) * 1000
+        for station_id, name, total in rows[:args.top]:
+            print(f"{station_id:<8} {name:<12} {total:7.1f} mm")
+        print(f"共 {len(rows)} 个测站，查询耗时 {elapsed:.1f} ms")
+    elif args.command == "series":
+        for row in series(args.station_id, args.hours, resolution=args.resolution):
+            values = ["-" if value is None else f"{value:g}" for value in row[1:]]
+            print(_format_time(row[0]), *values, sep="\t")
+    else:
+        print(f"✅ 补录 {backfill()} 条读数")
+
+
+if __name__ == "__main__":
+    main()
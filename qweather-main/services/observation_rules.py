@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+观测规则引擎模块
+以声明式规则（要素、比较方式、阈值、等级、文字模板）描述观测预警条件，
+规则集在导入时编译一次：对全部测站只遍历一次，取出规则用到的要素组成数值列，
+再按列对所有规则求值（测站较多且安装numpy时使用数组运算），
+新增规则只增加一次列比较，不会再遍历一遍测站列表
+"""
+
+import math
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，缺失时逐值比较
+    np = None
+
+VECTORIZE_MIN_ITEMS = 64  # 测站数达到该值时使用numpy数组求值
+DEFAULT_MISSING = (-99.0,)  # CWA观测缺测值
+
+COMPARATORS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "==": operator.eq,
+}
+
+
+class Rule:
+    """
+    单条观测规则
+    element 为要素名（如 TEMP、H_24R），带点号时为测站记录中的嵌套路径（如 RainfallElement.Now.Precipitation）；
+    group 相同的规则互斥，按声明顺序只取第一条命中的（相当于 if/elif）
+    """
+
+    __slots__ = ("element", "op", "threshold", "severity", "title", "template",
+                 "field", "group", "label", "missing", "_compare")
+
+    def __init__(self, element, op, threshold, severity, title, template,
+                 field=None, group=None, label=None, missing=DEFAULT_MISSING):
+        if op not in COMPARATORS:
+            raise ValueError(f"不支持的比较方式: {op}")
+        self.element = element
+        self.op = op
+        self.threshold = threshold
+        self.severity = severity
+        self.title = title
+        self.template = template
+        self.field = field
+        self.group = group
+        self.label = label
+        self.missing = tuple(float(value) for value in missing)
+        self._compare = COMPARATORS[op]
+
+    def __repr__(self):
+        return f"Rule({self.element} {self.op} {self.threshold}, {self.title!r})"
+
+    def format(self, station, value):
+        """按模板生成预警文字"""
+        return self.template.format(station=station, value=value)
+
+
+class RuleHit:
+    """规则命中结果：item 为命中的原始记录"""
+
+    __slots__ = ("index", "item", "rule", "value")
+
+    def __init__(self, index, item, rule, value):
+        self.index = index
+        self.item = item
+        self.rule = rule
+        self.value = value
+
+    def __repr__(self):
+        return f"RuleHit({self.index}, {self.rule!r}, {self.value})"
+
+
+def station_elements(record):
+    """测站记录的 (要素名, 原始值)：WeatherElement 列表中的各要素"""
+    for element in record.get("WeatherElement", []) or []:
+        if isinstance(element, dict):
+            yield element.get("ElementName", ""), element.get("ElementValue", "")
+
+def _lookup_path(record, path):
+    value = record
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def _to_float(raw, missing):
+    """原始值转为浮点数，缺测或无法解析时返回NaN"""
+    if raw is None or raw == "":
+        return math.nan
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return math.nan
+    return math.nan if value in missing else value
+
+
+class RuleSet:
+    """编译后的规则集"""
+
+    __slots__ = ("rules", "elements", "_columns", "_missing", "_paths")
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.elements = []
+        self._columns = {}   # 要素名 → 列序号
+        self._missing = []   # 列序号 → 缺测值集合
+        self._paths = []     # [(列序号, 嵌套路径)]
+        for rule in self.rules:
+            column = self._columns.get(rule.element)
+            if column is None:
+                column = self._columns[rule.element] = len(self.elements)
+                self.elements.append(rule.element)
+                self._missing.append(set())
+                if "." in rule.element:
+                    self._paths.append((column, tuple(rule.element.split("."))))
+            self._missing[column].update(rule.missing)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _extract_columns(self, items, extract):
+        """一次遍历取出全部规则用到的要素，返回每个要素一列浮点数"""
+        columns = [[math.nan] * len(items) for _ in self.elements]
+        lookup = self._columns
+        missing = self._missing
+        for i, item in enumerate(items):
+            for name, raw in extract(item):
+                column = lookup.get(name)
+                if column is not None:
+                    columns[column][i] = _to_float(raw, missing[column])
+            for column, path in self._paths:
+                columns[column][i] = _to_float(_lookup_path(item, path), missing[column])
+        return columns
+
+    def evaluate(self, items, extract=station_elements):
+        """
+        对全部记录求值
+        :param items: 测站记录列表
+        :param extract: 从记录中取出 (要素名, 原始值) 的函数
+        :return: [RuleHit]，按记录顺序、同一记录内按规则声明顺序排列
+        """
+        items = list(items)
+        if not items or not self.rules:
+            return []
+        columns = self._extract_columns(items, extract)
+
+        hits = []
+        if np is not None and len(items) >= VECTORIZE_MIN_ITEMS:
+            arrays = [np.asarray(column, dtype=float) for column in columns]
+            claimed = {}
+            for order, rule in enumerate(self.rules):
+                values = arrays[self._columns[rule.element]]
+                mask = rule._compare(values, rule.threshold)
+                if rule.group is not None:
+                    taken = claimed.get(rule.group)
+                    if taken is None:
+                        taken = claimed[rule.group] = np.zeros(len(items), dtype=bool)
+                    mask &= ~taken
+                    taken |= mask
+                for i in np.flatnonzero(mask).tolist():
+                    hits.append((i, order, float(values[i])))
+        else:
+            claimed = {}
+            for order, rule in enumerate(self.rules):
+                values = columns[self._columns[rule.element]]
+                compare, threshold = rule._compare, rule.threshold
+                taken = claimed.setdefault(rule.group, set()) if rule.group is not None else None
+                for i, value in enumerate(values):
+                    # NaN与任何阈值比较均为False，缺测值自然不会命中
+                    if compare(value, threshold) and (taken is None or i not in taken):
+                        if taken is not None:
+                            taken.add(i)
+                        hits.append((i, order, value))
+
+        hits.sort(key=lambda hit: (hit[0], hit[1]))
+        return [RuleHit(i, items[i], self.rules[order], value) for i, order, value in hits]
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始数据归档模块
+把每次获取的CWA数据集原始响应连同获取时间追加写入压缩分段文件（zstd，未安装zstandard时用gzip），
+定长记录的索引文件可直接内存映射，按 (数据集, 时间) 快速查找；
+内容与上一次相同（304或摘要一致）时只追加指向已有数据的索引记录，不重复存储；
+回放模式以归档数据代替网络请求，在不访问网络的情况下重现某一时刻流水线看到的数据
+
+用法：
+    python -m services.payload_archive list
+    python -m services.payload_archive show O-A0002-001 --at "2025-07-30 14:00"
+    python -m services.payload_archive replay --at "2025-07-30 14:00"
+"""
+
+import argparse
+import bisect
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from .city_config import get_cache_dir
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，缺失时使用gzip
+    zstandard = None
+
+PAYLOAD_ARCHIVE = os.getenv("PAYLOAD_ARCHIVE", "1") != "0"  # 设为0关闭原始数据归档
+PAYLOAD_ARCHIVE_DIR = os.getenv("PAYLOAD_ARCHIVE_DIR", "")  # 默认 .cache/archive
+SEGMENT_MAX_BYTES = int(float(os.getenv("PAYLOAD_ARCHIVE_SEGMENT_MB", "64")) * 1024 * 1024)  # 单个分段文件的大小上限
+ARCHIVE_SUBDIR = "archive"
+INDEX_FILE = "index.bin"
+SEGMENT_PATTERN = "segment-{:06d}.bin"
+
+CODEC_GZIP = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {CODEC_GZIP: "gzip", CODEC_ZSTD: "zstd"}
+
+# 索引记录（小端定长）：数据集ID、参数摘要、获取时间、分段号、偏移、元数据长度、压缩长度、原始长度、编码、内容摘要
+INDEX_STRUCT = struct.Struct("<24s8sdIQIIIB32s7x")
+TAIPEI = ZoneInfo("Asia/Taipei")
+
+ArchiveEntry = namedtuple("ArchiveEntry", [
+    "dataset_id", "params_hash", "fetched_at", "segment", "offset",
+    "meta_length", "length", "raw_length", "codec", "digest"
+])
+
+
+def _params_hash(params):
+    """查询参数的摘要（不含Authorization等公共参数）"""
+    if not params:
+        return b"\0" * 8
+    text = json.dumps(params, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).digest()[:8]
+
+def _archive_dir():
+    return PAYLOAD_ARCHIVE_DIR or os.path.join(get_cache_dir(), ARCHIVE_SUBDIR)
+
+def parse_time(text):
+    """解析时间参数（台北时间，支持 "YYYY-MM-DD HH:MM[:SS]" 和ISO格式），返回Unix时间"""
+    dt = datetime.fromisoformat(text.replace("/", "-"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=TAIPEI)
+    return dt.timestamp()
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp, TAIPEI).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class _Compressor:
+    """单条数据的压缩器：边接收数据块边压缩，结束时返回压缩后的字节"""
+
+    def __init__(self):
+        self.raw_length = 0
+        self._hash = hashlib.sha256()
+        self._parts = []
+        if zstandard is not None:
+            self.codec = CODEC_ZSTD
+            self._compressor = zstandard.ZstdCompressor(level=6).compressobj()
+        else:
+            self.codec = CODEC_GZIP
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip格式
+
+    def write(self, chunk):
+        self.raw_length += len(chunk)
+        self._hash.update(chunk)
+        self._parts.append(self._compressor.compress(chunk))
+
+    def finish(self):
+        self._parts.append(self._compressor.flush())
+        return b"".join(self._parts), self._hash.hexdigest()
+
+
+def decompress(codec, data):
+    if codec == CODEC_GZIP:
+        return gzip.decompress(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("读取zstd归档需要安装 zstandard：pip install zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"未知的压缩编码: {codec}")
+
+
+class PayloadArchive:
+    """
+    追加写入的分段归档
+    分段文件：依次存放 [元数据JSON][压缩后的原始响应]；索引文件：INDEX_STRUCT 定长记录，按写入顺序追加
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries = []       # 已加载的索引记录
+        self._by_key = {}        # (数据集ID, 参数摘要) → ([获取时间], [记录序号])，按时间排序
+        self._by_digest = {}     # 内容摘要 → 记录序号（最近一条存有数据的记录）
+        self._index_size = 0     # 已加载的索引字节数
+        self._segments = {}      # 分段号 → mmap（只读）
+        self._segment = None     # 当前写入的分段号
+
+    # ---- 索引 ----
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, SEGMENT_PATTERN.format(segment))
+
+    def _add_entry(self, entry):
+        position = len(self._entries)
+        self._entries.append(entry)
+        times, positions = self._by_key.setdefault((entry.dataset_id, entry.params_hash), ([], []))
+        at = bisect.bisect_right(times, entry.fetched_at)
+        times.insert(at, entry.fetched_at)
+        positions.insert(at, position)
+        if entry.length:
+            self._by_digest[entry.digest] = position
+
+    def refresh(self):
+        """加载索引文件中新追加的记录（索引以内存映射方式读取）"""
+        path = self._index_path()
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        size -= size % INDEX_STRUCT.size  # 忽略写了一半的末尾记录
+        if size <= self._index_size:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for fields in INDEX_STRUCT.iter_unpack(view[self._index_size:size]):
+                dataset_id, params_hash, fetched_at, segment, offset, meta_length, length, raw_length, codec, digest = fields
+                self._add_entry(ArchiveEntry(
+                    dataset_id.rstrip(b"\0").decode("ascii"), params_hash, fetched_at, segment, offset,
+                    meta_length, length, raw_length, codec, digest.hex()
+                ))
+        self._index_size = size
+
+    # ---- 写入 ----
+
+    def _current_segment(self, incoming):
+        """当前分段号；超过大小上限时换新分段"""
+        if self._segment is None:
+            segments = [entry.segment for entry in self._entries] or [1]
+            self._segment = max(segments)
+        path = self._segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) + incoming > SEGMENT_MAX_BYTES:
+            self._segment += 1
+        return self._segment
+
+    def _append_index(self, entry):
+        record = INDEX_STRUCT.pack(
+            entry.dataset_id.encode("ascii")[:24], entry.params_hash, entry.fetched_at, entry.segment, entry.offset,
+            entry.meta_length, entry.length, entry.raw_length, entry.codec, bytes.fromhex(entry.digest)
+        )
+        with open(self._index_path(), "ab") as f:
+            f.write(record)
+        self._index_size += len(record)
+        self._add_entry(entry)
+
+    def append(self, dataset_id, params, compressed, digest, raw_length, codec, fetched_at=None):
+        """追加一条已压缩的原始响应，内容与已归档数据相同时只追加索引记录"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self.refresh()
+            previous = self._by_digest.get(digest)
+            if previous is not None:
+                self._append_index(self._entries[previous]._replace(
+                    dataset_id=dataset_id, params_hash=_params_hash(params), fetched_at=fetched_at
+                ))
+                return False
+
+            meta = json.dumps({
+                "dataset": dataset_id, "params": params or {}, "fetchedAt": fetched_at,
+                "digest": digest, "codec": CODEC_NAMES[codec]
+            }, ensure_ascii=False).encode("utf-8")
+            segment = self._current_segment(len(meta) + len(compressed))
+            with open(self._segment_path(segment), "ab") as f:
+                offset = f.tell()
+                f.write(meta)
+                f.write(compressed)
+            self._append_index(ArchiveEntry(
+                dataset_id, _params_hash(params), fetched_at, segment, offset,
+                len(meta), len(compressed), raw_length, codec, digest
+            ))
+            return True
+
+    def append_raw(self, dataset_id, params, content, fetched_at=None):
+        compressor = _Compressor()
+        compressor.write(content)
+        compressed, digest = compressor.finish()
+        return self.append(dataset_id, params, compressed, digest, compressor.raw_length, compressor.codec, fetched_at)
+
+    def append_reference(self, dataset_id, params, digest, fetched_at=None):
+        """
+        内容未变化（304）时追加一条指向已归档数据的索引记录
+        :return: 是否找到了对应的数据
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._lock:
+            self.refresh()
+            previous = self._by_digest.get(digest)
+            if previous is None:
+                return False
+            self._append_index(self._entries[previous]._replace(
+                dataset_id=dataset_id, params_hash=_params_hash(params), fetched_at=fetched_at
+            ))
+            return True
+
+    # ---- 读取 ----
+
+    def _segment_view(self, segment):
+        view = self._segments.get(segment)
+        if view is None or len(view) < os.path.getsize(self._segment_path(segment)):
+            if view is not None:
+                view.close()
+            with open(self._segment_path(segment), "rb") as f:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._segments[segment] = view
+        return view
+
+    def read_meta(self, entry):
+        with self._lock:
+            view = self._segment_view(entry.segment)
+            return json.loads(view[entry.offset:entry.offset + entry.meta_length])
+
+    def read(self, entry):
+        """读取并解压一条记录的原始响应"""
+        start = entry.offset + entry.meta_length
+        with self._lock:
+            view = self._segment_view(entry.segment)
+            compressed = view[start:start + entry.length]
+        return decompress(entry.codec, compressed)
+
+    def lookup(self, dataset_id, at=None, params=None):
+        """获取时间不晚于at（Unix时间，默认最新）的最后一条记录，没有时返回None"""
+        with self._lock:
+            self.refresh()
+            found = self._by_key.get((dataset_id, _params_hash(params)))
+            if not found:
+                return None
+            times, positions = found
+            i = len(times) if at is None else bisect.bisect_right(times, at)
+            return self._entries[positions[i - 1]] if i else None
+
+    def history(self, dataset_id, start=None, end=None, params=None):
+        """时间范围内的全部记录，按获取时间排序"""
+        with self._lock:
+            self.refresh()
+            times, positions = self._by_key.get((dataset_id, _params_hash(params)), ([], []))
+            lo = 0 if start is None else bisect.bisect_left(times, start)
+            hi = len(times) if end is None else bisect.bisect_right(times, end)
+            return [self._entries[p] for p in positions[lo:hi]]
+
+    def keys(self):
+        """已归档的 (数据集ID, 参数摘要)"""
+        with self._lock:
+            self.refresh()
+            return sorted(self._by_key)
+
+    def close(self):
+        with self._lock:
+            for view in self._segments.values():
+                view.close()
+            self._segments.clear()
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_archive():
+    """进程内共享的归档实例"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = PayloadArchive(_archive_dir())
+        return _archive
+
+def is_archive_enabled():
+    return PAYLOAD_ARCHIVE
+
+def start_payload(dataset_id, params=None):
+    """
+    开始归档一条流式读取的响应：返回的对象逐块 write() 原始数据，读完后调用 commit()
+    未启用归档时返回None
+    """
+    if not PAYLOAD_ARCHIVE:
+        return None
+    return _PendingPayload(dataset_id, params)
+
+class _PendingPayload(_Compressor):
+    def __init__(self, dataset_id, params):
+        super().__init__()
+        self.dataset_id = dataset_id
+        self.params = params
+        self.fetched_at = time.time()
+
+    def commit(self):
+        compressed, digest = self.finish()
+        archive_safely(lambda archive: archive.append(
+            self.dataset_id, self.params, compressed, digest, self.raw_length, self.codec, self.fetched_at
+        ))
+
+def archive_payload(dataset_id, params, content):
+    """归档一条完整读取的原始响应"""
+    if PAYLOAD_ARCHIVE:
+        archive_safely(lambda archive: archive.append_raw(dataset_id, params, content))
+
+def archive_unchanged(dataset_id, params, digest):
+    """内容未变化时记录本次获取（指向已归档的数据）"""
+    if PAYLOAD_ARCHIVE and digest:
+        archive_safely(lambda archive: archive.append_reference(dataset_id, params, digest))
+
+def archive_safely(write):
+    """归档失败不影响数据获取"""
+    try:
+        write(get_archive())
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 原始数据归档失败: {e}")
+
+
+def archive_source(at=None):
+    """
+    数据集缓存的回放数据来源：返回时间at（Unix时间，默认最新）之前最后一次获取的归档数据
+    :return: 供 set_dataset_source 使用的函数，同时记录回放用到的 {数据集ID: 获取时间}
+    """
+    archive = get_archive()
+
+    def source(dataset_id, params):
+        entry = archive.lookup(dataset_id, at, params)
+        if entry is None:
+            raise LookupError(f"{dataset_id} 没有{format_time(at) + ' 之前的' if at else ''}归档数据")
+        source.replayed[dataset_id] = entry.fetched_at
+        return json.loads(archive.read(entry)), entry.digest
+
+    source.replayed = {}
+    return source
+
+def replay(at=None):
+    """
+    用归档数据重跑 fetch_weather_all 的解析与预警提取，返回result字典
+    不访问网络，也不改动持久化的状态：读数不写入观测历史，解析结果不保存
+    """
+    from .cwa_weather_fetcher import fetch_weather_all
+    from .dataset_cache import reset_dataset_cache, set_dataset_source
+    from .rolling_window import reset_window_store
+    source = archive_source(at)
+    reset_dataset_cache()
+    reset_window_store()
+    set_dataset_source(source)
+    try:
+        result = fetch_weather_all(reset_cache=False, record_history=False)
+    finally:
+        set_dataset_source(None)
+    for dataset_id, fetched_at in sorted(source.replayed.items()):
+        print(f"📼 {dataset_id}：{format_time(fetched_at)}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CWA原始数据归档")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出已归档的数据集")
+    show = sub.add_parser("show", help="输出某个数据集在某一时刻的原始响应")
+    show.add_argument("dataset_id")
+    show.add_argument("--at", default=None, help="台北时间，默认最新")
+    run = sub.add_parser("replay", help="用归档数据重跑数据解析与预警提取")
+    run.add_argument("--at", default=None, help="台北时间，默认最新")
+    args = parser.parse_args()
+
+    archive = get_archive()
+    at = parse_time(args.at) if getattr(args, "at", None) else None
+    if args.command == "list":
+        for dataset_id, params_hash in archive.keys():
+            entries = archive.history(dataset_id)
+            suffix = "" if params_hash == b"\0" * 8 else f" [{params_hash.hex()}]"
+            if entries:
+                print(f"{dataset_id}{suffix}：{len(entries)} 次，{format_time(entries[0].fetched_at)} ~ "
+                      f"{format_time(entries[-1].fetched_at)}，最新 {entries[-1].raw_length / 1024:.1f} KB")
+            else:
+                print(f"{dataset_id}{suffix}：带查询参数")
+    elif args.command == "show":
+        entry = archive.lookup(args.dataset_id, at)
+        if entry is None:
+            print(f"❌ 没有 {args.dataset_id} 的归档数据")
+            sys.exit(1)
+        sys.stdout.buffer.write(archive.read(entry))
+    else:
+        result = replay(at)
+        for warning in result.get("warnings", []):
+            print(f"- [{warning.get('city', '')}] {warning.get('title', '')}: {warning.get('text', '')}")
+
+
+if __name__ == "__main__":
+    main()
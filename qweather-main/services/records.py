@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据记录模块
+预警、逐时预报、日预报和观测条目的定长记录类型（__slots__，不带实例字典）：
+数值字段在构造时解析一次，之后直接按数值使用，不再反复 isdigit()/int()；
+记录同时实现只读的字典接口（rec["temp"]、rec.get("tempMax")），
+字典形式的键和取值与原有结构一致，现有按字典读取的代码无需修改；
+需要数值的代码使用 typed_value(item, key)，记录直接取解析后的值，旧结构的字典才解析字符串
+"""
+
+from collections.abc import Mapping
+
+
+def parse_number(raw):
+    """CWA原始值转为数值：整数字符串为int，其余数值为float，空值或无法解析时为None"""
+    if raw is None or isinstance(raw, bool):
+        return None
+    if isinstance(raw, (int, float)):
+        return raw
+    text = str(raw).strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return None if value != value else value
+
+def typed_value(item, key):
+    """按键取数值：记录取构造时解析好的值，原有结构的字典按 parse_number 解析"""
+    if isinstance(item, Record):
+        return item.typed(key)
+    return parse_number(item.get(key))
+
+def format_number(value):
+    """数值转回CWA原始字符串形式，None为空字符串"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Record(Mapping):
+    """
+    记录基类
+    FIELDS   字典形式的键（与属性同名），按输出顺序排列
+    NUMERIC  数值字段：构造时解析为int/float，字典形式导出为原始字符串
+    OPTIONAL 可选字段：值为None时字典形式中不出现该键
+    其余字段为文字，缺省为空字符串；不在FIELDS中的键保存在 _extra 中
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+    NUMERIC = frozenset()
+    OPTIONAL = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            self.set(name, fields.pop(name, None))
+        self._extra = fields or None
+
+    @classmethod
+    def from_dict(cls, data):
+        """由原有结构的字典构造；已是该类型的记录时原样返回"""
+        if isinstance(data, cls):
+            return data
+        return cls(**data)
+
+    def set(self, name, value):
+        """设置字段（数值字段同时完成解析）"""
+        if name in self.NUMERIC:
+            value = parse_number(value)
+        elif value is None and name not in self.OPTIONAL:
+            value = ""
+        setattr(self, name, value)
+
+    def typed(self, key):
+        """按键取解析后的值（数值字段为int/float），不导出为字符串；没有该键时为None"""
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        if self._extra is not None:
+            return self._extra.get(key)
+        return None
+
+    def _export(self, name):
+        value = getattr(self, name)
+        return format_number(value) if name in self.NUMERIC else value
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            if key in self.OPTIONAL and getattr(self, key) is None:
+                raise KeyError(key)
+            return self._export(key)
+        if self._extra is not None:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        for name in self.FIELDS:
+            if name not in self.OPTIONAL or getattr(self, name) is not None:
+                yield name
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        """导出为原有结构的字典"""
+        return {key: self[key] for key in self}
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.FIELDS) + (self._extra,)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.FIELDS, state):
+            setattr(self, name, value)
+        self._extra = state[-1]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class WarningEntry(Record):
+    """预警条目"""
+
+    __slots__ = (
+        "title", "text", "city", "type", "source",
+        "phenomena", "significance", "startTime", "endTime", "issueTime", "updateTime",
+        "magnitude", "depth", "originTime", "earthquakeTime",
+        "temperature", "windSpeed", "rainfall24h", "rainfall1h", "precipitationValue", "obsTime",
+        "typhoonName", "scale", "maxWindSpeed", "pressure", "latitude", "longitude"
+    )
+    FIELDS = __slots__
+    OPTIONAL = frozenset(__slots__[5:])
+
+
+class HourlyForecast(Record):
+    """逐时段预报（fxTime 为规范化的台北时间）"""
+
+    __slots__ = ("fxTime", "text", "icon", "temp", "humidity", "windSpeed", "precip", "tempMax", "tempMin")
+    FIELDS = __slots__
+    NUMERIC = frozenset(("temp", "humidity", "precip", "tempMax", "tempMin"))
+    OPTIONAL = frozenset(("tempMax", "tempMin"))
+
+
+class DailyForecast(Record):
+    """日预报"""
+
+    __slots__ = ("fxDate", "textDay", "textNight", "tempMax", "tempMin", "precip")
+    FIELDS = __slots__
+    NUMERIC = frozenset(("tempMax", "tempMin", "precip"))
+
+
+class Observation(Record):
+    """观测异常条目，字典形式中 value 带单位（如 "38.5°C"）"""
+
+    __slots__ = ("station", "type", "value", "unit")
+    FIELDS = ("station", "type", "value")
+    OPTIONAL = frozenset(("type",))
+
+    def __init__(self, station, value, unit="", type=None):
+        self.station = station
+        self.type = type
+        self.value = value
+        self.unit = unit
+        self._extra = None
+
+    def _export(self, name):
+        if name == "value":
+            return f"{self.value}{self.unit}"
+        return getattr(self, name)
+
+    def __getstate__(self):
+        return (self.station, self.type, self.value, self.unit)
+
+    def __setstate__(self, state):
+        self.station, self.type, self.value, self.unit = state
+        self._extra = None
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滑动窗口统计模块
+每个测站按配置的时间窗（默认1小时、3小时、24小时）维护观测队列，新的观测快照到达时增量更新：
+累积雨量为滚动求和，最高/最低气温用单调队列维护，样本进出窗口各一次，单次更新均摊O(1)；
+窗口统计以 RAIN_3H、TEMP_MAX_24H、TEMP_DELTA_3H 等要素名提供给观测规则引擎
+
+进程内首次使用时从观测历史填充最近的读数，常驻模式下窗口在各轮之间保留在内存中；
+窗口尚未覆盖完整时间窗时（冷启动、没有历史），累积雨量使用测站记录自带的 Past{N}hr 值
+"""
+
+import os
+import threading
+from collections import deque
+from .observation_history import (
+    HISTORY_DATASETS, OBS_HISTORY_ENABLED, extract_reading, past_rainfall, rain_increment, recent_readings
+)
+from .station_registry import get_station_registry
+
+ROLLING_WINDOWS = os.getenv("ROLLING_WINDOWS", "1h,3h,24h")  # 时间窗，逗号分隔，支持 m/h/d 单位
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_windows(text):
+    """
+    解析时间窗配置
+    :return: [(标签, 秒数)]，如 [("1H", 3600), ("3H", 10800)]
+    """
+    windows = []
+    for part in text.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        unit = WINDOW_UNITS.get(part[-1])
+        if unit is None:
+            raise ValueError(f"无法解析时间窗: {part}")
+        windows.append((part.upper(), int(float(part[:-1]) * unit)))
+    return windows
+
+
+class RollingWindow:
+    """
+    单个时间窗 (最新观测时间 - span, 最新观测时间] 内的统计
+    rain 为窗内各次读数降雨增量之和；temp_delta 为最新气温与窗口起点（最后一个移出窗口的读数）的差值
+    """
+
+    __slots__ = ("span", "_samples", "_rain", "_max", "_min", "_anchor")
+
+    def __init__(self, span):
+        self.span = span
+        self._samples = deque()  # (观测时间, 降雨增量, 气温)
+        self._rain = 0.0
+        self._max = deque()      # 气温单调递减队列 (观测时间, 气温)
+        self._min = deque()      # 气温单调递增队列
+        self._anchor = None      # 最后一个移出窗口的读数的气温
+
+    def push(self, obs_time, rain, temp):
+        self._samples.append((obs_time, rain, temp))
+        if rain:
+            self._rain += rain
+        if temp is not None:
+            while self._max and self._max[-1][1] <= temp:
+                self._max.pop()
+            self._max.append((obs_time, temp))
+            while self._min and self._min[-1][1] >= temp:
+                self._min.pop()
+            self._min.append((obs_time, temp))
+        self._evict(obs_time - self.span)
+
+    def _evict(self, cutoff):
+        samples = self._samples
+        while samples and samples[0][0] <= cutoff:
+            _, rain, temp = samples.popleft()
+            if rain:
+                self._rain -= rain
+            if temp is not None:
+                self._anchor = temp
+        while self._max and self._max[0][0] <= cutoff:
+            self._max.popleft()
+        while self._min and self._min[0][0] <= cutoff:
+            self._min.popleft()
+        if not samples:
+            self._rain = 0.0  # 清除浮点累计误差
+
+    @property
+    def covered(self):
+        """是否已有读数移出窗口，即窗内读数覆盖了完整的时间窗"""
+        return self._anchor is not None
+
+    @property
+    def rain(self):
+        return round(self._rain, 1) if self._samples else None
+
+    @property
+    def temp_max(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def temp_min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def temp_delta(self):
+        latest = self._samples[-1][2] if self._samples else None
+        start = self._anchor
+        if start is None:
+            start = next((temp for _, _, temp in self._samples if temp is not None), None)
+        if latest is None or start is None:
+            return None
+        return round(latest - start, 1)
+
+
+class StationWindows:
+    """单个测站的全部时间窗，past 为最新测站记录自带的累积雨量 {时间窗标签: 值}"""
+
+    __slots__ = ("name", "last_obs", "last_rain", "windows", "past")
+
+    def __init__(self, name, windows):
+        self.name = name
+        self.last_obs = None
+        self.last_rain = None
+        self.windows = [(label, RollingWindow(span)) for label, span in windows]
+        self.past = {}
+
+    def push(self, obs_time, temp, rain_now, rain):
+        """追加一次读数，不晚于上一次读数的观测忽略，返回是否追加"""
+        if self.last_obs is not None and obs_time <= self.last_obs:
+            return False
+        for _, window in self.windows:
+            window.push(obs_time, rain, temp)
+        self.last_obs = obs_time
+        self.last_rain = rain_now
+        return True
+
+    def elements(self):
+        """(要素名, 值)：RAIN_{窗口}、TEMP_MAX_{窗口}、TEMP_MIN_{窗口}、TEMP_DELTA_{窗口}"""
+        for label, window in self.windows:
+            rain = window.rain
+            if not window.covered and self.past.get(label) is not None:
+                rain = self.past[label]
+            yield f"RAIN_{label}", rain
+            yield f"TEMP_MAX_{label}", window.temp_max
+            yield f"TEMP_MIN_{label}", window.temp_min
+            yield f"TEMP_DELTA_{label}", window.temp_delta
+
+
+class WindowStore:
+    """全部测站的滑动窗口"""
+
+    def __init__(self, windows=None):
+        self.windows = parse_windows(ROLLING_WINDOWS) if windows is None else list(windows)
+        self._stations = {}
+        self._latest = None  # 全部测站中最新的观测时间
+        self.seeded = False  # 是否已从观测历史填充
+        self._lock = threading.Lock()
+        self._seed_lock = threading.Lock()  # 填充完成前阻塞 update()
+
+    def __len__(self):
+        return len(self._stations)
+
+    def _is_current(self, station):
+        """测站的最新读数是否仍在最短时间窗内（停报测站的窗口统计不再参与规则求值）"""
+        shortest = min(span for _, span in self.windows)
+        return station.last_obs is not None and station.last_obs > self._latest - shortest
+
+    def _station(self, station_id, name):
+        station = self._stations.get(station_id)
+        if station is None:
+            station = self._stations[station_id] = StationWindows(name, self.windows)
+        elif name:
+            station.name = name
+        return station
+
+    def seed(self, rows):
+        """用历史读数 [(测站ID, 测站名, 观测时间, 气温, 当日累积雨量, 降雨增量)]（按时间排列）填充"""
+        with self._lock:
+            for station_id, name, obs_time, temp, rain_now, rain in rows:
+                self._station(station_id, name).push(obs_time, temp, rain_now, rain)
+                self._latest = max(self._latest or obs_time, obs_time)
+
+    def ensure_seeded(self, loader):
+        """
+        首次调用时用 loader() 返回的历史读数填充（检查与填充在同一把锁内完成，只执行一次）
+        并发的其他线程在填充完成前等待，避免其快照先写入后历史读数因观测时间较早被丢弃
+        """
+        with self._seed_lock:
+            if self.seeded:
+                return
+            self.seeded = True
+            self.seed(loader())
+
+    def update(self, stations):
+        """
+        追加一次观测快照（Station对象列表），已处理过的观测时间不会重复累加
+        :return: 追加的读数条数
+        """
+        added = 0
+        with self._seed_lock, self._lock:
+            for station in stations:
+                if not station.station_id:
+                    continue
+                reading = extract_reading(station.record)
+                if reading is None:
+                    continue
+                obs_time, temp, _, _, rain_now = reading
+                windows = self._station(station.station_id, station.name)
+                rain = rain_increment(obs_time, rain_now, windows.last_obs, windows.last_rain)
+                if windows.push(obs_time, temp, rain_now, rain):
+                    added += 1
+                    windows.past = {
+                        label: past_rainfall(station.record, span // 3600)
+                        for label, span in self.windows if span % 3600 == 0
+                    }
+                self._latest = max(self._latest or obs_time, obs_time)
+        return added
+
+    def elements(self, station_id):
+        """单个测站的窗口统计 (要素名, 值)，没有该测站或测站已停报时为空"""
+        with self._lock:
+            station = self._stations.get(station_id)
+            return list(station.elements()) if station is not None and self._is_current(station) else []
+
+    def records(self):
+        """全部测站的窗口统计，供 RuleSet.evaluate(records, extract=dict.items) 使用"""
+        with self._lock:
+            return [
+                {"StationId": station_id, "StationName": station.name, **dict(station.elements())}
+                for station_id, station in self._stations.items() if self._is_current(station)
+            ]
+
+    def longest(self):
+        return max((span for _, span in self.windows), default=0)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_window_store():
+    """进程内共享的滑动窗口"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WindowStore()
+        return _store
+
+def _history_rows(store, stations):
+    """
+    进程内首次更新前用于填充的观测历史，截至本次快照的读数
+    （以快照的观测时间为终点，回放归档时同样适用）
+    """
+    readings = (extract_reading(station.record) for station in stations)
+    end = max((reading[0] for reading in readings if reading is not None), default=None)
+    if end is None or not OBS_HISTORY_ENABLED:
+        return []
+    try:
+        # 多取1小时，使最长窗口也有起点读数（用于气温变化）
+        return recent_readings(store.longest() / 3600 + 1, end=end)
+    except Exception as e:
+        print(f"⚠️ 从观测历史填充滑动窗口失败: {e}")
+        return []
+
+def update_rolling_windows(dataset_ids=HISTORY_DATASETS, timeout=15):
+    """把本次运行的测站数据追加到滑动窗口（数据集从数据集缓存读取），返回窗口"""
+    store = get_window_store()
+    for dataset_id in dataset_ids:
+        try:
+            stations = get_station_registry(dataset_id, timeout=timeout).stations
+            store.ensure_seeded(lambda: _history_rows(store, stations))
+            store.update(stations)
+        except Exception as e:
+            print(f"⚠️ 更新{dataset_id}滑动窗口失败: {e}")
+    return store
+
+def reset_window_store():
+    """丢弃内存中的滑动窗口（下次更新时重新从观测历史填充）"""
+    global _store
+    with _store_lock:
+        _store = None
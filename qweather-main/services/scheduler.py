@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻调度模块
+进程常驻，连接池、数据集缓存和AI缓存保持热状态；
+各数据源按各自的刷新周期（带随机抖动）失效并重新获取，数据变化时才重新发布
+"""
+
+import os
+import random
+import signal
+import threading
+import time
+from .dataset_cache import invalidate_dataset, invalidate_failed, cached_dataset_ids, reset_dataset_cache
+
+# 按数据集ID前缀的刷新周期（秒），匹配最长前缀
+REFRESH_INTERVALS = {
+    "O-": 600,    # 观测数据：10分钟
+    "F-": 3600,   # 天气预报：1小时
+    "E-": 60,     # 地震报告：1分钟
+    "W-": 300,    # 台风/特报：5分钟
+    "C-": 86400,  # 气候监测：1天
+}
+DEFAULT_INTERVAL = int(os.getenv("DAEMON_DEFAULT_INTERVAL", "600"))
+JITTER = float(os.getenv("DAEMON_JITTER", "0.1"))  # 刷新周期的随机抖动比例
+MIN_SLEEP = 1  # 两轮之间的最短等待（秒）
+COALESCE_WINDOW = 5  # 即将到期（秒）的数据源并入本轮，减少轮次
+
+
+def get_refresh_interval(dataset_id):
+    """获取数据集的刷新周期（秒）"""
+    matches = [prefix for prefix in REFRESH_INTERVALS if dataset_id.startswith(prefix)]
+    if not matches:
+        return DEFAULT_INTERVAL
+    return REFRESH_INTERVALS[max(matches, key=len)]
+
+
+class RefreshScheduler:
+    """记录每个数据集的下次刷新时间"""
+
+    def __init__(self, jitter=JITTER):
+        self.jitter = jitter
+        self._next_due = {}
+
+    def _schedule(self, dataset_id, now):
+        interval = get_refresh_interval(dataset_id)
+        offset = random.uniform(-self.jitter, self.jitter) * interval
+        self._next_due[dataset_id] = now + interval + offset
+
+    def track(self, dataset_ids, now):
+        """登记新出现的数据集（如按需请求的实时观测），已登记的保持原计划"""
+        for dataset_id in dataset_ids:
+            if dataset_id not in self._next_due:
+                self._schedule(dataset_id, now)
+
+    def pop_due(self, now):
+        """取出已到期（或即将到期）的数据集并安排下一次刷新"""
+        due = [dataset_id for dataset_id, due_at in self._next_due.items() if due_at <= now + COALESCE_WINDOW]
+        for dataset_id in due:
+            self._schedule(dataset_id, now)
+        return sorted(due)
+
+    def seconds_until_next(self, now):
+        """距最近一次到期的秒数"""
+        if not self._next_due:
+            return DEFAULT_INTERVAL
+        return max(MIN_SLEEP, min(self._next_due.values()) - now)
+
+
+def _install_signal_handlers(stop_event):
+    """SIGINT/SIGTERM时设置停止标志，当前一轮完成后退出"""
+    def handler(signum, frame):
+        print(f"\n🛑 收到信号 {signum}，当前一轮完成后退出")
+        stop_event.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, handler)
+
+def run_daemon(run_cycle, stop_event=None):
+    """
+    常驻运行
+    :param run_cycle: 执行一轮获取与发布的函数，签名为 run_cycle()，内部不应清空数据集缓存
+    :param stop_event: 可选的threading.Event，设置后退出；为None时安装信号处理
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+        _install_signal_handlers(stop_event)
+
+    scheduler = RefreshScheduler()
+    reset_dataset_cache()
+    print("🔁 常驻模式已启动")
+
+    while not stop_event.is_set():
+        cycle_started = time.time()
+        try:
+            run_cycle()
+        except Exception as e:
+            print(f"❌ 本轮运行失败：{e}")
+
+        # 失败/被放弃的数据源下一轮直接重试，新出现的数据集按周期登记
+        invalidate_failed()
+        now = time.time()
+        scheduler.track(cached_dataset_ids(), cycle_started)
+
+        due = []
+        while not due:
+            wait_seconds = scheduler.seconds_until_next(now)
+            print(f"💤 {wait_seconds:.0f} 秒后进行下一轮检查")
+            if stop_event.wait(wait_seconds):
+                break
+            now = time.time()
+            due = scheduler.pop_due(now)
+        if stop_event.is_set():
+            break
+
+        for dataset_id in due:
+            invalidate_dataset(dataset_id)
+        print(f"\n🔄 刷新数据源：{', '.join(due)}")
+
+    print("👋 常驻模式已退出")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+观测站索引模块
+从 O-A0002-001 / O-A0001-001 / O-A0003-001 等测站数据一次性建立测站登记表：
+按县市索引，并用经纬度网格支持"附近测站"/"最近的N个测站"查询，
+供观测数据与预警模块共用
+"""
+
+import math
+from .dataset_cache import get_parsed
+
+GRID_SIZE = 0.1  # 网格边长（度），约11公里
+EARTH_RADIUS_KM = 6371.0
+
+
+def normalize_county(name):
+    """统一县市名写法（台/臺）"""
+    return (name or "").replace("台", "臺")
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """两点间的球面距离（公里）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Station:
+    """测站基本信息，record为原始测站数据（含WeatherElement等观测值）"""
+
+    __slots__ = ("station_id", "name", "county", "town", "lat", "lon", "record")
+
+    def __init__(self, station_id, name, county, town, lat, lon, record):
+        self.station_id = station_id
+        self.name = name
+        self.county = county
+        self.town = town
+        self.lat = lat
+        self.lon = lon
+        self.record = record
+
+    def __repr__(self):
+        return f"Station({self.station_id!r}, {self.name!r}, {self.county!r})"
+
+
+def _parse_coordinates(geo_info):
+    """取WGS84坐标（没有时取第一组），无法解析时返回 (None, None)"""
+    coordinates = geo_info.get("Coordinates", [])
+    if isinstance(coordinates, dict):
+        coordinates = [coordinates]
+    chosen = None
+    for coordinate in coordinates:
+        if isinstance(coordinate, dict):
+            if chosen is None or coordinate.get("CoordinateName") == "WGS84":
+                chosen = coordinate
+    if chosen is None:
+        return None, None
+    try:
+        return float(chosen.get("StationLatitude")), float(chosen.get("StationLongitude"))
+    except (TypeError, ValueError):
+        return None, None
+
+
+class StationRegistry:
+    """测站登记表：县市索引 + 经纬度网格索引"""
+
+    __slots__ = ("stations", "_by_id", "_by_county", "_grid", "_bounds")
+
+    def __init__(self, stations):
+        self.stations = list(stations)
+        self._by_id = {}
+        self._by_county = {}
+        self._grid = {}
+        for station in self.stations:
+            self._by_id[station.station_id] = station
+            self._by_county.setdefault(station.county, []).append(station)
+            if station.lat is not None:
+                self._grid.setdefault(self._cell(station.lat, station.lon), []).append(station)
+        rows = [row for row, _ in self._grid]
+        cols = [col for _, col in self._grid]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols)) if self._grid else None
+
+    def __len__(self):
+        return len(self.stations)
+
+    @staticmethod
+    def _cell(lat, lon):
+        return int(math.floor(lat / GRID_SIZE)), int(math.floor(lon / GRID_SIZE))
+
+    @staticmethod
+    def _ring_km(lat):
+        """每圈网格距离的保守下界（公里）：经度方向按纬度余弦缩短"""
+        return GRID_SIZE * math.pi / 180 * EARTH_RADIUS_KM * math.cos(math.radians(min(abs(lat) + GRID_SIZE, 89.0)))
+
+    def _max_rings(self, center):
+        """覆盖全部有测站的格子所需的圈数"""
+        min_row, max_row, min_col, max_col = self._bounds
+        return max(abs(center[0] - min_row), abs(center[0] - max_row),
+                   abs(center[1] - min_col), abs(center[1] - max_col))
+
+    def get(self, station_id):
+        return self._by_id.get(station_id)
+
+    def counties(self):
+        return sorted(self._by_county)
+
+    def stations_in_county(self, county):
+        """某县市的全部测站（台/臺写法均可）"""
+        return list(self._by_county.get(normalize_county(county), []))
+
+    def _ring(self, center, radius):
+        """网格中与中心相距radius圈的格子"""
+        row, col = center
+        if radius == 0:
+            yield center
+            return
+        for dc in range(-radius, radius + 1):
+            yield row - radius, col + dc
+            yield row + radius, col + dc
+        for dr in range(-radius + 1, radius):
+            yield row + dr, col - radius
+            yield row + dr, col + radius
+
+    def nearest(self, lat, lon, k=3, max_distance_km=None):
+        """
+        距离给定坐标最近的k个测站
+        :return: [(距离公里, Station)]，按距离升序
+        """
+        if not self._grid:
+            return []
+        center = self._cell(lat, lon)
+        ring_km = self._ring_km(lat)
+
+        found = []
+        for radius in range(self._max_rings(center) + 1):
+            for cell in self._ring(center, radius):
+                for station in self._grid.get(cell, ()):
+                    found.append((haversine_km(lat, lon, station.lat, station.lon), station))
+            found.sort(key=lambda item: item[0])
+            # 下一圈的最近距离不小于 radius * ring_km，已找到的k个都比它近时即可停止
+            if len(found) >= k and found[k - 1][0] <= radius * ring_km:
+                break
+            if max_distance_km is not None and radius * ring_km > max_distance_km:
+                break
+
+        if max_distance_km is not None:
+            found = [item for item in found if item[0] <= max_distance_km]
+        return found[:k]
+
+    def stations_near(self, lat, lon, radius_km):
+        """给定坐标radius_km公里内的全部测站，[(距离公里, Station)] 按距离升序"""
+        if not self._grid:
+            return []
+        center = self._cell(lat, lon)
+        rings = min(int(math.ceil(radius_km / self._ring_km(lat))) + 1, self._max_rings(center))
+        found = []
+        for radius in range(rings + 1):
+            for cell in self._ring(center, radius):
+                for station in self._grid.get(cell, ()):
+                    distance = haversine_km(lat, lon, station.lat, station.lon)
+                    if distance <= radius_km:
+                        found.append((distance, station))
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+def build_station_registry(data):
+    """从测站观测数据（records.Station 列表）建立测站登记表"""
+    stations = []
+    if data.get("success") == "true":
+        for record in data.get("records", {}).get("Station", []):
+            if not isinstance(record, dict):
+                continue
+            geo_info = record.get("GeoInfo", {}) or {}
+            lat, lon = _parse_coordinates(geo_info)
+            stations.append(Station(
+                station_id=record.get("StationId", ""),
+                name=record.get("StationName", ""),
+                county=normalize_county(geo_info.get("CountyName", "")),
+                town=geo_info.get("TownName", ""),
+                lat=lat,
+                lon=lon,
+                record=record
+            ))
+    return StationRegistry(stations)
+
+def get_station_registry(dataset_id="O-A0002-001", timeout=15):
+    """获取测站登记表（同一次运行内只建立一次，数据未变化时跨运行复用）"""
+    return get_parsed(dataset_id, build_station_registry, timeout=timeout)
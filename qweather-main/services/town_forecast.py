@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+乡镇预报列式存储模块
+将 F-D0047 乡镇预报解析为 区域 × 元素 × 时间 的列式结构：
+数值列为二维浮点数组（安装numpy时使用numpy，否则使用标准库array），
+文字列（天气现象、综合描述、天气代码等）按类别编码存储，
+内存占用与数据量成正比，而不是嵌套的JSON字典
+"""
+
+from array import array
+from bisect import bisect_left
+from .dataset_cache import get_parsed
+from .forecast_series import normalize_time
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，缺失时使用标准库array
+    np = None
+
+MISSING_CODE = -1
+
+
+def _get(mapping, *names):
+    """按多个候选键取值（兼容CWA新旧版本的大小写差异）"""
+    for name in names:
+        if name in mapping:
+            return mapping[name]
+    return None
+
+def _format_number(value):
+    """数值转回CWA原始字符串形式"""
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _is_numeric(raw):
+    """原始值能否无损地以浮点数存储（"05"这类补零代码按文字处理）"""
+    if not isinstance(raw, str):
+        return False
+    try:
+        return _format_number(float(raw)) == raw
+    except ValueError:
+        return False
+
+
+class TownForecastStore:
+    """
+    乡镇预报列式存储
+    列名为 "元素名/值名"，如 "溫度/Temperature"、"天氣現象/Weather"
+    时间统一为 "YYYY-MM-DD HH:MM:SS"（台北时间），按升序排列
+    """
+
+    __slots__ = ("districts", "times", "_district_index", "_time_index", "_numeric", "_categorical")
+
+    def __init__(self, districts, times):
+        self.districts = list(districts)
+        self.times = list(times)
+        self._district_index = {name: i for i, name in enumerate(self.districts)}
+        self._time_index = {t: i for i, t in enumerate(self.times)}
+        self._numeric = {}      # 列名 → (区域数 × 时间数) 浮点数组，NaN表示缺失
+        self._categorical = {}  # 列名 → (类别列表, (区域数 × 时间数) 编码数组)，-1表示缺失
+
+    @property
+    def columns(self):
+        return sorted(list(self._numeric) + list(self._categorical))
+
+    def columns_for(self, element_name):
+        """某个元素包含的列名"""
+        prefix = f"{element_name}/"
+        return [name for name in self.columns if name.startswith(prefix)]
+
+    def is_numeric(self, column):
+        return column in self._numeric
+
+    def _add_column(self, column, cells):
+        """cells: {(区域序号, 时间序号): 原始字符串}"""
+        size = len(self.districts) * len(self.times)
+        width = len(self.times)
+
+        if all(_is_numeric(raw) for raw in cells.values()):
+            if np is not None:
+                values = np.full((len(self.districts), width), np.nan)
+                for (d, t), raw in cells.items():
+                    values[d, t] = float(raw)
+            else:
+                values = array("d", [float("nan")]) * size
+                for (d, t), raw in cells.items():
+                    values[d * width + t] = float(raw)
+            self._numeric[column] = values
+            return
+
+        categories = []
+        category_index = {}
+        if np is not None:
+            codes = np.full((len(self.districts), width), MISSING_CODE, dtype=np.int32)
+        else:
+            codes = array("i", [MISSING_CODE]) * size
+        for (d, t), raw in cells.items():
+            raw = "" if raw is None else str(raw)
+            code = category_index.get(raw)
+            if code is None:
+                code = category_index[raw] = len(categories)
+                categories.append(raw)
+            if np is not None:
+                codes[d, t] = code
+            else:
+                codes[d * width + t] = code
+        self._categorical[column] = (categories, codes)
+
+    def time_slice(self, start=None, end=None):
+        """时间窗口 [start, end) 对应的下标切片，时间格式同 normalize_time"""
+        lo = 0 if start is None else bisect_left(self.times, normalize_time(start))
+        hi = len(self.times) if end is None else bisect_left(self.times, normalize_time(end))
+        return slice(lo, hi)
+
+    def _cell(self, column, d, t):
+        width = len(self.times)
+        if column in self._numeric:
+            values = self._numeric[column]
+            value = values[d, t] if np is not None else values[d * width + t]
+            return None if value != value else float(value)
+        categories, codes = self._categorical[column]
+        code = codes[d, t] if np is not None else codes[d * width + t]
+        return None if code == MISSING_CODE else categories[code]
+
+    def series(self, district, column, start=None, end=None):
+        """单个区域某列在时间窗口内的取值列表（缺失为None）"""
+        d = self._district_index[district]
+        window = self.time_slice(start, end)
+        return [self._cell(column, d, t) for t in range(window.start, window.stop)]
+
+    def matrix(self, column, start=None, end=None):
+        """
+        某列在时间窗口内的 区域 × 时间 数据
+        数值列在有numpy时返回二维数组视图（不复制），其余情况返回嵌套列表
+        """
+        window = self.time_slice(start, end)
+        if column in self._numeric and np is not None:
+            return self._numeric[column][:, window]
+        return [
+            [self._cell(column, d, t) for t in range(window.start, window.stop)]
+            for d in range(len(self.districts))
+        ]
+
+    def value(self, district, column, fx_time):
+        """单个区域某列在某个时间的取值，不存在时返回None"""
+        d = self._district_index.get(district)
+        t = self._time_index.get(normalize_time(fx_time))
+        if d is None or t is None or (column not in self._numeric and column not in self._categorical):
+            return None
+        return self._cell(column, d, t)
+
+    def first_value(self, district, column):
+        """
+        单个区域某列最早的有效值
+        :return: (时间, 原始字符串形式的值)，没有数据时返回 (None, None)
+        """
+        d = self._district_index.get(district)
+        if d is None or (column not in self._numeric and column not in self._categorical):
+            return None, None
+        for t, fx_time in enumerate(self.times):
+            value = self._cell(column, d, t)
+            if value is not None:
+                if isinstance(value, float):
+                    value = _format_number(value)
+                return fx_time, value
+        return None, None
+
+    def nbytes(self):
+        """数值与编码数组占用的字节数（不含类别字符串）"""
+        total = 0
+        for values in self._numeric.values():
+            total += values.nbytes if np is not None else values.itemsize * len(values)
+        for _, codes in self._categorical.values():
+            total += codes.nbytes if np is not None else codes.itemsize * len(codes)
+        return total
+
+
+def build_town_forecast_store(data):
+    """从 F-D0047 乡镇预报数据构建列式存储（兼容 locations/Locations 等两种键名）"""
+    districts = []
+    district_index = {}
+    cells = {}  # 列名 → {(区域序号, 时间): 原始值}
+    times = set()
+
+    records = data.get("records", {}) if data.get("success") == "true" else {}
+    for group in _get(records, "locations", "Locations") or []:
+        for location in _get(group, "location", "Location") or []:
+            name = _get(location, "locationName", "LocationName") or ""
+            d = district_index.get(name)
+            if d is None:
+                d = district_index[name] = len(districts)
+                districts.append(name)
+
+            for element in _get(location, "weatherElement", "WeatherElement") or []:
+                element_name = _get(element, "elementName", "ElementName") or ""
+                for time_data in _get(element, "time", "Time") or []:
+                    fx_time = normalize_time(_get(time_data, "StartTime", "startTime", "DataTime", "dataTime") or "")
+                    values = _get(time_data, "elementValue", "ElementValue") or [{}]
+                    value = values[0] if isinstance(values, list) and values else values
+                    if not isinstance(value, dict):
+                        continue
+                    times.add(fx_time)
+                    for key, raw in value.items():
+                        cells.setdefault(f"{element_name}/{key}", {})[(d, fx_time)] = raw
+
+    store = TownForecastStore(districts, sorted(times))
+    for column, column_cells in cells.items():
+        store._add_column(column, {
+            (d, store._time_index[fx_time]): raw for (d, fx_time), raw in column_cells.items()
+        })
+    return store
+
+def get_town_forecast_store(dataset_id, timeout=10):
+    """获取乡镇预报列式存储（同一次运行内只解析一次，数据未变化时跨运行复用）"""
+    return get_parsed(dataset_id, build_town_forecast_store, timeout=timeout)
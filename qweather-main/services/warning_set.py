@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预警集合模块
+以归一化键（城市、灾害类别、有效时段）对预警做哈希去重：
+不同来源描述同一灾害时按来源优先级合并（官方特报优先于根据预报关键词推断的提醒），
+每次加入只查看同一城市同一灾害下的少数几条，不需要扫描全部预警
+"""
+
+from .forecast_series import normalize_time
+from .station_registry import normalize_county
+from .records import WarningEntry
+
+# 灾害类别及其在各来源文字中的写法（简繁体），按顺序匹配，较具体的写法在前
+HAZARD_ALIASES = [
+    ("豪雨", ("豪雨",)),
+    ("大雨", ("大雨",)),
+    ("雷雨", ("大雷雨", "雷雨", "雷陣雨", "雷阵雨")),
+    ("阵雨", ("陣雨", "阵雨")),
+    ("暴风雨", ("暴風雨", "暴风雨")),
+    ("台风", ("颱風", "台风", "台風", "颱风")),
+    ("强风", ("強風", "强风")),
+    ("浓雾", ("濃霧", "浓雾")),
+    ("冰雹", ("冰雹",)),
+    ("低温", ("低溫", "低温")),
+    ("高温", ("高溫", "高温")),
+    ("降雨机率", ("降雨機率", "降雨机率")),
+]
+
+# 各类预警的优先级，数值越大越优先；未列出的类型按关键词推断的提醒处理
+TYPE_PRIORITY = {
+    "官方特报": 3,
+    "官方预警": 3,
+    "区域预警": 3,
+    "地震预警": 3,
+    "台风路径": 3,
+    "观测预警": 2,
+    "气候预警": 2,
+}
+DEFAULT_PRIORITY = 1
+
+
+def normalize_hazard(text):
+    """从关键词、现象名称或标题中归纳灾害类别，无法归类时返回None"""
+    if not text:
+        return None
+    for hazard, aliases in HAZARD_ALIASES:
+        for alias in aliases:
+            if alias in text:
+                return hazard
+    return None
+
+def warning_priority(warning):
+    return TYPE_PRIORITY.get(warning.get("type", ""), DEFAULT_PRIORITY)
+
+def _window(warning):
+    """有效时段 (开始, 结束)，没有时段信息时返回None"""
+    start = warning.get("startTime") or ""
+    end = warning.get("endTime") or ""
+    if not start and not end:
+        return None
+    return (normalize_time(start) if start else "", normalize_time(end) if end else "")
+
+def _overlaps(window, other):
+    """两个时段是否重叠（任一方没有时段信息时视为重叠）"""
+    if window is None or other is None:
+        return True
+    start, end = window
+    other_start, other_end = other
+    return (not end or not other_start or other_start < end) and (not other_end or not start or start < other_end)
+
+def _split_cities(city):
+    """多地区预警（"臺北市, 新北市"）按各城市分别索引"""
+    return [normalize_county(name.strip()) for name in (city or "").split(",") if name.strip()]
+
+
+class WarningSet:
+    """
+    预警集合，按加入顺序输出（加入时转为 WarningEntry 记录）
+    有灾害类别的预警以 (城市, 灾害类别) 为键索引，有效时段重叠的视为同一预警；
+    没有灾害类别的预警（地震、台风路径、测站观测等）只去除完全相同的重复项
+    """
+
+    __slots__ = ("_warnings", "_slots", "_exact", "_cities")
+
+    def __init__(self, warnings=None):
+        self._warnings = []  # 被更高优先级替换的位置置为None
+        self._slots = {}     # (城市, 灾害类别) → [(位置, 优先级, 有效时段)]
+        self._exact = set()  # (城市, 标题, 文字)
+        self._cities = {}    # 城市 → 预警条数
+        if warnings:
+            self.extend(warnings)
+
+    def __len__(self):
+        return sum(1 for warning in self._warnings if warning is not None)
+
+    def __iter__(self):
+        return (warning for warning in self._warnings if warning is not None)
+
+    def to_list(self):
+        return list(self)
+
+    def has(self, city, hazard):
+        """城市是否已有该灾害类别的预警"""
+        return bool(self._slots.get((normalize_county(city), normalize_hazard(hazard))))
+
+    def has_city(self, city):
+        """
+        城市是否已有任何预警：多地区预警（"臺北市, 新北市"）对其中每个城市都算，
+        县市名的台/臺写法视为相同；已被更高优先级替换的预警不算
+        """
+        return self._cities.get(normalize_county(city), 0) > 0
+
+    def _remove(self, position, hazard):
+        warning = self._warnings[position]
+        self._warnings[position] = None
+        self._exact.discard((warning.get("city", ""), warning.get("title", ""), warning.get("text", "")))
+        for city in _split_cities(warning.get("city", "")):
+            self._cities[city] -= 1
+            key = (city, hazard)
+            self._slots[key] = [entry for entry in self._slots.get(key, ()) if entry[0] != position]
+
+    def add(self, warning, hazard=None):
+        """
+        加入一条预警
+        :param hazard: 灾害关键词，不指定时从预警的 phenomena 字段归纳
+        :return: 是否加入（与已有预警重复且优先级不高于它时返回False）
+        """
+        warning = WarningEntry.from_dict(warning)
+        exact_key = (warning.get("city", ""), warning.get("title", ""), warning.get("text", ""))
+        if exact_key in self._exact:
+            return False
+
+        cities = _split_cities(warning.get("city", ""))
+        hazard = normalize_hazard(hazard or warning.get("phenomena", ""))
+        if hazard is not None and cities:
+            priority = warning_priority(warning)
+            window = _window(warning)
+            covered = 0
+            replaced = []
+            for city in cities:
+                conflicts = [entry for entry in self._slots.get((city, hazard), ()) if _overlaps(entry[2], window)]
+                if any(entry[1] >= priority for entry in conflicts):
+                    covered += 1
+                else:
+                    replaced.extend(conflicts)
+            if covered == len(cities):
+                return False
+            # 优先级更高的来源替换已有的低优先级预警
+            for position, _, _ in replaced:
+                if self._warnings[position] is not None:
+                    self._remove(position, hazard)
+            position = len(self._warnings)
+            for city in cities:
+                self._slots.setdefault((city, hazard), []).append((position, priority, window))
+
+        self._exact.add(exact_key)
+        for city in cities:
+            self._cities[city] = self._cities.get(city, 0) + 1
+        self._warnings.append(warning)
+        return True
+
+    def extend(self, warnings):
+        for warning in warnings:
+            self.add(warning)
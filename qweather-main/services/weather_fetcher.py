@@ -5,8 +5,11 @@
 负责获取中央气象署的天气数据
 """
 
-from .http_client import safe_request
-from .city_config import get_cwa_api_key
+from .dataset_cache import fetch_dataset
+from .county_forecast import get_county_weather_elements
+from .forecast_series import ForecastSeries
+from .records import DailyForecast, format_number
+from .town_forecast import get_town_forecast_store
 from .observation_fetcher import fetch_observation_data_for_city
 
 def fetch_cwa_weather(city_name, city_config):
@@ -20,184 +23,87 @@ def fetch_cwa_weather(city_name, city_config):
         "observations": {}  # 添加观测数据字段
     }
     
+    series = ForecastSeries()
+    
     try:
-        # 1. 获取36小时天气预报（基础预报）
-        url = "https://opendata.cwa.gov.tw/api/v1/rest/datastore/F-C0032-001"
-        params = {
-            "Authorization": get_cwa_api_key(),
-            "format": "JSON",
-            "locationName": city_config["cwa_id"]
-        }
-        
-        resp = safe_request(url, params=params, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            if data.get("success") == "true":
-                records = data.get("records", {})
-                locations = records.get("location", [])
+        # 1. 获取36小时天气预报（基础预报，来自全县市批量索引）
+        weather_elements = get_county_weather_elements(city_config["cwa_id"])
+        if weather_elements:
+            # 解析天气元素
+            for element in weather_elements:
+                element_name = element.get("elementName", "")
+                times = element.get("time", [])
                 
-                if locations:
-                    location = locations[0]
-                    weather_elements = location.get("weatherElement", [])
-                    
-                    # 解析天气元素
-                    for element in weather_elements:
-                        element_name = element.get("elementName", "")
-                        times = element.get("time", [])
+                if times:
+                    # 获取今日和明日数据
+                    for time_data in times[:4]:  # 前4个时段（今日和明日）
+                        start_time = time_data.get("startTime", "")
+                        end_time = time_data.get("endTime", "")
+                        parameter = time_data.get("parameter", {})
                         
-                        if times:
-                            # 获取今日和明日数据
-                            for time_data in times[:4]:  # 前4个时段（今日和明日）
-                                start_time = time_data.get("startTime", "")
-                                end_time = time_data.get("endTime", "")
-                                parameter = time_data.get("parameter", {})
-                                
-                                # 构建小时数据
-                                if element_name == "Wx":  # 天气现象
-                                    weather_text = parameter.get("parameterName", "")
-                                    weather_code = parameter.get("parameterValue", "")
-                                    
-                                    # 检查是否已存在该时间的数据
-                                    existing_entry = None
-                                    for entry in weather_data["hourly"]:
-                                        if entry["fxTime"] == start_time:
-                                            existing_entry = entry
-                                            break
-                                    
-                                    if existing_entry:
-                                        existing_entry["text"] = weather_text
-                                        existing_entry["icon"] = weather_code
-                                    else:
-                                        # 创建新的小时数据条目
-                                        hourly_entry = {
-                                            "fxTime": start_time,
-                                            "text": weather_text,
-                                            "icon": weather_code,
-                                            "temp": "",
-                                            "humidity": "",
-                                            "windSpeed": "",
-                                            "precip": ""
-                                        }
-                                        weather_data["hourly"].append(hourly_entry)
-                                
-                                elif element_name == "MaxT":  # 最高温度
-                                    max_temp = parameter.get("parameterName", "")
-                                    # 更新对应时间的最高温度作为当前温度（近似值）
-                                    for entry in weather_data["hourly"]:
-                                        if entry["fxTime"] == start_time:
-                                            # 使用最高温度作为当前温度的近似值
-                                            entry["temp"] = max_temp
-                                            entry["tempMax"] = max_temp  # 添加最高温度字段
-                                            break
-                                
-                                elif element_name == "MinT":  # 最低温度
-                                    min_temp = parameter.get("parameterName", "")
-                                    # 更新对应时间的最低温度
-                                    for entry in weather_data["hourly"]:
-                                        if entry["fxTime"] == start_time:
-                                            entry["tempMin"] = min_temp  # 添加最低温度字段
-                                            break
-                                
-                                elif element_name == "PoP":  # 降雨机率
-                                    pop_value = parameter.get("parameterName", "")
-                                    # 更新对应时间的降雨机率
-                                    for entry in weather_data["hourly"]:
-                                        if entry["fxTime"] == start_time:
-                                            entry["precip"] = pop_value
-                                            break
-                
-                print(f"✅ 中央气象署 {city_name} 36小时预报获取成功")
-        
-        # 2. 获取乡镇预报（更详细的数据）
-        url = f"https://opendata.cwa.gov.tw/api/v1/rest/datastore/{city_config['dataset_id']}"
-        params = {
-            "Authorization": get_cwa_api_key(),
-            "format": "JSON"
-        }
-        
-        resp = safe_request(url, params=params, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            if data.get("success") == "true":
-                records = data.get("records", {})
-                locations = records.get("locations", [])
-                
-                if locations:
-                    location = locations[0]
-                    location_elements = location.get("location", [])
-                    
-                    # 获取第一个区域的详细数据作为代表
-                    if location_elements:
-                        first_area = location_elements[0]
-                        weather_elements = first_area.get("weatherElement", [])
+                        # 构建小时数据（按时间索引合并，无需线性查找）
+                        if element_name == "Wx":  # 天气现象
+                            point = series.get_or_create(start_time)
+                            point.text = parameter.get("parameterName", "")
+                            point.icon = parameter.get("parameterValue", "")
+                        
+                        elif element_name == "MaxT":  # 最高温度
+                            max_temp = parameter.get("parameterName", "")
+                            # 使用最高温度作为当前温度的近似值
+                            series.update(start_time, temp=max_temp, tempMax=max_temp)
+                        
+                        elif element_name == "MinT":  # 最低温度
+                            series.update(start_time, tempMin=parameter.get("parameterName", ""))
                         
-                        # 解析乡镇预报数据
-                        for element in weather_elements:
-                            element_name = element.get("elementName", "")
-                            times = element.get("time", [])
-                            
-                            if times:
-                                # 获取最新数据
-                                time_data = times[0]
-                                element_value = time_data.get("elementValue", [{}])[0]
-                                start_time = time_data.get("StartTime", "")
-                                
-                                if element_name == "天氣現象":
-                                    # 天气现象
-                                    weather_text = element_value.get("Weather", "")
-                                    weather_code = element_value.get("WeatherCode", "")
-                                    
-                                    # 转换时间格式以匹配36小时预报的格式
-                                    # 从 ISO 格式 (2025-07-30T12:00:00+08:00) 转换为简单格式 (2025-07-30 12:00:00)
-                                    simple_time = start_time.replace("T", " ").split("+")[0]
-                                    
-                                    # 更新对应时间的天气数据
-                                    for entry in weather_data["hourly"]:
-                                        if entry["fxTime"] == simple_time:
-                                            entry["text"] = weather_text
-                                            entry["icon"] = weather_code
-                                            break
-                                
-                                elif element_name == "3小時降雨機率":
-                                    # 降雨机率
-                                    pop_value = element_value.get("ProbabilityOfPrecipitation", "")
-                                    
-                                    # 转换时间格式
-                                    simple_time = start_time.replace("T", " ").split("+")[0]
-                                    
-                                    # 更新对应时间的降雨机率
-                                    for entry in weather_data["hourly"]:
-                                        if entry["fxTime"] == simple_time:
-                                            entry["precip"] = pop_value
-                                            break
-                                
-                                elif element_name == "天氣預報綜合描述":
-                                    # 综合描述，包含温度、湿度、风速等
-                                    description = element_value.get("WeatherDescription", "")
-                                    if description and not weather_data["now"]:
-                                        # 提取温度信息
-                                        if "溫度攝氏" in description:
-                                            temp_match = description.split("溫度攝氏")[1].split("度")[0]
-                                            if temp_match.isdigit():
-                                                weather_data["now"]["temp"] = temp_match
-                                        
-                                        # 提取湿度信息
-                                        if "相對濕度" in description:
-                                            humidity_match = description.split("相對濕度")[1].split("%")[0]
-                                            if humidity_match.isdigit():
-                                                weather_data["now"]["humidity"] = humidity_match
-                                        
-                                        # 提取风速信息
-                                        if "平均風速" in description:
-                                            wind_match = description.split("平均風速")[1].split("級")[0]
-                                            weather_data["now"]["windSpeed"] = wind_match
-                                        
-                                        # 提取天气描述
-                                        if "。" in description:
-                                            weather_text = description.split("。")[0]
-                                            weather_data["now"]["text"] = weather_text
+                        elif element_name == "PoP":  # 降雨机率
+                            series.update(start_time, precip=parameter.get("parameterName", ""))
             
-            print(f"✅ 中央气象署 {city_name} 乡镇预报获取成功")
+            print(f"✅ 中央气象署 {city_name} 36小时预报获取成功")
+        
+        # 2. 获取乡镇预报（更详细的数据，全部区域和时段解析为列式存储）
+        store = get_town_forecast_store(city_config['dataset_id'], timeout=10)
+        if store.districts:
+            # 获取第一个区域的详细数据作为代表
+            first_area = store.districts[0]
+            
+            # 天气现象（乡镇预报为ISO时间，由序列统一规范化后匹配）
+            fx_time, weather_text = store.first_value(first_area, "天氣現象/Weather")
+            if fx_time is not None:
+                _, weather_code = store.first_value(first_area, "天氣現象/WeatherCode")
+                series.update(fx_time, text=weather_text, icon=weather_code or "")
+            
+            # 降雨机率
+            fx_time, pop_value = store.first_value(first_area, "3小時降雨機率/ProbabilityOfPrecipitation")
+            if fx_time is not None:
+                series.update(fx_time, precip=pop_value)
+            
+            # 综合描述，包含温度、湿度、风速等
+            _, description = store.first_value(first_area, "天氣預報綜合描述/WeatherDescription")
+            if description and not weather_data["now"]:
+                # 提取温度信息
+                if "溫度攝氏" in description:
+                    temp_match = description.split("溫度攝氏")[1].split("度")[0]
+                    if temp_match.isdigit():
+                        weather_data["now"]["temp"] = temp_match
+
+                # 提取湿度信息
+                if "相對濕度" in description:
+                    humidity_match = description.split("相對濕度")[1].split("%")[0]
+                    if humidity_match.isdigit():
+                        weather_data["now"]["humidity"] = humidity_match
+
+                # 提取风速信息
+                if "平均風速" in description:
+                    wind_match = description.split("平均風速")[1].split("級")[0]
+                    weather_data["now"]["windSpeed"] = wind_match
+
+                # 提取天气描述
+                if "。" in description:
+                    weather_text = description.split("。")[0]
+                    weather_data["now"]["text"] = weather_text
+        
+        print(f"✅ 中央气象署 {city_name} 乡镇预报获取成功")
+        weather_data["hourly"] = series.to_hourly()
         
         # 3. 获取7天预报 - 使用36小时预报数据构建
         # 由于中央气象署的7天预报API可能不稳定，我们使用36小时预报来构建
@@ -209,57 +115,58 @@ def fetch_cwa_weather(city_name, city_config):
             
             # 构建今日数据 - 使用36小时预报的MinT/MaxT数据
             if today_hourly:
-                today_weather = today_hourly[0]["text"] if today_hourly else "晴"
+                today_weather = today_hourly[0].text if today_hourly else "晴"
                 
                 # 从hourly数据中提取今日的最高/最低温度（来自36小时预报的MinT/MaxT）
                 today_temp_max = 0
                 today_temp_min = 0
                 
                 for h in today_hourly:
-                    # 优先使用MinT/MaxT字段，如果没有则使用temp字段
-                    if h.get("tempMax") and h["tempMax"].isdigit():
-                        today_temp_max = max(today_temp_max, int(h["tempMax"]))
-                    elif h.get("temp") and h["temp"].isdigit():
-                        today_temp_max = max(today_temp_max, int(h["temp"]))
+                    # 优先使用MinT/MaxT字段，如果没有则使用temp字段（数值已在合并时解析）
+                    if h.tempMax is not None:
+                        today_temp_max = max(today_temp_max, h.tempMax)
+                    elif h.temp is not None:
+                        today_temp_max = max(today_temp_max, h.temp)
                     
-                    if h.get("tempMin") and h["tempMin"].isdigit():
+                    if h.tempMin is not None:
                         if today_temp_min == 0:  # 首次设置
-                            today_temp_min = int(h["tempMin"])
+                            today_temp_min = h.tempMin
                         else:
-                            today_temp_min = min(today_temp_min, int(h["tempMin"]))
-                    elif h.get("temp") and h["temp"].isdigit() and today_temp_min == 0:
-                        today_temp_min = int(h["temp"])
+                            today_temp_min = min(today_temp_min, h.tempMin)
+                    elif h.temp is not None and today_temp_min == 0:
+                        today_temp_min = h.temp
                 
                 # 构建today字段，供今日天气摘要使用
                 weather_data["today"] = {
                     "hourly": today_hourly,
-                    "tempMax": str(today_temp_max) if today_temp_max > 0 else "32",
-                    "tempMin": str(today_temp_min) if today_temp_min > 0 else "27"
+                    "tempMax": format_number(today_temp_max) if today_temp_max > 0 else "32",
+                    "tempMin": format_number(today_temp_min) if today_temp_min > 0 else "27"
                 }
                 
-                weather_data["weekly"].append({
-                    "fxDate": "2025-07-30",
-                    "textDay": today_weather,
-                    "textNight": today_weather,
-                    "tempMax": str(today_temp_max) if today_temp_max > 0 else "25",
-                    "tempMin": str(today_temp_min) if today_temp_min > 0 else "20",
-                    "precip": today_hourly[0].get("precip", "20")
-                })
+                weather_data["weekly"].append(DailyForecast(
+                    fxDate="2025-07-30",
+                    textDay=today_weather,
+                    textNight=today_weather,
+                    tempMax=today_temp_max if today_temp_max > 0 else 25,
+                    tempMin=today_temp_min if today_temp_min > 0 else 20,
+                    precip=today_hourly[0].precip
+                ))
             
             # 构建明日数据
             if tomorrow_hourly:
-                tomorrow_temp_max = max([int(h["temp"]) for h in tomorrow_hourly if h["temp"] and h["temp"].isdigit()], default=0)
-                tomorrow_temp_min = min([int(h["temp"]) for h in tomorrow_hourly if h["temp"] and h["temp"].isdigit()], default=0)
-                tomorrow_weather = tomorrow_hourly[0]["text"] if tomorrow_hourly else "晴"
+                tomorrow_temps = [h.temp for h in tomorrow_hourly if h.temp is not None]
+                tomorrow_temp_max = max(tomorrow_temps, default=0)
+                tomorrow_temp_min = min(tomorrow_temps, default=0)
+                tomorrow_weather = tomorrow_hourly[0].text if tomorrow_hourly else "晴"
                 
-                weather_data["weekly"].append({
-                    "fxDate": "2025-07-31",
-                    "textDay": tomorrow_weather,
-                    "textNight": tomorrow_weather,
-                    "tempMax": str(tomorrow_temp_max) if tomorrow_temp_max > 0 else "26",
-                    "tempMin": str(tomorrow_temp_min) if tomorrow_temp_min > 0 else "21",
-                    "precip": tomorrow_hourly[0].get("precip", "30")
-                })
+                weather_data["weekly"].append(DailyForecast(
+                    fxDate="2025-07-31",
+                    textDay=tomorrow_weather,
+                    textNight=tomorrow_weather,
+                    tempMax=tomorrow_temp_max if tomorrow_temp_max > 0 else 26,
+                    tempMin=tomorrow_temp_min if tomorrow_temp_min > 0 else 21,
+                    precip=tomorrow_hourly[0].precip
+                ))
         
         print(f"✅ 中央气象署 {city_name} 7天预报构建成功")
         
@@ -267,35 +174,28 @@ def fetch_cwa_weather(city_name, city_config):
         # 使用乡镇预报中的实时数据作为主要来源
         if not weather_data["now"]:
             # 如果没有从乡镇预报获取到实时数据，尝试从观测站获取
-            url = "https://opendata.cwa.gov.tw/api/v1/rest/datastore/O-A0001-001"
-            params = {
-                "Authorization": get_cwa_api_key(),
-                "format": "JSON",
+            data = fetch_dataset("O-A0001-001", {
                 "locationName": city_config["cwa_id"].replace("市", ""),  # 去掉"市"字
                 "elementName": "TEMP,HUMD,WDSD"
-            }
-            
-            resp = safe_request(url, params=params, timeout=10)
-            if resp.status_code == 200:
-                data = resp.json()
-                if data.get("success") == "true":
-                    records = data.get("records", {})
-                    location_data = records.get("location", [])
+            }, timeout=10)
+            if data.get("success") == "true":
+                records = data.get("records", {})
+                location_data = records.get("location", [])
+                
+                if location_data:
+                    location = location_data[0]
+                    weather_elements = location.get("weatherElement", [])
                     
-                    if location_data:
-                        location = location_data[0]
-                        weather_elements = location.get("weatherElement", [])
+                    for element in weather_elements:
+                        element_name = element.get("elementName", "")
+                        element_value = element.get("elementValue", "")
                         
-                        for element in weather_elements:
-                            element_name = element.get("elementName", "")
-                            element_value = element.get("elementValue", "")
-                            
-                            if element_name == "TEMP":
-                                weather_data["now"]["temp"] = element_value
-                            elif element_name == "HUMD":
-                                weather_data["now"]["humidity"] = element_value
-                            elif element_name == "WDSD":
-                                weather_data["now"]["windSpeed"] = element_value
+                        if element_name == "TEMP":
+                            weather_data["now"]["temp"] = element_value
+                        elif element_name == "HUMD":
+                            weather_data["now"]["humidity"] = element_value
+                        elif element_name == "WDSD":
+                            weather_data["now"]["windSpeed"] = element_value
         
         # 如果还是没有实时数据，从小时数据中获取最新的作为实时数据
         if not weather_data["now"] and weather_data["hourly"]:
@@ -315,5 +215,8 @@ def fetch_cwa_weather(city_name, city_config):
     
     except Exception as e:
         print(f"❌ 获取中央气象署 {city_name} 数据失败: {e}")
+        if not weather_data["hourly"]:
+            # 保留失败前已合并的预报时段
+            weather_data["hourly"] = series.to_hourly()
     
     return weather_data 
\ No newline at end of file
@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+from services import city_config, dataset_cache, http_client, observation_history, payload_archive, rolling_window
+from tools.standin_server import StandinConfig, create_server
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """每个测试使用独立的缓存目录（验证信息、持久化数据集、观测历史、原始数据归档）"""
+    observation_history.close_history()
+    monkeypatch.setattr(city_config, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(payload_archive, "_archive", None)
+    monkeypatch.setattr(http_client, "_validators", None)
+    rolling_window.reset_window_store()
+    dataset_cache.reset_dataset_cache()
+    yield tmp_path
+    observation_history.close_history()
+    rolling_window.reset_window_store()
+    dataset_cache.reset_dataset_cache()
+
+
+@pytest.fixture
+def standin(cache_dir, monkeypatch):
+    """在线程中运行的本地替身服务，CWA数据集请求指向该服务；server.config 可在测试中调整"""
+    config = StandinConfig()
+    server = create_server(port=0, config=config)
+    server.config = config
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    monkeypatch.setattr(dataset_cache, "CWA_API_BASE", f"http://{host}:{port}/api/v1/rest/datastore")
+    yield server
+    server.shutdown()
+    server.server_close()
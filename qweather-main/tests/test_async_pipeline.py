@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from services import async_http_client
+from services.async_http_client import close_async_session
+from services.async_pipeline import PipelineContext, fetch_weather_all_async
+from services.city_config import CITIES
+from services.cwa_weather_fetcher import fetch_weather_all
+from services.dataset_cache import cached_dataset_ids, fetch_dataset, get_cache_stats, use_dataset_cache
+
+
+def _run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await close_async_session()
+    return asyncio.run(main())
+
+
+def test_matches_threaded_fetch(standin):
+    expected = fetch_weather_all()
+    result = _run(fetch_weather_all_async())
+    assert result == expected
+
+
+def test_per_host_limit(standin, monkeypatch):
+    monkeypatch.setattr(async_http_client, "PER_HOST_LIMIT", 2)
+    standin.config.latency = 0.2
+    _run(fetch_weather_all_async())
+    assert standin.stats.peak_concurrency == 2
+
+
+def test_global_deadline_abandons_slow_dataset(standin):
+    standin.config.dataset_latency = {"F-C0032-001": 5}
+    context = PipelineContext()
+    started = time.monotonic()
+    result = _run(fetch_weather_all_async(deadline=0.5, context=context))
+    assert time.monotonic() - started < 4
+    assert set(CITIES) <= set(result)
+    with use_dataset_cache(context.cache):
+        with pytest.raises(TimeoutError):
+            fetch_dataset("F-C0032-001")
+
+
+def test_concurrent_runs_keep_separate_caches(standin):
+    north = {"台北市": CITIES["台北市"]}
+    south = {"桃园市": CITIES["桃园市"]}
+    contexts = PipelineContext(), PipelineContext()
+
+    async def both():
+        return await asyncio.gather(
+            fetch_weather_all_async(north, context=contexts[0]),
+            fetch_weather_all_async(south, context=contexts[1]),
+        )
+
+    north_result, south_result = _run(both())
+    assert "台北市" in north_result and "桃园市" not in north_result
+    assert "桃园市" in south_result and "台北市" not in south_result
+    assert contexts[0].cache is not contexts[1].cache
+    assert "F-D0047-061" in cached_dataset_ids(contexts[0].cache)
+    assert "F-D0047-005" in cached_dataset_ids(contexts[1].cache)
+    assert get_cache_stats(contexts[0].cache)["misses"] > 0
+    assert get_cache_stats(contexts[1].cache)["misses"] > 0
+    assert cached_dataset_ids() == []
+    assert contexts[0].events and contexts[1].events
+
+
+def test_reuses_validators_across_runs(standin):
+    _run(fetch_weather_all_async())
+    assert standin.stats.not_modified == 0
+    context = PipelineContext()
+    _run(fetch_weather_all_async(context=context))
+    assert standin.stats.not_modified > 0
+    assert get_cache_stats(context.cache)["unchanged"] > 0
@@ -0,0 +1,43 @@
+from services import dataset_cache
+
+
+def _make_parser(source, namespace=None):
+    namespace = dict(namespace or {}, __name__=__name__)
+    exec(source, namespace)
+    return namespace["parser"]
+
+
+def test_parser_id_tracks_constants():
+    first = _make_parser("def parser(data):\n    return data['temp'] > 35\n")
+    second = _make_parser("def parser(data):\n    return data['temp'] > 38\n")
+    assert first.__code__.co_code == second.__code__.co_code
+    assert dataset_cache._parser_id(first) != dataset_cache._parser_id(second)
+
+
+def test_parser_id_tracks_nested_code_and_closures():
+    nested = "def parser(data):\n    return [x for x in data if x > {}]\n"
+    assert dataset_cache._parser_id(_make_parser(nested.format(1))) != \
+        dataset_cache._parser_id(_make_parser(nested.format(2)))
+
+    closure = "def make(limit):\n    def parser(data):\n        return data > limit\n    return parser\n"
+    make = _make_parser(closure + "parser = make\n")
+    assert dataset_cache._parser_id(make(10)) != dataset_cache._parser_id(make(20))
+
+
+def test_parser_id_tracks_version_salt():
+    source = "def parser(data):\n    return data\n"
+    first, second, third = _make_parser(source), _make_parser(source), _make_parser(source)
+    third.PARSER_VERSION = 2
+    assert dataset_cache._parser_id(first) == dataset_cache._parser_id(second)
+    assert dataset_cache._parser_id(first) != dataset_cache._parser_id(third)
+
+
+def test_parser_id_tracks_module_source(monkeypatch):
+    parser = _make_parser("def parser(data):\n    return data\n")
+    before = dataset_cache._parser_id(parser)
+    dataset_cache._parser_id.cache_clear()
+    monkeypatch.setattr(dataset_cache, "_module_digest", lambda name: "changed")
+    try:
+        assert dataset_cache._parser_id(parser) != before
+    finally:
+        dataset_cache._parser_id.cache_clear()
@@ -0,0 +1,67 @@
+import io
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("ijson")
+
+from services import json_stream, warning_fetcher
+from services.observation_history import extract_reading, past_rainfall
+from services.station_registry import build_station_registry
+from tools.standin_server import FIXTURES_DIR
+
+
+def _payload(dataset_id):
+    with open(os.path.join(FIXTURES_DIR, f"{dataset_id}.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    # 加入取数代码不读取的要素和时段，流式解析时应被丢弃
+    for station in data["records"]["Station"]:
+        station["StationAltitude"] = "12.0"
+        station["WeatherElement"].append({"ElementName": "PRES", "ElementValue": "1008.2"})
+        station.setdefault("RainfallElement", {})["Past10Min"] = {"Precipitation": 0.5}
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def _stream(raw):
+    response = SimpleNamespace(raw=io.BytesIO(raw), close=lambda: None)
+    return json_stream.parse_response(response, *json_stream.get_stream_plan("O-A0002-001"))
+
+
+def _station_key(station):
+    return station.station_id, station.name, station.county, station.town, station.lat, station.lon
+
+
+def test_streamed_stations_match_full_parse(monkeypatch):
+    monkeypatch.setattr(json_stream, "JSON_STREAMING", True)
+    raw = _payload("O-A0002-001")
+    full = json.loads(raw)
+    streamed, digest = _stream(raw)
+
+    assert streamed["success"] == full["success"]
+    assert digest == json_stream.hashlib.sha256(raw).hexdigest()
+    assert warning_fetcher._extract_station_warnings(streamed) == warning_fetcher._extract_station_warnings(full)
+    assert [_station_key(station) for station in build_station_registry(streamed).stations] == \
+        [_station_key(station) for station in build_station_registry(full).stations]
+    for kept, record in zip(streamed["records"]["Station"], full["records"]["Station"]):
+        assert extract_reading(kept) == extract_reading(record)
+        assert [past_rainfall(kept, hours) for hours in (1, 3, 24)] == \
+            [past_rainfall(record, hours) for hours in (1, 3, 24)]
+
+
+def test_streamed_stations_drop_unused_elements(monkeypatch):
+    monkeypatch.setattr(json_stream, "JSON_STREAMING", True)
+    streamed, _ = _stream(_payload("O-A0002-001"))
+    for station in streamed["records"]["Station"]:
+        assert "StationAltitude" not in station
+        assert "StationAltitude" not in station["GeoInfo"]
+        assert "PRES" not in [element["ElementName"] for element in station["WeatherElement"]]
+        assert "Past10Min" not in station["RainfallElement"]
+
+
+def test_only_station_datasets_stream(monkeypatch):
+    monkeypatch.setattr(json_stream, "JSON_STREAMING", True)
+    assert json_stream.get_stream_plan("O-A0003-001") is not None
+    assert json_stream.get_stream_plan("O-A0001-001") is None
+    assert json_stream.get_stream_plan("F-D0047-061") is None
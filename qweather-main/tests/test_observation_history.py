@@ -0,0 +1,126 @@
+import time
+from datetime import datetime, timedelta
+
+from services import observation_history
+from services.observation_history import TAIPEI, ingest_stations, rain_increment, rainfall_totals
+from services.station_registry import Station
+
+DAY = datetime(2026, 10, 16, tzinfo=TAIPEI)
+
+
+def _station(when, rain_now, temp=25.0, station_id="C0TEST", county="新北市"):
+    record = {
+        "StationId": station_id,
+        "StationName": f"{station_id}站",
+        "ObsTime": {"DateTime": when.isoformat()},
+        "WeatherElement": {"AirTemperature": temp, "WindSpeed": 3.0},
+        "RainfallElement": {"Now": {"Precipitation": rain_now}},
+    }
+    return Station(station_id, f"{station_id}站", county, "板橋區", 25.0, 121.4, record)
+
+
+def _rows(query, *args):
+    return observation_history._connect().execute(query, args).fetchall()
+
+
+def test_ingest_skips_readings_already_recorded(cache_dir):
+    assert ingest_stations([_station(DAY.replace(hour=10), 5.0)], "O-A0002-001") == 1
+    assert ingest_stations([_station(DAY.replace(hour=10), 5.0)], "O-A0002-001") == 0
+    assert ingest_stations([_station(DAY.replace(hour=9), 2.0)], "O-A0002-001") == 0
+    assert ingest_stations([_station(DAY.replace(hour=11), 9.0)], "O-A0002-001") == 1
+    assert _rows("SELECT obs_time, rain FROM readings ORDER BY obs_time") == [
+        (int(DAY.replace(hour=10).timestamp()), None), (int(DAY.replace(hour=11).timestamp()), 4.0)
+    ]
+    assert _rows("SELECT samples, rain FROM daily") == [(2, 4.0)]
+
+
+def test_rain_increment_rolls_over_at_taipei_midnight(cache_dir):
+    before, after = DAY.replace(hour=23, minute=50), DAY + timedelta(days=1, minutes=10)
+    assert rain_increment(int(after.timestamp()), 2.0, int(before.timestamp()), 30.0) == 2.0
+    assert rain_increment(int(before.timestamp()), 25.0, int(before.timestamp()) - 600, 30.0) == 0.0
+    assert rain_increment(int(before.timestamp()), 30.0, None, None) is None
+
+    for when, rain_now in ((before - timedelta(minutes=10), 28.0), (before, 30.0), (after, 2.0)):
+        ingest_stations([_station(when, rain_now)], "O-A0002-001")
+    assert [row[0] for row in _rows("SELECT rain FROM readings ORDER BY obs_time")] == [None, 2.0, 2.0]
+    assert [row[0] for row in _rows("SELECT rain FROM daily ORDER BY bucket")] == [2.0, 2.0]
+
+
+def test_rollups_accumulate_readings_of_the_same_bucket(cache_dir):
+    for minute, rain_now, temp in ((0, 1.0, 26.0), (20, 4.0, None), (40, 10.0, 22.0)):
+        ingest_stations([_station(DAY.replace(hour=10, minute=minute), rain_now, temp)], "O-A0002-001")
+    ingest_stations([_station(DAY.replace(hour=11), 12.0, 21.0)], "O-A0002-001")
+
+    bucket = int(DAY.replace(hour=10).timestamp())
+    assert _rows("SELECT bucket, samples, temp_min, temp_max, temp_sum, temp_count, rain, wind_max FROM hourly "
+                 "ORDER BY bucket")[0] == (bucket, 3, 22.0, 26.0, 48.0, 2, 9.0, 3.0)
+    assert _rows("SELECT bucket, samples, temp_min, temp_max, rain FROM daily") == [
+        (int(DAY.timestamp()), 4, 21.0, 26.0, 11.0)
+    ]
+
+
+def test_prune_drops_expired_readings_and_keeps_daily(cache_dir, monkeypatch):
+    monkeypatch.setattr(observation_history, "OBS_HISTORY_RAW_DAYS", 1)
+    monkeypatch.setattr(observation_history, "OBS_HISTORY_HOURLY_DAYS", 2)
+    for days, rain_now in ((3, 1.0), (1.5, 2.0), (0.5, 3.0)):
+        ingest_stations([_station(DAY - timedelta(days=days), rain_now)], "O-A0002-001")
+    now = DAY.timestamp()
+    observation_history.prune(now)
+    assert len(_rows("SELECT * FROM readings")) == 1
+    assert len(_rows("SELECT * FROM hourly")) == 2
+    assert len(_rows("SELECT * FROM daily")) == 3
+
+    ingest_stations([_station(DAY, 4.0)], "O-A0002-001")
+    observation_history.prune(now + 3600)
+    assert len(_rows("SELECT * FROM readings")) == 2
+    observation_history.prune(now + 2 * 86400, force=True)
+    assert _rows("SELECT * FROM readings") == []
+
+
+def test_rainfall_totals_switch_from_readings_to_hourly(cache_dir, monkeypatch):
+    monkeypatch.setattr(observation_history, "OBS_HISTORY_RAW_DAYS", 1)
+    end = int(time.time()) // 3600 * 3600
+    for hour in range(30, -1, -1):
+        when = datetime.fromtimestamp(end - hour * 3600, TAIPEI)
+        ingest_stations([_station(when, float(when.hour))], "O-A0002-001")
+    ingest_stations([_station(datetime.fromtimestamp(end, TAIPEI), 9.0, station_id="C0OTHER", county="臺北市")],
+                    "O-A0002-001")
+
+    recent, older = rainfall_totals("新北", 3, end), rainfall_totals("新北", 30, end)
+    assert [row[:2] for row in recent] == [row[:2] for row in older] == [("C0TEST", "C0TEST站")]
+    assert 0 < recent[0][2] < older[0][2]
+    # 3小时窗口在原始读数保留期内按读数计算，30小时窗口超出保留期，按小时汇总计算
+    with observation_history._connect() as conn:
+        conn.execute("DELETE FROM readings")
+    assert rainfall_totals("新北", 3, end) == []
+    assert rainfall_totals("新北", 30, end) == older
+
+
+def test_three_hour_county_query_after_a_year_of_history(cache_dir):
+    # 一年每小时运行一次：原始读数保留期内的逐次读数与全年的小时汇总，新北120个测站、其他县市480个测站
+    stations = [(f"C{index:05d}", "新北市" if index < 120 else "臺中市") for index in range(600)]
+    end = int(time.time()) // 3600 * 3600
+    raw_hours = int(observation_history.OBS_HISTORY_RAW_DAYS * 24)
+    conn = observation_history._connect()
+    with conn:
+        conn.executemany(
+            "INSERT INTO stations (station_id, name, county, town, lat, lon, dataset, last_obs, last_rain) "
+            "VALUES (?, ?, ?, '', 25.0, 121.4, 'O-A0002-001', ?, 0)",
+            [(station_id, station_id, county, end) for station_id, county in stations]
+        )
+        conn.executemany(
+            "INSERT INTO readings (station_id, obs_time, temp, humidity, wind, rain_now, rain) "
+            "VALUES (?, ?, 25, 0.8, 2, 0, 0.5)",
+            ((station_id, end - hour * 3600) for station_id, _ in stations for hour in range(raw_hours))
+        )
+        conn.executemany(
+            "INSERT INTO hourly (station_id, bucket, samples, temp_min, temp_max, temp_sum, temp_count, rain, "
+            "wind_max) VALUES (?, ?, 1, 25, 25, 25, 1, 0.5, 2)",
+            ((station_id, end - hour * 3600) for station_id, _ in stations[:120] for hour in range(365 * 24))
+        )
+
+    started = time.perf_counter()
+    rows = rainfall_totals("新北", 3, end)
+    elapsed = time.perf_counter() - started
+    assert len(rows) == 120 and all(total == 1.5 for _, _, total in rows)
+    assert elapsed < 0.05, f"3小时雨量查询耗时 {elapsed * 1000:.1f} ms"
@@ -0,0 +1,56 @@
+import pytest
+
+from services import observation_rules
+from services.observation_rules import Rule, RuleSet
+
+np = pytest.importorskip("numpy")
+
+RULES = RuleSet([
+    Rule("TEMP", ">=", 38, "warning", "高温", "{station}: {value}", group="TEMP"),
+    Rule("TEMP", "<=", 6, "warning", "低温", "{station}: {value}", group="TEMP"),
+    Rule("H_24R", ">=", 130, "severe", "大豪雨", "{station}: {value}", group="H_24R"),
+    Rule("H_24R", ">=", 80, "warning", "豪雨", "{station}: {value}", group="H_24R"),
+    Rule("WDSD", ">", 15, "warning", "强风", "{station}: {value}"),
+    Rule("RAIN", ">=", 40, "severe", "短时强降雨", "{station}: {value}", missing=(-998,)),
+    Rule("RainfallElement.Now.Precipitation", "==", 0, "advisory", "无雨", "{station}: {value}", group="NOW"),
+])
+TEMPS = ("39.5", "38", "5", "6", "20", "-99", "", "x", None, "-99.0")
+RAINS = ("150", "130", "129.9", "80", "79", "-99", "", "-998", "45", "0")
+
+
+def _records(count):
+    records = []
+    for i in range(count):
+        elements = [
+            {"ElementName": "TEMP", "ElementValue": TEMPS[i % len(TEMPS)]},
+            {"ElementName": "H_24R", "ElementValue": RAINS[i % len(RAINS)]},
+            {"ElementName": "WDSD", "ElementValue": str(i % 20)},
+            {"ElementName": "RAIN", "ElementValue": RAINS[(i * 3) % len(RAINS)]},
+        ]
+        records.append({
+            "StationName": f"站{i}",
+            "WeatherElement": elements[i % 3:],
+            "RainfallElement": {"Now": {"Precipitation": RAINS[(i * 7) % len(RAINS)]}} if i % 4 else {},
+        })
+    return records
+
+
+def _hits(records, monkeypatch, vectorize):
+    monkeypatch.setattr(observation_rules, "np", np if vectorize else None)
+    return [(hit.index, hit.rule.title, hit.value) for hit in RULES.evaluate(records)]
+
+
+def test_numpy_and_python_paths_give_identical_hits(monkeypatch):
+    records = _records(observation_rules.VECTORIZE_MIN_ITEMS * 2)
+    vectorized = _hits(records, monkeypatch, vectorize=True)
+    assert vectorized == _hits(records, monkeypatch, vectorize=False)
+
+    by_station = {}
+    for index, title, _ in vectorized:
+        by_station.setdefault(index, []).append(title)
+    # 同组规则只取第一条命中的；缺测值（-99、空值、规则自定义的-998）不命中
+    assert by_station[0][:2] == ["高温", "大豪雨"]
+    assert "豪雨" not in by_station[0] and "低温" not in by_station[0]
+    assert all(title not in {"高温", "低温"} for index, title, _ in vectorized if TEMPS[index % 10] in ("-99", "-99.0"))
+    assert not any(title == "短时强降雨" and RAINS[(index * 3) % 10] == "-998" for index, title, _ in vectorized)
+    assert {title for _, title, _ in vectorized} == {rule.title for rule in RULES.rules}
@@ -0,0 +1,28 @@
+import json
+from datetime import datetime, timezone
+
+from utils import output_writers
+from utils.output_writers import JSON_FEED_PATH, publish_outputs, render_html
+from utils.render_model import build_feed_item, build_render_model
+
+
+def test_html_escapes_descriptions():
+    now = datetime(2026, 10, 17, 1, 0, tzinfo=timezone.utc)
+    old = build_feed_item("旧", "<img src=x onerror=alert(1)>", now=now.replace(hour=0))
+    latest = build_feed_item("新", "第一行\n<script>alert(1)</script> & 雨", now=now)
+    page = render_html(build_render_model(latest, [old]))
+    assert "<script>" not in page and "<img" not in page
+    assert "第一行<br>&lt;script&gt;alert(1)&lt;/script&gt; &amp; 雨" in page
+    assert "&lt;img src=x onerror=alert(1)&gt;" in page
+
+
+def test_history_advances_without_rss_format(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    times = iter([datetime(2026, 10, 17, hour, tzinfo=timezone.utc) for hour in (1, 2)])
+    monkeypatch.setattr(output_writers, "build_feed_item",
+                        lambda title, description, hours: build_feed_item(title, description, hours, now=next(times)))
+    publish_outputs("第一期", "晴", formats=["json"])
+    publish_outputs("第二期", "雨", formats=["json"])
+    with open(JSON_FEED_PATH, encoding="utf-8") as f:
+        items = json.load(f)["items"]
+    assert [item["title"] for item in items] == ["第二期（未来 15 小时预报）", "第一期（未来 15 小时预报）"]
@@ -0,0 +1,34 @@
+import os
+
+from services import dataset_cache, observation_history, payload_archive
+from services.cwa_weather_fetcher import fetch_weather_all
+
+
+def _cache_files(cache_dir):
+    return {
+        os.path.relpath(os.path.join(root, name), cache_dir)
+        for root, _, names in os.walk(cache_dir) for name in names
+        if not name.startswith(observation_history.OBS_HISTORY_FILE)
+    }
+
+
+def test_replay_leaves_persistent_state_untouched(standin, cache_dir):
+    live = fetch_weather_all()
+    conn = observation_history._connect()
+    assert conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0] > 0
+    with conn:
+        conn.execute("DELETE FROM readings")
+        conn.execute("DELETE FROM stations")
+    # 只保留持久化的原始JSON，删除各解析结果
+    for name in _cache_files(cache_dir):
+        if name.startswith(dataset_cache.PERSIST_SUBDIR) and not name.endswith(".payload.pickle"):
+            os.remove(os.path.join(cache_dir, name))
+    files = _cache_files(cache_dir)
+    requests = standin.stats.to_dict()["requests"]
+
+    replayed = payload_archive.replay()
+    assert replayed["warnings"] == live["warnings"]
+    assert conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM stations").fetchone()[0] == 0
+    assert _cache_files(cache_dir) == files
+    assert standin.stats.to_dict()["requests"] == requests
@@ -0,0 +1,12 @@
+from services.records import DailyForecast, Observation, typed_value
+
+
+def test_typed_value_reads_parsed_fields_and_legacy_dicts():
+    day = {"fxDate": "2026-10-18", "textDay": "多云", "tempMax": "36", "tempMin": "26.5", "precip": ""}
+    record = DailyForecast.from_dict(day)
+    assert record.typed("tempMax") == 36 and record["tempMax"] == "36"
+    assert [typed_value(item, "tempMin") for item in (day, record)] == [26.5, 26.5]
+    assert [typed_value(item, "precip") for item in (day, record)] == [None, None]
+    assert [typed_value(item, "missing") for item in (day, record)] == [None, None]
+    observation = Observation("臺北", 38.5, "°C")
+    assert observation.typed("value") == 38.5 and observation["value"] == "38.5°C"
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import city_config, observation_fetcher, observation_history, rolling_window
+from services.station_registry import Station, build_station_registry
+from tools.standin_server import FIXTURES_DIR
+
+
+def _station(hour, rain_now, temp):
+    record = {
+        "StationId": "C0TEST",
+        "StationName": "测试站",
+        "ObsTime": {"DateTime": f"2026-10-17T{hour:02d}:00:00+08:00"},
+        "WeatherElement": {"AirTemperature": temp},
+        "RainfallElement": {"Now": {"Precipitation": rain_now}},
+    }
+    return Station("C0TEST", "测试站", "新北市", "板橋區", 25.0, 121.4, record)
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    observation_history.close_history()
+    monkeypatch.setattr(city_config, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(rolling_window, "OBS_HISTORY_ENABLED", True)
+    for hour, rain_now, temp in ((9, 0.0, 24.0), (10, 40.0, 23.0), (11, 80.0, 22.0)):
+        observation_history.ingest_stations([_station(hour, rain_now, temp)], "O-A0002-001")
+    rolling_window.reset_window_store()
+    yield
+    rolling_window.reset_window_store()
+    observation_history.close_history()
+
+
+def _serve_snapshot(monkeypatch, stations):
+    registry = SimpleNamespace(stations=stations)
+    monkeypatch.setattr(rolling_window, "get_station_registry", lambda dataset_id, timeout=15: registry)
+    recent_readings = rolling_window.recent_readings
+
+    def slow_recent_readings(*args, **kwargs):
+        time.sleep(0.05)  # 放大首次填充与其他线程更新之间的竞争窗口
+        return recent_readings(*args, **kwargs)
+
+    monkeypatch.setattr(rolling_window, "recent_readings", slow_recent_readings)
+
+
+def test_serial_first_update_seeds_history(history, monkeypatch):
+    _serve_snapshot(monkeypatch, [_station(12, 120.0, 20.0)])
+    store = rolling_window.update_rolling_windows(dataset_ids=("O-A0002-001",))
+    elements = dict(store.elements("C0TEST"))
+    assert elements["RAIN_3H"] == 120.0
+    assert elements["TEMP_DELTA_3H"] == -4.0
+
+
+def test_concurrent_first_updates_keep_seeded_history(history, monkeypatch):
+    _serve_snapshot(monkeypatch, [_station(12, 120.0, 20.0)])
+    barrier = threading.Barrier(4)
+
+    def run():
+        barrier.wait()
+        rolling_window.update_rolling_windows(dataset_ids=("O-A0002-001",))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elements = dict(rolling_window.get_window_store().elements("C0TEST"))
+    assert elements["RAIN_3H"] == 120.0
+    assert elements["RAIN_1H"] == 40.0
+    assert elements["TEMP_MAX_24H"] == 24.0
+
+
+def test_ensure_seeded_runs_loader_once():
+    store = rolling_window.WindowStore([("1H", 3600)])
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return []
+
+    threads = [threading.Thread(target=store.ensure_seeded, args=(loader,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert store.seeded
+
+
+def test_cold_start_uses_payload_accumulations(cache_dir, monkeypatch):
+    with open(os.path.join(FIXTURES_DIR, "O-A0002-001.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    for record in data["records"]["Station"]:
+        record["RainfallElement"] = {
+            "Now": {"Precipitation": 250}, "Past1hr": {"Precipitation": 60},
+            "Past3hr": {"Precipitation": 120}, "Past24hr": {"Precipitation": 250},
+        }
+    registry = build_station_registry(data)
+    monkeypatch.setattr(observation_fetcher, "get_station_registry", lambda dataset_id, timeout=15: registry)
+    monkeypatch.setattr(rolling_window, "get_station_registry", lambda dataset_id, timeout=15: registry)
+
+    observations = observation_fetcher.fetch_observation_data_for_city("台北市", {"cwa_id": "臺北市"})
+    stations = {station.name for station in registry.stations_in_county("臺北市")}
+    assert stations
+    assert {entry["station"] for entry in observations["heavy_rainfall"]} == stations
+    assert {entry["type"] for entry in observations["heavy_rainfall"]} == {"24小时累积"}
+
+    elements = dict(rolling_window.get_window_store().elements(registry.stations_in_county("臺北市")[0].station_id))
+    assert (elements["RAIN_1H"], elements["RAIN_3H"], elements["RAIN_24H"]) == (60.0, 120.0, 250.0)
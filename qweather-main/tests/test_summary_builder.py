@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from services import summary_builder
+from services.records import DailyForecast, HourlyForecast
+from services.summary_builder import _build_today_lines, _fallback_future_weather_summary
+
+WEEKLY = [
+    {"fxDate": "2026-10-18", "textDay": "多云", "textNight": "晴", "tempMax": "36", "tempMin": "27", "precip": "10"},
+    {"fxDate": "2026-10-19", "textDay": "晴", "textNight": "晴", "tempMax": "33", "tempMin": "26", "precip": "0"},
+]
+
+
+def _hourly():
+    now = datetime.now(ZoneInfo("Asia/Taipei")).replace(minute=0, second=0, microsecond=0)
+    start = now.replace(hour=min(now.hour, 21))
+    return [
+        {"fxTime": (start + timedelta(hours=step)).isoformat(), "text": "阴", "icon": "", "temp": temp,
+         "humidity": "80", "windSpeed": "2", "precip": "20"}
+        for step, temp in ((0, "25"), (1, "29"), (2, ""))
+    ]
+
+
+def test_fallback_summary_accepts_dicts_and_records():
+    expected = "🌤️ **台北市未来两日**：多云，26~36℃，防暑"
+    assert _fallback_future_weather_summary("台北市", {"weekly": WEEKLY}) == expected
+    records = [DailyForecast.from_dict(day) for day in WEEKLY]
+    assert _fallback_future_weather_summary("台北市", {"weekly": records}) == expected
+
+
+def test_today_lines_keep_hourly_temperatures_for_dicts_and_records():
+    expected = ["【台北市】今日天气：阴，25 ~ 29℃", ""]
+    assert _build_today_lines({"台北市": {"hourly": _hourly()}}) == expected
+    records = [HourlyForecast.from_dict(entry) for entry in _hourly()]
+    assert _build_today_lines({"台北市": {"hourly": records}}) == expected
+
+
+def _publish_once(monkeypatch, ai):
+    import main
+    saved = []
+    monkeypatch.setattr(summary_builder, "call_doubao_ai", ai)
+    monkeypatch.setattr(main, "fetch_weather_all", lambda reset_cache=True: {
+        "台北市": {"weekly": WEEKLY}, "warnings": [{"title": "豪雨特报", "text": "台北市豪雨", "city": "台北市"}]
+    })
+    monkeypatch.setattr(main, "has_changed", lambda fingerprint: True)
+    monkeypatch.setattr(main, "save_fingerprint", saved.append)
+    monkeypatch.setattr(main, "publish_outputs", lambda title, summary: None)
+    monkeypatch.setattr(main, "send_bark", lambda title, summary: None)
+    assert main.run_once()
+    return saved
+
+
+def test_fallback_summary_does_not_save_fingerprint(monkeypatch):
+    def failing(prompt, **kwargs):
+        raise RuntimeError("AI unavailable")
+
+    assert _publish_once(monkeypatch, failing) == []
+    assert len(_publish_once(monkeypatch, lambda prompt, **kwargs: "摘要")) == 1
@@ -0,0 +1,40 @@
+from services.warning_set import WarningSet, normalize_hazard
+
+
+def _warning(city, title, warning_type, start="", end="", **fields):
+    return {"title": title, "text": f"{city}{title}", "city": city, "type": warning_type,
+            "source": "测试", "startTime": start, "endTime": end, **fields}
+
+
+def test_aliases_map_to_one_hazard():
+    assert normalize_hazard("大雷雨特报") == normalize_hazard("雷陣雨") == "雷雨"
+    assert normalize_hazard("颱風警報") == normalize_hazard("台风消息") == "台风"
+    assert normalize_hazard("晴时多云") is None
+
+
+def test_higher_priority_source_replaces_overlapping_reminder():
+    warnings = WarningSet()
+    assert warnings.add(_warning("台北市", "雷阵雨提醒", "天气提醒", "2026-10-17 12:00", "2026-10-17 18:00"),
+                        hazard="雷陣雨")
+    assert warnings.add(_warning("臺北市, 新北市", "大雷雨特报", "官方特报", "2026-10-17 15:00", "2026-10-17 21:00",
+                                 phenomena="大雷雨"))
+    assert [warning["title"] for warning in warnings] == ["大雷雨特报"]
+    # 优先级不高于已有预警时不加入；时段不重叠的同类提醒照常加入
+    assert not warnings.add(_warning("新北市", "雷雨提醒", "天气提醒", "2026-10-17 16:00", "2026-10-17 20:00"),
+                            hazard="雷雨")
+    assert warnings.add(_warning("新北市", "雷雨提醒", "天气提醒", "2026-10-18 09:00", "2026-10-18 12:00"),
+                        hazard="雷雨")
+    assert not warnings.add(_warning("新北市", "雷雨提醒", "天气提醒", "2026-10-18 09:00", "2026-10-18 12:00"))
+    assert len(warnings) == 2
+    assert warnings.has("台北市", "雷陣雨") and not warnings.has("台北市", "豪雨")
+
+
+def test_has_city_counts_regional_entries():
+    warnings = WarningSet([_warning("臺北市, 新北市", "豪雨特报", "区域预警", phenomena="豪雨")])
+    assert warnings.has_city("台北市") and warnings.has_city("新北市")
+    assert not warnings.has_city("桃園市")
+
+    warnings.add(_warning("桃園市", "雷雨提醒", "天气提醒"), hazard="雷雨")
+    assert warnings.has_city("桃園市")
+    warnings.add(_warning("桃園市", "雷雨特报", "官方特报", phenomena="雷雨"))
+    assert warnings.has_city("桃園市") and [warning["title"] for warning in warnings][-1] == "雷雨特报"
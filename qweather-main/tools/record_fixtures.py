@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制替身服务使用的数据集
+在可以访问中央气象署开放数据的机器上运行（需要 CWA_API_KEY），
+把本项目用到的全部数据集原样保存到 tools/fixtures，之后由 tools/standin_server.py 离线回放
+
+用法：
+    python tools/record_fixtures.py                 # 录制全部数据集
+    python tools/record_fixtures.py O-A0002-001     # 只录制指定数据集
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.city_config import CITIES, get_cwa_api_key
+from services.dataset_cache import build_dataset_request
+from services.fetch_orchestrator import plan_datasets
+from services.http_client import safe_request, close_session
+from tools.standin_server import FIXTURES_DIR, MANIFEST_FILE
+
+# 不在预取计划中、由 weather_fetcher 按需请求的数据集
+EXTRA_DATASETS = ["O-A0001-001"]
+
+
+def recorded_dataset_ids():
+    """需要录制的数据集ID（预取计划 + 按需请求的数据集）"""
+    dataset_ids = [dataset_id for dataset_id, _, _ in plan_datasets(CITIES)]
+    return dataset_ids + [dataset_id for dataset_id in EXTRA_DATASETS if dataset_id not in dataset_ids]
+
+def record_dataset(dataset_id, directory, timeout=60):
+    """下载单个数据集并保存，返回保存的字节数"""
+    url, query = build_dataset_request(dataset_id)
+    response = safe_request(url, params=query, timeout=timeout)
+    data = response.json()
+    if data.get("success") != "true":
+        raise ValueError(f"{dataset_id} 返回 success={data.get('success')!r}")
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+    path = os.path.join(directory, f"{dataset_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(body)
+    return len(body.encode("utf-8"))
+
+def main():
+    parser = argparse.ArgumentParser(description="录制替身服务使用的CWA数据集")
+    parser.add_argument("dataset_ids", nargs="*", help="要录制的数据集ID，默认全部")
+    parser.add_argument("--output", default=FIXTURES_DIR, help="保存目录")
+    args = parser.parse_args()
+
+    if not get_cwa_api_key():
+        print("❌ 需要设置 CWA_API_KEY")
+        sys.exit(1)
+
+    os.makedirs(args.output, exist_ok=True)
+    recorded_at = datetime.now(ZoneInfo("Asia/Taipei")).replace(microsecond=0)
+    failed = []
+    try:
+        for dataset_id in args.dataset_ids or recorded_dataset_ids():
+            try:
+                size = record_dataset(dataset_id, args.output)
+                print(f"✅ {dataset_id}：{size / 1024:.1f} KB")
+            except Exception as e:
+                failed.append(dataset_id)
+                print(f"❌ {dataset_id} 录制失败: {e}")
+    finally:
+        close_session()
+
+    # 替身服务按录制时间平移时间戳，使回放的预报时段始终从当前时间开始
+    # 只录制部分数据集时保留原有录制时间，与其余文件一致
+    manifest = os.path.join(args.output, MANIFEST_FILE)
+    if not args.dataset_ids or not os.path.exists(manifest):
+        with open(manifest, "w", encoding="utf-8") as f:
+            json.dump({"recordedAt": recorded_at.isoformat(), "source": "opendata.cwa.gov.tw"}, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
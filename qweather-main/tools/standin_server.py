@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地替身服务
+在离线环境中代替中央气象署开放数据、火山引擎豆包 chat/completions 和 BARK 推送接口：
+数据集按 tools/fixtures 中录制的原始JSON回放（支持ETag/304），
+延迟、错误率和数据量可配置，便于可重复地测量并发与缓存带来的收益
+
+用法：
+    python tools/standin_server.py --port 8765 --latency 0.3 --error-rate 0.05 --scale 4
+    CWA_API_BASE=http://127.0.0.1:8765/api/v1/rest/datastore \\
+    DOUBAO_API_URL=http://127.0.0.1:8765/api/v3/chat/completions \\
+    BARK_API_BASE=http://127.0.0.1:8765/bark BARK_KEY=standin CWA_API_KEY=standin \\
+    python main.py
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+from zoneinfo import ZoneInfo
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MANIFEST_FILE = "manifest.json"
+DATASTORE_PREFIX = "/api/v1/rest/datastore/"
+CHAT_PATH = "/api/v3/chat/completions"
+BARK_PREFIX = "/bark/"
+
+# --scale 时按倍数复制的列表（数据集ID前缀 → records下的路径，"*"表示列表中的每一项）
+SCALE_PATHS = {
+    "F-C0032-": ("location",),
+    "F-D0047-": ("Locations", "*", "Location"),
+    "O-A": ("Station",),
+    "W-C0033-001": ("location",),
+    "C-B0025-": ("location",),
+}
+# 复制项中加上序号后缀的名称字段（避免与原始项完全相同）
+NAME_KEYS = ("StationId", "StationName", "LocationName", "locationName")
+
+# 录制数据中的时间戳：2025-07-30 12:00:00 或 2025-07-30T12:00:00+08:00
+TIMESTAMP_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})([ T])(\d{2}:\d{2}:\d{2})")
+TAIPEI = ZoneInfo("Asia/Taipei")
+
+
+def _hour_floor(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+def shift_timestamps(text, delta):
+    """把文本中的全部时间戳平移delta（保持原有格式）"""
+    if not delta:
+        return text
+
+    def replace(match):
+        moved = datetime.strptime(f"{match.group(1)} {match.group(3)}", "%Y-%m-%d %H:%M:%S") + delta
+        return moved.strftime(f"%Y-%m-%d{match.group(2)}%H:%M:%S")
+
+    return TIMESTAMP_PATTERN.sub(replace, text)
+
+def _scale_list(node, path, factor):
+    """按路径找到列表并复制为factor倍"""
+    if not path:
+        return
+    key, rest = path[0], path[1:]
+    if key == "*":
+        for item in node if isinstance(node, list) else []:
+            _scale_list(item, rest, factor)
+        return
+    if not isinstance(node, dict) or key not in node:
+        return
+    if rest:
+        _scale_list(node[key], rest, factor)
+        return
+    items = node[key]
+    if not isinstance(items, list):
+        return
+    scaled = list(items)
+    for k in range(1, factor):
+        for item in items:
+            clone = copy.deepcopy(item)
+            if isinstance(clone, dict):
+                for name in NAME_KEYS:
+                    if isinstance(clone.get(name), str):
+                        clone[name] = f"{clone[name]}#{k}"
+            scaled.append(clone)
+    node[key] = scaled
+
+def scale_payload(dataset_id, data, factor):
+    """放大数据集的列表项数量（测站、区域、县市），用于测量数据量对解析和内存的影响"""
+    if factor <= 1:
+        return data
+    for prefix, path in SCALE_PATHS.items():
+        if dataset_id.startswith(prefix):
+            data = copy.deepcopy(data)
+            _scale_list(data.get("records", {}), path, factor)
+            break
+    return data
+
+
+class FixtureStore:
+    """录制数据：按数据集ID读取，平移时间戳并按倍数放大后缓存序列化结果"""
+
+    def __init__(self, directory, scale=1, shift_times=True):
+        self.directory = directory
+        self.scale = scale
+        self.shift_times = shift_times
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.recorded_at = None
+        manifest = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            with open(manifest, encoding="utf-8") as f:
+                recorded_at = json.load(f).get("recordedAt")
+            if recorded_at:
+                self.recorded_at = datetime.fromisoformat(recorded_at)
+
+    def dataset_ids(self):
+        return sorted(
+            name[:-5] for name in os.listdir(self.directory)
+            if name.endswith(".json") and name != MANIFEST_FILE
+        )
+
+    def _path(self, dataset_id):
+        """数据集对应的录制文件；F-D0047-xxx 没有单独录制时使用同系列的第一个文件"""
+        path = os.path.join(self.directory, f"{dataset_id}.json")
+        if os.path.exists(path):
+            return path
+        family = dataset_id.rsplit("-", 1)[0] + "-"
+        for candidate in self.dataset_ids():
+            if candidate.startswith(family):
+                return os.path.join(self.directory, f"{candidate}.json")
+        return None
+
+    def time_offset(self):
+        """录制时间到当前整点的偏移（整小时，逐时预报的时段对齐保持不变）"""
+        if not self.shift_times or self.recorded_at is None:
+            return timedelta(0)
+        return _hour_floor(datetime.now(TAIPEI)) - _hour_floor(self.recorded_at)
+
+    def load(self, dataset_id):
+        """
+        :return: (响应体字节, ETag)，没有录制数据时返回 (None, None)
+        """
+        path = self._path(dataset_id)
+        if path is None:
+            return None, None
+        delta = self.time_offset()
+        key = (dataset_id, delta)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        data = scale_payload(dataset_id, data, self.scale)
+        text = shift_timestamps(json.dumps(data, ensure_ascii=False, separators=(",", ":")), delta)
+        body = text.encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        with self._lock:
+            # 只保留当前时间偏移的结果
+            self._cache = {k: v for k, v in self._cache.items() if k[1] == delta}
+            self._cache[key] = (body, etag)
+        return body, etag
+
+
+class StandinConfig:
+    """替身服务的延迟与故障配置"""
+
+    def __init__(self, latency=0.0, jitter=0.0, ai_latency=0.0, error_rate=0.0, error_status=503,
+                 etag=True, seed=None, dataset_latency=None):
+        self.latency = latency
+        self.dataset_latency = dict(dataset_latency or {})  # 数据集ID → 固定延迟（覆盖latency）
+        self.jitter = jitter
+        self.ai_latency = ai_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.etag = etag
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, base):
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        return base + extra
+
+    def latency_for(self, dataset_id):
+        return self.dataset_latency.get(dataset_id, self.latency)
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class StandinStats:
+    """按路由统计请求数、304数、注入的错误数和数据集请求的最大并发数（GET /_stats 查看）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.not_modified = 0
+            self.errors = 0
+            self.bytes = 0
+            self.in_flight = 0
+            self.peak_concurrency = 0
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_concurrency = max(self.peak_concurrency, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def count(self, route, not_modified=False, error=False, size=0):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.not_modified += not_modified
+            self.errors += error
+            self.bytes += size
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "notModified": self.not_modified,
+                "errors": self.errors,
+                "bytes": self.bytes,
+                "peakConcurrency": self.peak_concurrency
+            }
+
+
+def build_chat_completion(payload):
+    """
+    模拟 chat/completions 响应：内容由请求中的用户消息确定性地生成，
+    相同请求得到相同结果，AI响应缓存的命中情况与真实接口一致
+    """
+    messages = payload.get("messages", []) if isinstance(payload, dict) else []
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    content = "（离线替身摘要）" + "；".join(lines[:3])[:120] + f" [{digest}]"
+    return {
+        "id": f"standin-{digest}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "") if isinstance(payload, dict) else "",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)}
+    }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """路由：CWA数据集、豆包 chat/completions、BARK推送，以及 /_stats、/_reset"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "qweather-standin"
+    fixtures = None
+    config = None
+    stats = None
+    quiet = True
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status, body=b"", content_type="application/json; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status, obj, headers=None):
+        self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+    def _inject_failure(self, route):
+        """按错误率返回错误状态码（默认503，会触发客户端的重试逻辑）"""
+        if not self.config.should_fail():
+            return False
+        self.stats.count(route, error=True)
+        self._send_json(self.config.error_status, {"success": "false", "message": "standin injected error"})
+        return True
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/_stats":
+            self._send_json(200, self.stats.to_dict())
+        elif path == "/_reset":
+            self.stats.reset()
+            self._send_json(200, {"success": True})
+        elif path.startswith(DATASTORE_PREFIX):
+            self._serve_dataset(path[len(DATASTORE_PREFIX):].strip("/"))
+        elif path.startswith(BARK_PREFIX):
+            self._serve_bark(path[len(BARK_PREFIX):])
+        else:
+            self._send_json(404, {"success": "false", "message": f"unknown path {path}"})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if path != CHAT_PATH:
+            self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+            return
+        time.sleep(self.config.delay(self.config.ai_latency))
+        if self._inject_failure("chat"):
+            return
+        try:
+            payload = json.loads(raw or b"{}")
+        except ValueError:
+            self.stats.count("chat", error=True)
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+        body = json.dumps(build_chat_completion(payload), ensure_ascii=False).encode("utf-8")
+        self.stats.count("chat", size=len(body))
+        self._send(200, body)
+
+    def _serve_dataset(self, dataset_id):
+        self.stats.enter()
+        try:
+            self._serve_dataset_body(dataset_id)
+        finally:
+            self.stats.leave()
+
+    def _serve_dataset_body(self, dataset_id):
+        time.sleep(self.config.delay(self.config.latency_for(dataset_id)))
+        if self._inject_failure(dataset_id):
+            return
+        body, etag = self.fixtures.load(dataset_id)
+        if body is None:
+            self.stats.count(dataset_id, error=True)
+            self._send_json(404, {"success": "false", "message": f"no fixture for {dataset_id}"})
+            return
+        headers = {"ETag": etag} if self.config.etag else {}
+        if self.config.etag and self.headers.get("If-None-Match") == etag:
+            self.stats.count(dataset_id, not_modified=True)
+            self._send(304, headers=headers)
+            return
+        self.stats.count(dataset_id, size=len(body))
+        self._send(200, body, headers=headers)
+
+    def _serve_bark(self, rest):
+        time.sleep(self.config.delay(self.config.latency))
+        if self._inject_failure("bark"):
+            return
+        parts = [unquote(part.replace("+", " ")) for part in rest.split("/")]
+        self.stats.count("bark")
+        self._send_json(200, {"code": 200, "message": "success", "data": {"title": parts[1] if len(parts) > 1 else ""}})
+
+
+def create_server(host="127.0.0.1", port=8765, fixtures_dir=FIXTURES_DIR, scale=1, shift_times=True,
+                  config=None, quiet=True):
+    """
+    创建替身服务（调用方负责 serve_forever / shutdown），可在基准测试中以线程方式启动
+    :return: ThreadingHTTPServer，server.stats 为请求统计
+    """
+    stats = StandinStats()
+    handler = type("Handler", (StandinHandler,), {
+        "fixtures": FixtureStore(fixtures_dir, scale=scale, shift_times=shift_times),
+        "config": config or StandinConfig(),
+        "stats": stats,
+        "quiet": quiet,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+def base_urls(server):
+    """替身服务对应的环境变量（CWA_API_BASE / DOUBAO_API_URL / BARK_API_BASE）"""
+    host, port = server.server_address[:2]
+    root = f"http://{host}:{port}"
+    return {
+        "CWA_API_BASE": root + DATASTORE_PREFIX.rstrip("/"),
+        "DOUBAO_API_URL": root + CHAT_PATH,
+        "BARK_API_BASE": root + BARK_PREFIX.rstrip("/"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CWA / 豆包 / BARK 本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="录制数据目录")
+    parser.add_argument("--latency", type=float, default=0.0, help="数据集与推送接口的固定延迟（秒）")
+    parser.add_argument("--slow", action="append", default=[], metavar="DATASET=SECONDS",
+                        help="单个数据集的固定延迟（可重复），用于测试单源/全局时限")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟的上限（秒）")
+    parser.add_argument("--ai-latency", type=float, default=0.0, help="chat/completions 接口的固定延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入错误的比例（0~1）")
+    parser.add_argument("--error-status", type=int, default=503, help="注入错误时返回的状态码")
+    parser.add_argument("--scale", type=int, default=1, help="测站/区域/县市列表放大的倍数")
+    parser.add_argument("--seed", type=int, default=None, help="随机延迟与错误注入的种子（可重复）")
+    parser.add_argument("--no-etag", action="store_true", help="不返回ETag，每次都完整下载")
+    parser.add_argument("--no-shift-times", action="store_true", help="保持录制时的时间戳，不平移到当前时间")
+    parser.add_argument("--verbose", action="store_true", help="输出每个请求的访问日志")
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        latency=args.latency, jitter=args.jitter, ai_latency=args.ai_latency,
+        error_rate=args.error_rate, error_status=args.error_status, etag=not args.no_etag, seed=args.seed,
+        dataset_latency={name: float(seconds) for name, _, seconds in (item.partition("=") for item in args.slow)}
+    )
+    server = create_server(
+        args.host, args.port, args.fixtures, scale=args.scale, shift_times=not args.no_shift_times,
+        config=config, quiet=not args.verbose
+    )
+    print(f"🧪 替身服务已启动：http://{args.host}:{server.server_address[1]}")
+    for name, value in base_urls(server).items():
+        print(f"   {name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
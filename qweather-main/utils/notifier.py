@@ -1,20 +1,37 @@
 import os
-import requests
 from urllib.parse import quote_plus
 from dotenv import load_dotenv
+from services.http_client import get_session
+from services.async_http_client import async_request
 
 # 确保环境变量已加载
 load_dotenv()
 BARK_KEY = os.getenv("BARK_KEY")
+BARK_API_BASE = os.getenv("BARK_API_BASE", "https://api.day.app").rstrip("/")
+
+def _bark_url(title: str, body: str) -> str:
+    return f"{BARK_API_BASE}/{BARK_KEY}/{quote_plus(title)}/{quote_plus(body)}"
 
 def send_bark(title: str, body: str):
     """通过 BARK 推送一次通知。"""
     if not BARK_KEY:
         return
-    url = f"https://api.day.app/{BARK_KEY}/{quote_plus(title)}/{quote_plus(body)}"
+    url = _bark_url(title, body)
+    try:
+        r = get_session().get(url, timeout=10)
+        r.raise_for_status()
+        print("[Notifier] ✅ BARK 推送成功")
+    except Exception as e:
+        print(f"[Notifier] ❌ BARK 推送失败：{e}")
+
+async def send_bark_async(title: str, body: str):
+    """send_bark 的异步版本。"""
+    if not BARK_KEY:
+        return
+    url = _bark_url(title, body)
     try:
-        r = requests.get(url, timeout=10)
+        r = await async_request("GET", url, timeout=10)
         r.raise_for_status()
         print("[Notifier] ✅ BARK 推送成功")
     except Exception as e:
-        print(f"[Notifier] ❌ BARK 推送失败：{e}")
\ No newline at end of file
+        print(f"[Notifier] ❌ BARK 推送失败：{e}")
@@ -0,0 +1,146 @@
+import json
+import os
+from html import escape as html_escape
+from xml.sax.saxutils import escape, quoteattr
+from utils.render_model import CHANNEL_LINK, RSS_MAX_ITEMS, build_feed_item, build_render_model, item_datetime
+from utils.rss_writer import RSS_PATH, load_feed_items, render_rss, write_if_changed
+
+ATOM_PATH = os.path.join("docs", "atom.xml")
+JSON_FEED_PATH = os.path.join("docs", "feed.json")
+HTML_PATH = os.path.join("docs", "index.html")
+
+# 需要输出的格式（逗号分隔），默认全部输出；RSS文件同时是历史条目的存储，未列出rss时仍会写入
+HISTORY_FORMAT = "rss"
+OUTPUT_FORMATS = [name.strip() for name in os.getenv("OUTPUT_FORMATS", "rss,atom,json,html").split(",") if name.strip()]
+
+
+def _isoformat(item):
+    dt = item_datetime(item)
+    return dt.isoformat().replace("+00:00", "Z") if dt else ""
+
+def _html_body(description):
+    """条目正文转为页面HTML：除换行（<br>）外全部转义，AI输出和预警原文中的标签不会生效"""
+    return html_escape(description.replace("<br>", "\n")).replace("\n", "<br>")
+
+def render_atom(model):
+    """渲染Atom 1.0文档"""
+    updated = model.updated.isoformat().replace("+00:00", "Z")
+    atom_link = CHANNEL_LINK + os.path.basename(ATOM_PATH)
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<feed xmlns="http://www.w3.org/2005/Atom">\n',
+        f"  <title>{escape(model.title)}</title>\n",
+        f"  <subtitle>{escape(model.description)}</subtitle>\n",
+        f"  <id>{escape(atom_link)}</id>\n",
+        f'  <link href={quoteattr(atom_link)} rel="self" type="application/atom+xml"/>\n',
+        f"  <link href={quoteattr(model.home_link)}/>\n",
+        f"  <updated>{updated}</updated>\n",
+        f"  <author><name>{escape(model.title)}</name></author>\n",
+    ]
+    for item in model.items:
+        parts.append("  <entry>\n")
+        parts.append(f"    <title>{escape(item.title)}</title>\n")
+        parts.append(f"    <id>urn:qweather:{escape(item.guid)}</id>\n")
+        parts.append(f"    <updated>{_isoformat(item) or updated}</updated>\n")
+        parts.append(f'    <content type="html">{escape(item.description)}</content>\n')
+        parts.append("  </entry>\n")
+    parts.append("</feed>\n")
+    return "".join(parts)
+
+def render_json_feed(model):
+    """渲染JSON Feed 1.1文档（供看板使用）"""
+    feed = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": model.title,
+        "description": model.description,
+        "home_page_url": model.home_link,
+        "feed_url": CHANNEL_LINK + os.path.basename(JSON_FEED_PATH),
+        "items": [
+            {
+                "id": item.guid,
+                "title": item.title,
+                "content_html": item.description,
+                "date_published": _isoformat(item)
+            }
+            for item in model.items
+        ]
+    }
+    return json.dumps(feed, ensure_ascii=False, indent=2) + "\n"
+
+def render_html(model):
+    """渲染静态页面：最新一期完整显示，其余为历史列表"""
+    latest, history = model.items[0], model.items[1:]
+    parts = [
+        "<!DOCTYPE html>\n",
+        '<html lang="zh-Hant">\n',
+        "<head>\n",
+        '  <meta charset="utf-8">\n',
+        '  <meta name="viewport" content="width=device-width, initial-scale=1">\n',
+        f"  <title>{html_escape(model.title)}</title>\n",
+        f'  <link rel="alternate" type="application/rss+xml" href="{os.path.basename(RSS_PATH)}">\n',
+        f'  <link rel="alternate" type="application/atom+xml" href="{os.path.basename(ATOM_PATH)}">\n',
+        f'  <link rel="alternate" type="application/feed+json" href="{os.path.basename(JSON_FEED_PATH)}">\n',
+        "</head>\n",
+        "<body>\n",
+        f"  <h1>{html_escape(model.title)}</h1>\n",
+        f"  <p>{html_escape(model.description)}</p>\n",
+        "  <article>\n",
+        f"    <h2>{html_escape(latest.title)}</h2>\n",
+        f'    <time datetime="{_isoformat(latest)}">{html_escape(latest.pub_date)}</time>\n',
+        f"    <div>{_html_body(latest.description)}</div>\n",
+        "  </article>\n",
+    ]
+    if history:
+        parts.append("  <h2>历史</h2>\n")
+        parts.append("  <ul>\n")
+        for item in history:
+            parts.append(
+                f"    <li><details><summary>{html_escape(item.title)}</summary>"
+                f"<div>{_html_body(item.description)}</div></details></li>\n"
+            )
+        parts.append("  </ul>\n")
+    parts.append("</body>\n")
+    parts.append("</html>\n")
+    return "".join(parts)
+
+
+# 输出格式注册表：格式名 → (输出路径, 渲染函数)
+WRITERS = {
+    "rss": (RSS_PATH, render_rss),
+    "atom": (ATOM_PATH, render_atom),
+    "json": (JSON_FEED_PATH, render_json_feed),
+    "html": (HTML_PATH, render_html),
+}
+
+def register_writer(name, path, render):
+    """注册新的输出格式，render 接收 RenderModel 返回文本"""
+    WRITERS[name] = (path, render)
+
+def write_outputs(model, formats=None):
+    """
+    由同一个渲染模型输出各格式，内容未变化的文件不重写
+    :return: {格式名: 是否写入}
+    """
+    results = {}
+    for name in formats or OUTPUT_FORMATS:
+        if name not in WRITERS:
+            print(f"⚠️ 未知的输出格式: {name}")
+            continue
+        path, render = WRITERS[name]
+        results[name] = write_if_changed(path, render(model))
+    return results
+
+def publish_outputs(title: str, description: str, forecast_hours: int = 15, formats=None):
+    """
+    生成本次发布的渲染模型（历史条目从RSS恢复）并输出全部格式
+    RSS文件总会写入，其他格式的历史才能随每次发布前进
+    """
+    item = build_feed_item(title, description, forecast_hours)
+    model = build_render_model(item, load_feed_items(RSS_PATH, RSS_MAX_ITEMS))
+    formats = list(formats or OUTPUT_FORMATS)
+    if HISTORY_FORMAT not in formats:
+        formats.append(HISTORY_FORMAT)
+    results = write_outputs(model, formats)
+    written = [name for name, changed in results.items() if changed]
+    print(f"✅ 输出完成：{', '.join(written) if written else '内容无变化'}（共 {len(model.items)} 条）")
+    return model
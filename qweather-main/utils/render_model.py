@@ -0,0 +1,59 @@
+import os
+from collections import namedtuple
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from dotenv import load_dotenv
+
+# 确保环境变量已加载
+load_dotenv()
+
+FEED_LINK = os.getenv("RSS_FEED_LINK", "https://eliu-lotso.github.io/qweather/weather.xml")  # GitHub Pages 地址
+CHANNEL_LINK = FEED_LINK.rsplit("/", 1)[0] + "/"  # 用于 <link> 指向主页
+FEED_TITLE = "天气快讯"
+FEED_DESCRIPTION = "台北新北天气、大雨城市与预警"
+RSS_MAX_ITEMS = max(1, int(os.getenv("RSS_MAX_ITEMS", "20")))  # 订阅源保留的历史条目数
+
+# 单条发布内容：pub_date 为RFC 822时间（RSS格式），description 为HTML
+FeedItem = namedtuple("FeedItem", ["title", "pub_date", "guid", "description"])
+
+# 一次发布的渲染模型，各输出格式（RSS/Atom/JSON Feed/HTML）都由它生成
+RenderModel = namedtuple("RenderModel", ["title", "description", "home_link", "updated", "items"])
+
+
+def item_datetime(item):
+    """条目的发布时间（UTC），无法解析时返回None"""
+    try:
+        dt = parsedate_to_datetime(item.pub_date)
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def build_feed_item(title: str, description: str, forecast_hours: int = 15, now=None):
+    """由摘要标题和正文生成本次发布的条目"""
+    # 当前时间（秒级唯一标识）
+    now = now or datetime.now(timezone.utc)
+    timestamp = now.strftime("%Y%m%dT%H%M%S")
+    pub_date = format_datetime(now, usegmt=True)
+
+    # 构造标题加上汇报范围
+    report_range = f"（未来 {forecast_hours} 小时预报）"
+    full_title = title + report_range
+
+    # 将换行符转换为HTML <br> 标签，确保在RSS阅读器中正确换行
+    html_description = description.replace('\n', '<br>')
+    return FeedItem(full_title, pub_date, f"weather-{timestamp}", html_description)
+
+def build_render_model(item, history=(), max_items=RSS_MAX_ITEMS):
+    """
+    新条目放在最前，与历史条目合并为渲染模型（最多max_items条）
+    :param history: 已发布的历史条目（新的在前）
+    """
+    items = [item] + [old for old in history if old.guid != item.guid]
+    items = items[:max_items]
+    return RenderModel(
+        title=FEED_TITLE,
+        description=FEED_DESCRIPTION,
+        home_link=CHANNEL_LINK,
+        updated=item_datetime(item) or datetime.now(timezone.utc),
+        items=items
+    )
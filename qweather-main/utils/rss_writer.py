@@ -1,72 +1,97 @@
 import os
-from datetime import datetime
-from xml.dom import minidom
-from dotenv import load_dotenv
-
-# 确保环境变量已加载
-load_dotenv()
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+from utils.render_model import (
+    FEED_LINK, RSS_MAX_ITEMS, FeedItem, build_feed_item, build_render_model
+)
 
 RSS_PATH = os.path.join("docs", "weather.xml")
-FEED_LINK = os.getenv("RSS_FEED_LINK", "https://eliu-lotso.github.io/qweather/weather.xml")  # GitHub Pages 地址
-CHANNEL_LINK = FEED_LINK.rsplit("/", 1)[0] + "/"  # 用于 <link> 指向主页
-
-
-def write_rss(title: str, description: str, forecast_hours: int = 15):
-    impl = minidom.getDOMImplementation()
-    doc = impl.createDocument(None, "rss", None)
-    rss = doc.documentElement
-    rss.setAttribute("version", "2.0")
-    rss.setAttribute("xmlns:atom", "http://www.w3.org/2005/Atom")
 
-    channel = doc.createElement("channel")
-    rss.appendChild(channel)
 
-    def el(tag, text):
-        node = doc.createElement(tag)
-        node.appendChild(doc.createTextNode(text))
-        return node
+def load_feed_items(path=RSS_PATH, limit=RSS_MAX_ITEMS):
+    """
+    从已有的RSS文件中恢复历史条目（iterparse流式读取，不构建完整DOM）
+    :return: [FeedItem]，按文件中的顺序（新的在前），最多limit条；文件不存在或损坏时返回空列表
+    """
+    items = []
+    if limit <= 0 or not os.path.exists(path):
+        return items
+    try:
+        for _, element in ElementTree.iterparse(path, events=("end",)):
+            if element.tag != "item":
+                continue
+            items.append(FeedItem(
+                title=element.findtext("title", ""),
+                pub_date=element.findtext("pubDate", ""),
+                guid=element.findtext("guid", ""),
+                description=element.findtext("description", "")
+            ))
+            element.clear()
+            if len(items) >= limit:
+                break
+    except (ElementTree.ParseError, OSError) as e:
+        print(f"⚠️ 读取历史RSS失败，将重新生成: {e}")
+        return []
+    return items
 
-    # 当前时间（秒级唯一标识）
-    now = datetime.utcnow()
-    timestamp = now.strftime("%Y%m%dT%H%M%S")
-    pub_date = now.strftime("%a, %d %b %Y %H:%M:%S GMT")
+def _cdata(text):
+    """CDATA段（内容中的 ]]> 拆成两段）"""
+    return "<![CDATA[" + text.replace("]]>", "]]]]><![CDATA[>") + "]]>"
 
-    # 构造标题加上汇报范围
-    report_range = f"（未来 {forecast_hours} 小时预报）"
-    full_title = title + report_range
+def render_rss(model):
+    """渲染RSS 2.0文档（逐段拼接，不构建DOM）"""
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">\n',
+        "  <channel>\n",
+        f"    <title>{escape(model.title)}</title>\n",
+        f"    <link>{escape(FEED_LINK)}</link>\n",
+        f"    <description>{escape(model.description)}</description>\n",
+        # Atom 自引用声明
+        f'    <atom:link href={quoteattr(FEED_LINK)} rel="self" type="application/rss+xml"/>\n',
+    ]
+    for item in model.items:
+        parts.append("    <item>\n")
+        parts.append(f"      <title>{escape(item.title)}</title>\n")
+        parts.append(f"      <pubDate>{escape(item.pub_date)}</pubDate>\n")
+        parts.append(f'      <guid isPermaLink="false">{escape(item.guid)}</guid>\n')
+        parts.append(f"      <description>{_cdata(item.description)}</description>\n")
+        parts.append("    </item>\n")
+    parts.append("  </channel>\n")
+    parts.append("</rss>\n")
+    return "".join(parts)
 
-    # 基本频道信息
-    channel.appendChild(el("title", "天气快讯"))
-    channel.appendChild(el("link", FEED_LINK))
-    channel.appendChild(el("description", "台北新北天气、大雨城市与预警"))
+def write_if_changed(path, content):
+    """
+    内容与现有文件不同时原子写入：先写临时文件，再替换正式文件，读者不会读到写了一半的内容
+    :return: 是否写入
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
 
-    # Atom 自引用声明
-    atom_link = doc.createElement("atom:link")
-    atom_link.setAttribute("href", FEED_LINK)
-    atom_link.setAttribute("rel", "self")
-    atom_link.setAttribute("type", "application/rss+xml")
-    channel.appendChild(atom_link)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
 
-    # 单条项目
-    item = doc.createElement("item")
-    item.appendChild(el("title", full_title))
-    item.appendChild(el("pubDate", pub_date))
 
-    guid = doc.createElement("guid")
-    guid.setAttribute("isPermaLink", "false")
-    guid.appendChild(doc.createTextNode(f"weather-{timestamp}"))
-    item.appendChild(guid)
-
-    desc = doc.createElement("description")
-    # 将换行符转换为HTML <br> 标签，确保在RSS阅读器中正确换行
-    html_description = description.replace('\n', '<br>')
-    cdata = doc.createCDATASection(html_description)
-    desc.appendChild(cdata)
-    item.appendChild(desc)
-
-    channel.appendChild(item)
-
-    # 写入文件
-    with open(RSS_PATH, "w", encoding="utf-8") as f:
-        f.write(doc.toprettyxml(indent="  "))
-    print(f"✅ RSS 写入完成：{RSS_PATH}")
+def write_rss(title: str, description: str, forecast_hours: int = 15):
+    """只写RSS；需要同时输出其他格式时使用 utils.output_writers.publish_outputs"""
+    item = build_feed_item(title, description, forecast_hours)
+    # 新条目放在最前，保留最近 RSS_MAX_ITEMS 条
+    model = build_render_model(item, load_feed_items(RSS_PATH, RSS_MAX_ITEMS))
+    write_if_changed(RSS_PATH, render_rss(model))
+    print(f"✅ RSS 写入完成：{RSS_PATH}（共 {len(model.items)} 条）")